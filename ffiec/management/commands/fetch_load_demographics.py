@@ -13,8 +13,11 @@ from ffiec.models import (
     MetDivDemographics, TractDemographics,
 )
 from geo.models import CoreBasedStatisticalArea, MetroDivision, State, Tract
-from mapusaurus.batch_utils import make_filter_fn, save_batches
-from mapusaurus.fetch_zip import fetch_and_unzip_dir
+from geo.tiles import invalidate_tiles
+from mapusaurus.batch_utils import (
+    add_writer_arguments, KeySetFilter, save_batches)
+from mapusaurus.fetch_zip import (
+    add_cache_arguments, download_cache, fetch_and_unzip_dir)
 from reports.models import IncomeHousingReport, PopulationReport
 
 ZIP_TPL = "https://www.ffiec.gov/Census/Census_Flat_Files/Census{year}.zip"
@@ -147,14 +150,15 @@ def fetch_csv(year: int) -> Iterator[TextIO]:
 
 def load_demographics(
         year: int, load_tracts: bool, load_cbsas: bool, load_metdivs: bool,
-        load_low_pops: bool, replace: bool):
+        load_low_pops: bool, replace: bool, writers: int = 0):
     """Fetch CSV of demographic data and parse + load tracts/CBSAs from it."""
     with fetch_csv(year) as csv_file:
         if load_tracts:
             rows = cast(CSV_ROWS, csv.reader(csv_file))
             save_batches(
                 parse_tract_demographics(rows), replace,
-                filter_fn=make_filter_fn(Tract, "tract_id"), batch_size=1000,
+                filter_fn=KeySetFilter(tract_id=Tract.objects.all()),
+                batch_size=1000, writers=writers,
             )
             csv_file.seek(0)  # Reset
 
@@ -162,8 +166,9 @@ def load_demographics(
             rows = cast(CSV_ROWS, csv.reader(csv_file))
             save_batches(
                 parse_cbsa_demographics(rows), replace,
-                filter_fn=make_filter_fn(CoreBasedStatisticalArea, "cbsa_id"),
-                batch_size=1000,
+                filter_fn=KeySetFilter(
+                    cbsa_id=CoreBasedStatisticalArea.objects.all()),
+                batch_size=1000, writers=writers,
             )
             csv_file.seek(0)  # Reset
 
@@ -171,8 +176,8 @@ def load_demographics(
             rows = cast(CSV_ROWS, csv.reader(csv_file))
             save_batches(
                 parse_metdiv_demographics(rows), replace,
-                filter_fn=make_filter_fn(MetroDivision, "metdiv_id"),
-                batch_size=1000,
+                filter_fn=KeySetFilter(metdiv_id=MetroDivision.objects.all()),
+                batch_size=1000, writers=writers,
             )
             csv_file.seek(0)  # Reset
 
@@ -180,7 +185,8 @@ def load_demographics(
             rows = cast(CSV_ROWS, csv.reader(csv_file))
             save_batches(
                 parse_low_pop_demographics(rows), replace,
-                filter_fn=make_filter_fn(State, "state_id"), batch_size=1000,
+                filter_fn=KeySetFilter(state_id=State.objects.all()),
+                batch_size=1000, writers=writers,
             )
             csv_file.seek(0)  # Reset
 
@@ -214,20 +220,24 @@ class Command(BaseCommand):
         parser.set_defaults(
             load_cbsas=True, load_metdivs=True, load_tracts=True,
             load_low_pop=True)
+        add_writer_arguments(parser)
+        add_cache_arguments(parser)
 
     def handle(self, *args, **options):
-        pbar = tqdm(options["years"])
-        for year in pbar:
-            pbar.set_description(str(year))
-            try:
-                load_demographics(
-                    year, options["load_tracts"], options["load_cbsas"],
-                    options["load_metdivs"], options["load_low_pops"],
-                    options["replace"],
-                )
-            except requests.exceptions.RequestException:
-                logger.exception("Problem retrieving %s", year)
-        logger.info("Rebuilding population report materialized view")
-        PopulationReport.rebuild_all()
-        logger.info("Rebuilding income/housing report materialized view")
-        IncomeHousingReport.rebuild_all()
+        with download_cache(options["cache_dir"], options["offline"]):
+            pbar = tqdm(options["years"])
+            for year in pbar:
+                pbar.set_description(str(year))
+                try:
+                    load_demographics(
+                        year, options["load_tracts"], options["load_cbsas"],
+                        options["load_metdivs"], options["load_low_pops"],
+                        options["replace"], options["writers"],
+                    )
+                    invalidate_tiles(year)
+                except requests.exceptions.RequestException:
+                    logger.exception("Problem retrieving %s", year)
+            logger.info("Rebuilding population report materialized view")
+            PopulationReport.rebuild_all()
+            logger.info("Rebuilding income/housing report materialized view")
+            IncomeHousingReport.rebuild_all()
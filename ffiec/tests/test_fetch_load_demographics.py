@@ -12,6 +12,7 @@ from ffiec.management.commands import fetch_load_demographics
 def mock_mat_view(monkeypatch):
     monkeypatch.setattr(fetch_load_demographics, "PopulationReport", Mock())
     monkeypatch.setattr(fetch_load_demographics, "IncomeHousingReport", Mock())
+    monkeypatch.setattr(fetch_load_demographics, "invalidate_tiles", Mock())
 
 
 def test_default_args(monkeypatch):
@@ -24,16 +25,18 @@ def test_default_args(monkeypatch):
     ]
     assert years == [2012, 2013, 2014, 2015, 2016, 2017, 2018, 2019]
     assert fetch_load_demographics.load_demographics.call_args == \
-        call(2019, True, True, True, True, False)
+        call(2019, True, True, True, True, False, 0)
 
 
 def test_custom_args(monkeypatch):
     monkeypatch.setattr(fetch_load_demographics, "load_demographics", Mock())
     call_command("fetch_load_demographics", "--year", "2013", "2014",
-                 "--no-cbsa", "--no-low-pops", "--replace")
+                 "--no-cbsa", "--no-low-pops", "--replace", "--writers", "2")
     assert fetch_load_demographics.load_demographics.call_count == 2
     assert fetch_load_demographics.load_demographics.call_args == \
-        call(2014, True, False, True, False, True)
+        call(2014, True, False, True, False, True, 2)
+    assert fetch_load_demographics.invalidate_tiles.call_args_list == \
+        [call(2013), call(2014)]
 
 
 @pytest.mark.parametrize("exception", (
@@ -48,3 +51,4 @@ def test_load_demographics_exceptions(monkeypatch, exception):
     fetch_load_demographics.load_demographics.side_effect = exception
     call_command("fetch_load_demographics", "--year", "2014", "2016")
     assert fetch_load_demographics.logger.exception.call_count == 2
+    assert not fetch_load_demographics.invalidate_tiles.called
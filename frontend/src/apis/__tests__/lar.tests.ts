@@ -2,17 +2,71 @@ import axios from "axios";
 import { Set } from "immutable";
 
 import { FiltersFactory } from "../../testUtils/Factory";
-import { fetchLar } from "../lar";
+import { decodeLar, EMPTY_LAR, fetchLar, GEOID_LENGTH } from "../lar";
 
 jest.mock("axios");
 
 const getMock = axios.get as jest.Mock; // hack around Jest typing
 
+/*
+ * Encode points as the API's binary format.
+ */
+function encode(points: any[]) {
+  const count = points.length;
+  const buffer = new ArrayBuffer(4 + count * (5 * 4 + GEOID_LENGTH));
+  const view = new DataView(buffer);
+  view.setUint32(0, count, true);
+  points.forEach((point, idx) => {
+    view.setFloat32(4 + idx * 4, point.lat, true);
+    view.setFloat32(4 + (count + idx) * 4, point.lon, true);
+    view.setUint32(4 + (2 * count + idx) * 4, point.volume, true);
+    view.setUint32(4 + (3 * count + idx) * 4, point.num_households, true);
+    view.setFloat32(4 + (4 * count + idx) * 4, point.normalized_loans, true);
+    point.geoid.split("").forEach((chr, chrIdx) => {
+      view.setUint8(
+        4 + 5 * count * 4 + idx * GEOID_LENGTH + chrIdx,
+        chr.charCodeAt(0),
+      );
+    });
+  });
+  return buffer;
+}
+
+describe("decodeLar()", () => {
+  it("wraps columns around the buffer", () => {
+    const columns = decodeLar(encode([
+      {
+        geoid: "11111111111",
+        lat: 1.5,
+        lon: -2.5,
+        normalized_loans: 0.75,
+        num_households: 4,
+        volume: 3,
+      },
+      {
+        geoid: "22222222222",
+        lat: -3,
+        lon: 4,
+        normalized_loans: 0.875,
+        num_households: 8,
+        volume: 7,
+      },
+    ]));
+    expect(columns.length).toBe(2);
+    expect(Array.from(columns.latitude)).toEqual([1.5, -3]);
+    expect(Array.from(columns.longitude)).toEqual([-2.5, 4]);
+    expect(Array.from(columns.loanCount)).toEqual([3, 7]);
+    expect(Array.from(columns.houseCount)).toEqual([4, 8]);
+    expect(Array.from(columns.normalizedLoans)).toEqual([0.75, 0.875]);
+    expect(columns.geoids.length).toBe(2 * GEOID_LENGTH);
+  });
+});
+
 afterEach(getMock.mockReset);
 
 describe("fetchLar()", () => {
   it("hits the right endpoint", async () => {
-    getMock.mockImplementationOnce(() => ({ data: [] }));
+    getMock.mockImplementationOnce(() => ({ data: encode([]) }));
     await fetchLar(FiltersFactory.build({
       county: Set(["111"]),
       lender: Set(["222"]),
@@ -27,13 +81,16 @@ describe("fetchLar()", () => {
     expect(options.params).toEqual({
       action_taken: "1,2,3,4,5",
       county: "111",
+      format: "bin",
       lender: "222",
       lien_status: "4",
       loan_purpose: "3",
       metro: "333",
+      ordering: "normalized_loans",
       owner_occupancy: "2",
       property_type: "1",
     });
+    expect(options.responseType).toBe("arraybuffer");
   });
 
   it("handles non-hmda displays", async () => {
@@ -43,7 +100,7 @@ describe("fetchLar()", () => {
       metro: Set<string>(),
     }));
     expect(getMock).not.toHaveBeenCalled();
-    expect(result).toEqual([]);
+    expect(result).toBe(EMPTY_LAR);
   });
 
   it("requires a geo", async () => {
@@ -53,57 +110,46 @@ describe("fetchLar()", () => {
       metro: Set<string>(),
     }));
     expect(getMock).not.toHaveBeenCalled();
-    expect(result).toEqual([]);
+    expect(result).toBe(EMPTY_LAR);
   });
 
   it("creates results in the right format", async () => {
+    // the API has already sorted and normalized
     getMock.mockImplementationOnce(() => ({
-      data: [
+      data: encode([
         {
-          geo_id: "bbbbbbbb",
-          lat: -7.7,
-          lon: 8.8,
-          num_households: 6,
-          volume: 5,
-        }, {
-          geo_id: "aaaaaaaa",
-          lat: 3.3,
-          lon: -4.4,
+          geoid: "aaaaaaaaaaa",
+          lat: 3.25,
+          lon: -4.5,
+          normalized_loans: 0.5,
           num_households: 2,
           volume: 1,
         }, {
-          geo_id: "cccccccc",
+          geoid: "bbbbbbbbbbb",
+          lat: -7.75,
+          lon: 8.5,
+          normalized_loans: 0.625,
+          num_households: 8,
+          volume: 5,
+        }, {
+          geoid: "ccccccccccc",
           lat: 11,
           lon: -12,
-          num_households: 10,
+          normalized_loans: 1.125,
+          num_households: 8,
           volume: 9,
         },
-      ],
+      ]),
     }));
     const lar = await fetchLar(FiltersFactory.build());
 
-    expect(lar).toEqual([
-      {
-        houseCount: 2,
-        latitude: 3.3,
-        loanCount: 1,
-        longitude: -4.4,
-        normalizedLoans: 1 / 2,
-      },
-      {
-        houseCount: 6,
-        latitude: -7.7,
-        loanCount: 5,
-        longitude: 8.8,
-        normalizedLoans: 5 / 6,
-      },
-      {
-        houseCount: 10,
-        latitude: 11,
-        loanCount: 9,
-        longitude: -12,
-        normalizedLoans: 9 / 10,
-      },
-    ]);
+    expect(lar.length).toBe(3);
+    expect(Array.from(lar.latitude)).toEqual([3.25, -7.75, 11]);
+    expect(Array.from(lar.longitude)).toEqual([-4.5, 8.5, -12]);
+    expect(Array.from(lar.loanCount)).toEqual([1, 5, 9]);
+    expect(Array.from(lar.houseCount)).toEqual([2, 8, 8]);
+    expect(Array.from(lar.normalizedLoans)).toEqual([0.5, 0.625, 1.125]);
+    expect(String.fromCharCode(...Array.from(lar.geoids)))
+      .toBe("aaaaaaaaaaabbbbbbbbbbbccccccccccc");
   });
 });
@@ -2,42 +2,69 @@ import axios from "axios";
 
 import Filters from "../store/Lar/Filters";
 
-export interface LARPoint {
-  geoid: string;
-  houseCount: number;
-  latitude: number;
-  loanCount: number;
-  longitude: number;
-  normalizedLoans: number;
+/*
+ * Column-oriented LAR points, as views over the API's binary response.
+ */
+export interface LARColumns {
+  geoids: Uint8Array;
+  houseCount: Uint32Array;
+  latitude: Float32Array;
+  length: number;
+  loanCount: Uint32Array;
+  longitude: Float32Array;
+  normalizedLoans: Float32Array;
 }
 
+export const GEOID_LENGTH = 11;
+
+/*
+ * Wrap typed arrays around the API's binary ("?format=bin") response: a
+ * uint32 count, then float32 latitudes and longitudes, uint32 loan and
+ * household counts, float32 normalized loans, and finally fixed-width ASCII
+ * geoids. All values are little-endian. Nothing is copied or allocated per
+ * point.
+ */
+export function decodeLar(buffer: ArrayBuffer): LARColumns {
+  const length = new DataView(buffer).getUint32(0, true);
+  const columnStart = (idx: number) => 4 + idx * length * 4;
+  return {
+    length,
+    geoids: new Uint8Array(buffer, columnStart(5), length * GEOID_LENGTH),
+    houseCount: new Uint32Array(buffer, columnStart(3), length),
+    latitude: new Float32Array(buffer, columnStart(0), length),
+    loanCount: new Uint32Array(buffer, columnStart(2), length),
+    longitude: new Float32Array(buffer, columnStart(1), length),
+    normalizedLoans: new Float32Array(buffer, columnStart(4), length),
+  };
+}
+
+export const EMPTY_LAR: LARColumns = decodeLar(new ArrayBuffer(4));
+
 /*
- * Fetch loan data from the API and convert to LARPoint objects.
+ * Fetch loan data from the API as typed columns; no object is created per
+ * point. The API computes and sorts by normalized loans for us.
  */
-export async function fetchLar(filters: Filters): Promise<LARPoint[]> {
+export async function fetchLar(filters: Filters): Promise<LARColumns> {
   const params = {
     action_taken: "1,2,3,4,5",
     county: filters.county.join(","),
+    format: "bin",
     lender: filters.lender.join(","),
     lien_status: filters.lienStatus.join(","),
     loan_purpose: filters.loanPurpose.join(","),
     metro: filters.metro.join(","),
+    ordering: "normalized_loans",
     owner_occupancy: filters.ownerOccupancy.join(","),
     property_type: filters.propertyType.join(","),
     year: filters.year,
   };
 
   if (params.lender && (params.county || params.metro)) {
-    const response = await axios.get("/api/lar/", { params });
-    // Convert between API format and ours
-    return response.data.map(obj => ({
-      houseCount: obj.num_households,
-      latitude: obj.lat,
-      loanCount: obj.volume,
-      longitude: obj.lon,
-      normalizedLoans:
-        obj.num_households ? obj.volume / obj.num_households : 0,
-    })).sort((left, right) => left.normalizedLoans - right.normalizedLoans);
+    const response = await axios.get(
+      "/api/lar/",
+      { params, responseType: "arraybuffer" },
+    );
+    return decodeLar(response.data);
   }
-  return [];
+  return EMPTY_LAR;
 }
@@ -4,13 +4,40 @@ import * as React from "react";
 import ReactMapGL, { NavigationControl } from "react-map-gl";
 import { connect } from "react-redux";
 import { bindActionCreators } from "redux";
+import { createSelector } from "reselect";
 
-import { scatterPlotSelector } from "../store/Lar/Points";
+import { ScatterPlot, scatterPlotSelector } from "../store/Lar/Points";
 import { currentStyleSelector } from "../store/Mapbox";
 import State from "../store/State";
 import { setViewport } from "../store/Viewport";
 import { largeSpace } from "../theme";
 
+const getFillColor = () => [255, 158, 22, 200];
+const getOutlineColor = () => [0, 0, 0, 255];
+
+/*
+ * Layer props drawing circles from our typed arrays. deck.gl's data is each
+ * circle's index into them, so no object is made per point. It's replaced
+ * along with the scatter plot, prompting deck.gl to update.
+ */
+export const circleProps = createSelector(
+  (scatterPlot: ScatterPlot) => scatterPlot,
+  ({ length, positions, radii }) => {
+    const data: number[] = [];
+    for (let idx = 0; idx < length; idx += 1) {
+      data.push(idx);
+    }
+    return {
+      data,
+      getPosition: (idx: number) => [
+        positions[idx * 3],
+        positions[idx * 3 + 1],
+      ],
+      getRadius: (idx: number) => radii[idx],
+    };
+  },
+);
+
 export function Map({
   changeViewport,
   height,
@@ -22,13 +49,13 @@ export function Map({
 }) {
   const layers = [
     new ScatterplotLayer({
-      data: scatterPlot,
-      getColor: [255, 158, 22, 200],
+      ...circleProps(scatterPlot),
+      getColor: getFillColor,
       id: "lar-circle",
     }),
     new ScatterplotLayer({
-      data: scatterPlot,
-      getColor: [0, 0, 0, 255],
+      ...circleProps(scatterPlot),
+      getColor: getOutlineColor,
       id: "lar-outline",
       outline: true,
     }),
@@ -41,11 +41,12 @@ export function mapStateToProps(
   { percentile }: { percentile: number },
 ): { height: number, text: string, width: number } {
   const { x, y } = pixelsPerMeterSelector(viewport);
-  const point = points.raw[Math.floor(percentile * (points.raw.length - 1))];
-  const radMeters = radiusFnSelector(points)(point);
+  const idx = Math.floor(percentile * (points.raw.length - 1));
+  const normalizedLoans = points.raw.normalizedLoans[idx];
+  const radMeters = radiusFnSelector(points)(normalizedLoans);
   return {
     height: 2 * radMeters * y,
-    text: (point.normalizedLoans * 1000).toFixed(1),
+    text: (normalizedLoans * 1000).toFixed(1),
     width: 2 * radMeters * x,
   };
 }
@@ -5,6 +5,7 @@ import * as React from "react";
 import { radiusFnSelector } from "../../../store/Lar/Points";
 import { pixelsPerMeterSelector } from "../../../store/Viewport";
 import {
+  larColumns,
   LarFactory,
   LARPointFactory,
   StateFactory,
@@ -35,13 +36,13 @@ describe("mapStateToProps()", () => {
   const state = StateFactory.build({
     lar: LarFactory.build({
       points: {
-        raw: [
+        raw: larColumns([
           LARPointFactory.build({ houseCount: 11, loanCount: 4 }),
           LARPointFactory.build(),
           LARPointFactory.build(),
           LARPointFactory.build({ houseCount: 1000, loanCount: 1 }),
           LARPointFactory.build({ houseCount: 9, loanCount: 3 }),
-        ],
+        ]),
       },
     }),
   });
@@ -5,6 +5,12 @@ import mapStyle from "../../mapStyle";
 import { ViewportFactory } from "../../testUtils/Factory";
 import { Map } from "../Map";
 
+const emptyPlot = {
+  length: 0,
+  positions: new Float32Array(0),
+  radii: new Float32Array(0),
+};
+
 describe("<Map />", () => {
   it("passed correct properties on the resulting ReactMapGL", () => {
     const changeViewport = () => null;
@@ -19,7 +25,7 @@ describe("<Map />", () => {
         height={10}
         mapStyle={mapStyle}
         mapboxApiAccessToken="A Token!"
-        scatterPlot={[]}
+        scatterPlot={emptyPlot}
         viewport={viewport}
         width={10}
       />,
@@ -33,11 +39,11 @@ describe("<Map />", () => {
 
   it("has two Scatterplots with the correct data", () => {
     const changeViewport = () => null;
-    const scatterPlot = [
-      { coordinates: [1, 2], radius: 3 },
-      { coordinates: [4, 5], radius: 6 },
-      { coordinates: [7, 8], radius: 9 },
-    ];
+    const scatterPlot = {
+      length: 3,
+      positions: new Float32Array([1, 2, 0, 4, 5, 0, 7, 8, 0]),
+      radii: new Float32Array([3, 6, 9]),
+    };
 
     const layers = shallow(
       <Map
@@ -52,10 +58,13 @@ describe("<Map />", () => {
     ).find("DeckGL").prop("layers");
 
     expect(layers).toHaveLength(2);
-    expect(layers[0].props.data).toBe(scatterPlot);
-    expect(layers[0].props.data).toBe(layers[1].props.data);
-    expect(layers[0].props.radiusScale).toBe(layers[1].props.radiusScale);
-    expect(layers[0].props.outline).toBeFalsy();
-    expect(layers[1].props.outline).toBeTruthy();
+    const [fill, outline] = layers.map(layer => layer.props);
+    expect(fill.data).toEqual([0, 1, 2]);
+    expect(fill.data).toBe(outline.data);
+    expect(fill.data.map(fill.getPosition)).toEqual([[1, 2], [4, 5], [7, 8]]);
+    expect(fill.data.map(outline.getRadius)).toEqual([3, 6, 9]);
+    expect(fill.getColor(0)).not.toEqual(outline.getColor(0));
+    expect(fill.outline).toBeFalsy();
+    expect(outline.outline).toBeTruthy();
   });
 });
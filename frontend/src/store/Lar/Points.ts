@@ -3,15 +3,15 @@ import actionCreatorFactory from "typescript-fsa";
 import { reducerWithInitialState } from "typescript-fsa-reducers";
 import { asyncFactory } from "typescript-fsa-redux-thunk";
 
-import { fetchLar, LARPoint } from "../../apis/lar";
+import { EMPTY_LAR, fetchLar, LARColumns } from "../../apis/lar";
 
 export default interface Points {
-  raw: LARPoint[];
+  raw: LARColumns;
   scaleFactor: number;
 }
 
 export const SAFE_INIT: Points = {
-  raw: [],
+  raw: EMPTY_LAR,
   scaleFactor: 25,
 };
 
@@ -19,7 +19,7 @@ const actionCreator = actionCreatorFactory("LAR/POINTS");
 const asyncActionCreator = asyncFactory<Points>(actionCreator);
 
 export const setScaleFactor = actionCreator<number>("SET_SCALE_FACTOR");
-export const updatePoints = asyncActionCreator<void, LARPoint[]>(
+export const updatePoints = asyncActionCreator<void, LARColumns>(
   "UPDATE_POINTS",
   (_, dispatch, getState: () => any) => fetchLar(getState().lar.filters),
 );
@@ -27,7 +27,7 @@ export const updatePoints = asyncActionCreator<void, LARPoint[]>(
 export const reducer = reducerWithInitialState(SAFE_INIT)
   .case(updatePoints.async.started, original => ({
     ...original,
-    raw: [],
+    raw: EMPTY_LAR,
   }))
   .case(updatePoints.async.done, (original, { result }) => ({
     ...original,
@@ -45,8 +45,7 @@ export const medianSelector = createSelector(
     if (!raw.length) {
       return NaN;
     }
-    const median = raw[Math.floor((raw.length - 1) / 2)];
-    return median.normalizedLoans;
+    return raw.normalizedLoans[Math.floor((raw.length - 1) / 2)];
   },
 );
 
@@ -54,17 +53,33 @@ export const radiusFnSelector = createSelector(
   ({ scaleFactor }: Points) => scaleFactor,
   medianSelector,
   (scaleFactor, median) => (
-    (point: LARPoint) =>
+    (normalizedLoans: number) =>
       // Area of a circle = pi * r * r
-      Math.sqrt(point.normalizedLoans * scaleFactor * 4000 / median) / Math.PI
+      Math.sqrt(normalizedLoans * scaleFactor * 4000 / median) / Math.PI
   ),
 );
 
+export interface ScatterPlot {
+  length: number;
+  positions: Float32Array;
+  radii: Float32Array;
+}
+
+/*
+ * Circles as flat typed arrays, which deck.gl's accessors index into, rather
+ * than an object per point.
+ */
 export const scatterPlotSelector = createSelector(
-  (points: Points) => points,
+  (points: Points) => points.raw,
   radiusFnSelector,
-  (points, radiusFn) => points.raw.map(point => ({
-    position: [point.longitude, point.latitude],
-    radius: radiusFn(point),
-  })),
+  (raw, radiusFn): ScatterPlot => {
+    const positions = new Float32Array(raw.length * 3);
+    const radii = new Float32Array(raw.length);
+    for (let idx = 0; idx < raw.length; idx += 1) {
+      positions[idx * 3] = raw.longitude[idx];
+      positions[idx * 3 + 1] = raw.latitude[idx];
+      radii[idx] = radiusFn(raw.normalizedLoans[idx]);
+    }
+    return { positions, radii, length: raw.length };
+  },
 );
@@ -1,5 +1,6 @@
-import { fetchLar, LARPoint } from "../../../apis/lar";
+import { EMPTY_LAR, fetchLar } from "../../../apis/lar";
 import {
+  larColumns,
   LarFactory,
   LARPointFactory,
   PointsFactory,
@@ -19,18 +20,18 @@ afterEach(fetchLarMock.mockReset);
 describe("reducer()", () => {
   it("clears lar data", () => {
     const result = reducer(
-      PointsFactory.build({ raw: LARPointFactory.buildList(3) }),
+      PointsFactory.build({ raw: larColumns(LARPointFactory.buildList(3)) }),
       (updatePoints.async.started as any)(),
     );
-    expect(result.raw).toEqual([]);
+    expect(result.raw).toBe(EMPTY_LAR);
   });
   it("sets lar data", () => {
-    const raw = LARPointFactory.buildList(3);
+    const raw = larColumns(LARPointFactory.buildList(3));
     const result = reducer(
-      PointsFactory.build({ raw: [] }),
+      PointsFactory.build({ raw: EMPTY_LAR }),
       (updatePoints.async.done as any)({ result: raw }),
     );
-    expect(result.raw).toEqual(raw);
+    expect(result.raw).toBe(raw);
   });
 });
 
@@ -45,30 +46,30 @@ test("updatePoints() triggers a fetch with appropriate params", async () => {
 
 describe("medianSelector", () => {
   it("returns an appropriate median", () => {
-    const raw: LARPoint[] = [];
-    const points = PointsFactory.build({ raw });
+    const raw: any[] = [];
+    const points = PointsFactory.build({ raw: larColumns(raw) });
     expect(medianSelector(points)).toBe(NaN);
 
     raw.push(LARPointFactory.build({ normalizedLoans: 1 }));
-    expect(medianSelector({ ...points, raw: [...raw] })).toBe(1);
+    expect(medianSelector({ ...points, raw: larColumns(raw) })).toBe(1);
 
     raw.push(LARPointFactory.build({ normalizedLoans: 2 }));
-    expect(medianSelector({ ...points, raw: [...raw] })).toBe(1);
+    expect(medianSelector({ ...points, raw: larColumns(raw) })).toBe(1);
 
     raw.push(LARPointFactory.build({ normalizedLoans: 4 }));
-    expect(medianSelector({ ...points, raw: [...raw] })).toBe(2);
+    expect(medianSelector({ ...points, raw: larColumns(raw) })).toBe(2);
 
     raw.push(LARPointFactory.build({ normalizedLoans: 8 }));
-    expect(medianSelector({ ...points, raw: [...raw] })).toBe(2);
+    expect(medianSelector({ ...points, raw: larColumns(raw) })).toBe(2);
 
     raw.push(LARPointFactory.build({ normalizedLoans: 16 }));
-    expect(medianSelector({ ...points, raw: [...raw] })).toBe(4);
+    expect(medianSelector({ ...points, raw: larColumns(raw) })).toBe(4);
   });
 });
 
 describe("scatterPlotSelector", () => {
-  it("transforms the data", () => {
-    const raw = [
+  it("transforms the data into flat arrays", () => {
+    const raw = larColumns([
       LARPointFactory.build({
         houseCount: 1000,
         latitude: 11,
@@ -77,24 +78,20 @@ describe("scatterPlotSelector", () => {
       }),
       LARPointFactory.build({
         houseCount: 2000,
-        latitude: 33.33,
+        latitude: 33.5,
         loanCount: 5,
-        longitude: 44.44,
+        longitude: 44.25,
       }),
-    ];
+    ]);
     const points = PointsFactory.build({ raw, scaleFactor: 21 });
 
     const circles = scatterPlotSelector(points);
     const median = 4 / 1000;
-    expect(circles).toEqual([
-      {
-        position: [22, 11],
-        radius: Math.sqrt(4 / 1000 * 21 * 4000 / median) / Math.PI,
-      },
-      {
-        position: [44.44, 33.33],
-        radius: Math.sqrt(5 / 2000 * 21 * 4000 / median) / Math.PI,
-      },
-    ]);
+    expect(circles.length).toBe(2);
+    expect(Array.from(circles.positions)).toEqual([22, 11, 0, 44.25, 33.5, 0]);
+    expect(circles.radii[0]).toBeCloseTo(
+      Math.sqrt(4 / 1000 * 21 * 4000 / median) / Math.PI, 4);
+    expect(circles.radii[1]).toBeCloseTo(
+      Math.sqrt(5 / 2000 * 21 * 4000 / median) / Math.PI, 4);
   });
 });
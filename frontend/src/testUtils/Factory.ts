@@ -3,6 +3,7 @@ import * as Random from "random-js";
 import { Factory } from "rosie";
 
 import { Geo } from "../apis/geography";
+import { GEOID_LENGTH, LARColumns } from "../apis/lar";
 import { allChoropleths, allFeatures } from "../mapStyle";
 import { GeoId, LenderId } from "../store/Lar/Lookups";
 import { SAFE_INIT as uiOnlyInit } from "../store/Lar/UIOnly";
@@ -25,7 +26,7 @@ export const WindowFactory = new Factory().attrs({
 });
 
 export const LARPointFactory = new Factory().attrs({
-  geoid: () => random.string(15, "0123456789"),
+  geoid: () => random.string(GEOID_LENGTH, "0123456789"),
   houseCount: () => random.integer(1, 10000),
   latitude: randLat,
   loanCount: () => random.integer(1, 100),
@@ -37,6 +38,28 @@ export const LARPointFactory = new Factory().attrs({
   (houseCount, loanCount) => houseCount ? loanCount / houseCount : 0,
 );
 
+/*
+ * Columns (as decodeLar returns) holding points built by LARPointFactory.
+ */
+export function larColumns(points: any[]): LARColumns {
+  const geoids = new Uint8Array(points.length * GEOID_LENGTH);
+  points.forEach((point, idx) => {
+    point.geoid.split("").forEach((chr, chrIdx) => {
+      geoids[idx * GEOID_LENGTH + chrIdx] = chr.charCodeAt(0);
+    });
+  });
+  return {
+    geoids,
+    houseCount: new Uint32Array(points.map(point => point.houseCount)),
+    latitude: new Float32Array(points.map(point => point.latitude)),
+    length: points.length,
+    loanCount: new Uint32Array(points.map(point => point.loanCount)),
+    longitude: new Float32Array(points.map(point => point.longitude)),
+    normalizedLoans:
+      new Float32Array(points.map(point => point.normalizedLoans)),
+  };
+}
+
 export const FiltersFactory = new Factory().attrs({
   county: () => Set([random.string(15, "0123456789")]),
   lender: () => Set([random.string(15, "0123456789")]),
@@ -66,7 +89,7 @@ export const LookupsFactory = new Factory().attrs({
 });
 
 export const PointsFactory = new Factory().attrs({
-  raw: () => [],
+  raw: () => larColumns([]),
   scaleFactor: () => random.integer(0, 50),
 });
 
@@ -1,7 +1,38 @@
+from typing import Tuple
+
 import django_filters
+from django import forms
+from django.contrib.gis.geos import Polygon
 from django.contrib.postgres.search import TrigramSimilarity
 
-from geo.models import CoreBasedStatisticalArea, County
+from geo.models import CoreBasedStatisticalArea, County, Tract
+
+
+class BBoxField(forms.CharField):
+    """A "west,south,east,north" bounding box, in degrees."""
+
+    def clean(self, value) -> Tuple[float, ...]:
+        value = super().clean(value)
+        if not value:
+            return ()
+        try:
+            bbox = tuple(float(coord) for coord in value.split(","))
+        except ValueError:
+            raise forms.ValidationError("Coordinates must be numbers")
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise forms.ValidationError("Expected west,south,east,north")
+        return bbox
+
+
+class BBoxFilter(django_filters.Filter):
+    """Geometries whose bounding boxes overlap the requested one. That's
+    answered by the spatial index on geom alone."""
+    field_class = BBoxField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return qs.filter(geom__bboverlaps=Polygon.from_bbox(value))
 
 
 def filter_to_search_term(queryset, name, value):
@@ -12,6 +43,7 @@ def filter_to_search_term(queryset, name, value):
 
 
 class CBSAFilters(django_filters.FilterSet):
+    bbox = BBoxFilter()
     q = django_filters.CharFilter(method=filter_to_search_term)
 
     class Meta:
@@ -20,8 +52,17 @@ class CBSAFilters(django_filters.FilterSet):
 
 
 class CountyFilters(django_filters.FilterSet):
+    bbox = BBoxFilter()
     q = django_filters.CharFilter(method=filter_to_search_term)
 
     class Meta:
         model = County
         fields = {"geoid": ["in"], "state": ["exact"]}
+
+
+class TractFilters(django_filters.FilterSet):
+    bbox = BBoxFilter()
+
+    class Meta:
+        model = Tract
+        fields = {"geoid": ["in"], "county": ["exact"]}
@@ -1,72 +1,144 @@
-"""This logic has been removed but will return soon.
 import json
-from typing import Dict, Iterator, Set
+import logging
+import os
+from typing import Dict, Iterator, List, Optional, Tuple, Type
 
-from django.core.management.base import BaseCommand
-from django.core.paginator import Paginator
+from django.contrib.gis.db.models import GeometryField
+from django.contrib.gis.db.models.functions import AsGeoJSON
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Func, Value
 from tqdm import tqdm
 
-from geo.models import CensusTract, TractProperty
+from geo.models import (
+    CoreBasedStatisticalArea, County, geom_field_for_tolerance, GeoModel,
+    Tract,
+)
 
+logger = logging.getLogger(__name__)
+LAYERS: Dict[str, Type[GeoModel]] = {
+    "cbsa": CoreBasedStatisticalArea,
+    "county": County,
+    "tract": Tract,
+}
+# Row: (geoid, name, GeoJSON geometry)
+Row = Tuple[str, str, str]
 
-def tracts(relations: Set[str]) -> Iterator[CensusTract]:
-    # All census tracts, joined with property data and wrapped in a tqdm
-    # progress bar.
-    queryset = CensusTract.objects.all().order_by('pk')
 
-    if relations:
-        queryset = queryset.select_related(*relations)
+class SimplifyPreserveTopology(Func):
+    function = "ST_SimplifyPreserveTopology"
+    output_field = GeometryField()
 
-    # Use pagination to reduce stutter when starting
-    paginator = Paginator(queryset, 100)
-    with tqdm(total=paginator.count) as pbar:
-        for page_idx in range(paginator.num_pages):
-            for tract in paginator.page(page_idx + 1):
-                yield tract
-                pbar.update()
 
+def pages(model: Type[GeoModel], tolerance: float, page_size: int,
+          after: str = "") -> Iterator[List[Row]]:
+    """Simplified geometries, as GeoJSON built by the database, a page at a
+    time, simplified from the coarsest stored geometry that's precise
+    enough. Pages are keyed on the last geoid seen rather than an offset, so
+    later pages cost no more than earlier ones."""
+    queryset = model.objects\
+        .annotate(geojson=AsGeoJSON(
+            SimplifyPreserveTopology(
+                F(geom_field_for_tolerance(tolerance)), Value(tolerance)),
+            precision=6,
+        ))\
+        .order_by("pk")
+    while True:
+        page = list(queryset.filter(pk__gt=after)
+                    .values_list("pk", "name", "geojson")[:page_size])
+        if not page:
+            return
+        yield page
+        after = page[-1][0]
 
-def to_geojson(tract: CensusTract, properties: Set[str],
-               bool_as_int: bool = False) -> Dict[str, str]:
-    # Convert a CensusTract into GeoJSON, including requested properties.
-    geojson = {
-        'id': int(tract.pk),  # tippecanoe won't tolerate string pks
-        'geometry': json.loads(tract.geom.simplify().geojson),
-        'properties': {},
-        'type': 'Feature',
-    }
-    for relation in properties:
-        if hasattr(tract, relation):
-            value = getattr(tract, relation).value
-            if isinstance(value, bool) and bool_as_int:
-                value = int(value)
-            geojson['properties'][relation] = value
-    return geojson
+
+def to_lines(rows: List[Row]) -> str:
+    """Newline-delimited GeoJSON features. The geometry's already JSON, so
+    it's spliced in rather than re-parsed."""
+    return "".join(
+        '{"type": "Feature", "id": %d, "geometry": %s, "properties": %s}\n'
+        # tippecanoe won't tolerate string ids
+        % (int(geoid), geojson, json.dumps({"geoid": geoid, "name": name}))
+        for geoid, name, geojson in rows
+    )
+
+
+class Checkpoint:
+    """Records how far an export has gotten: the last geoid written and the
+    output file's size at that point."""
+
+    def __init__(self, path: str, layer: str, tolerance: float):
+        self.path = path
+        self.settings = {"layer": layer, "tolerance": tolerance}
+
+    def load(self) -> Optional[Dict]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as checkpoint_file:
+            state = json.load(checkpoint_file)
+        for key, value in self.settings.items():
+            if state[key] != value:
+                raise CommandError(
+                    f"Checkpoint was for {key}={state[key]}; use --restart")
+        return state
+
+    def save(self, last_pk: str, offset: int):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as checkpoint_file:
+            json.dump({**self.settings, "last_pk": last_pk,
+                       "offset": offset}, checkpoint_file)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
 
 
 class Command(BaseCommand):
-    help = "Output all census tracts and associated features as GeoJSON"
+    help = ("Export geographies as newline-delimited GeoJSON (e.g. for "
+            "tippecanoe), resuming from a checkpoint if one exists")
 
     def add_arguments(self, parser):
+        parser.add_argument("output", help="File to write")
+        parser.add_argument("--layer", choices=list(LAYERS), default="tract")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.0001,
+            help="Simplification tolerance, in degrees",
+        )
+        parser.add_argument("--page-size", type=int, default=1000)
         parser.add_argument(
-            '--bool-as-int', action='store_const', const=True, default=False,
-            help='convert booleans to integers (helpful for mapbox filters)',
+            "--restart", action="store_true",
+            help="Ignore any checkpoint and start from scratch",
         )
 
     def handle(self, *args, **options):
-        self.stdout.write('{')
-        self.stdout.write('"type": "FeatureCollection",')
-        self.stdout.write('"features": [')
-
-        relations = set(
-            TractProperty.objects.values_list('relation_field', flat=True))
-
-        for idx, tract in enumerate(tracts(relations)):
-            if idx != 0:    # end the previous tract's line
-                self.stdout.write(',')
-            geojson = to_geojson(tract, relations, options['bool_as_int'])
-            self.stdout.write(json.dumps(geojson), ending='')
-
-        self.stdout.write(']')
-        self.stdout.write('}')
-"""
+        output = options["output"]
+        checkpoint = Checkpoint(
+            f"{output}.checkpoint", options["layer"], options["tolerance"])
+        state = None if options["restart"] else checkpoint.load()
+        if state and not os.path.exists(output):
+            logger.warning("%s is missing; starting from scratch", output)
+            state = None
+        model = LAYERS[options["layer"]]
+
+        if state:
+            logger.info("Resuming after %s", state["last_pk"])
+            out_file = open(output, "r+")
+            out_file.truncate(state["offset"])  # drop any partial writes
+            out_file.seek(state["offset"])
+            after = state["last_pk"]
+        else:
+            out_file = open(output, "w")
+            after = ""
+
+        page_iter = pages(model, options["tolerance"], options["page_size"],
+                          after)
+        total = model.objects.filter(pk__gt=after).count()
+        with out_file, tqdm(total=total) as pbar:
+            for page in page_iter:
+                last_pk, lines = page[-1][0], to_lines(page)
+                out_file.write(lines)
+                out_file.flush()
+                os.fsync(out_file.fileno())
+                checkpoint.save(last_pk, out_file.tell())
+                pbar.update(lines.count("\n"))
+        checkpoint.clear()
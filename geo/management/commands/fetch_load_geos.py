@@ -1,8 +1,9 @@
 import logging
+from concurrent.futures import as_completed, ProcessPoolExecutor
 from datetime import date
 from functools import partial
 from os.path import basename
-from typing import Callable, Iterator
+from typing import Callable, Iterator, List, Optional
 
 import requests
 import us
@@ -11,12 +12,17 @@ from django.contrib.gis.gdal.feature import Feature
 from django.contrib.gis.gdal.layer import Layer
 from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
 from django.core.management.base import BaseCommand
+from django.db import connections
 from tqdm import tqdm
 
 from geo.models import (
     CoreBasedStatisticalArea, County, MetroDivision, State, Tract)
-from mapusaurus.batch_utils import DjangoModel, save_batches
-from mapusaurus.fetch_zip import fetch_and_unzip_dir
+from geo.tiles import invalidate_tiles
+from mapusaurus.batch_utils import (
+    add_writer_arguments, DjangoModel, FilterFn, KeySetFilter, save_batches)
+from mapusaurus.fetch_zip import (
+    add_cache_arguments, download_cache, fetch_and_unzip_dir, is_cached,
+    is_offline)
 
 ZIP_TPL = ("https://www2.census.gov/geo/tiger/TIGER{year}/{shape}/"
            "tl_{year}_{state}_{shape_lower}.zip")
@@ -41,15 +47,21 @@ def parse_layer(file_name: str) -> Layer:
 
 
 def load_shapes(url: str, replace: bool, batch_size: int,
-                parse_fn: Callable[[Layer], Iterator[DjangoModel]]):
+                parse_fn: Callable[[Layer], Iterator[DjangoModel]],
+                filter_fn: Optional[FilterFn] = None,
+                writers: int = 0) -> bool:
+    """Returns whether the shapes could be retrieved."""
     try:
         with fetch_and_unzip_dir(url) as dir_path:
             shp_name = basename(url)[:-len(".zip")] + ".shp"
             layer = parse_layer(str(dir_path / shp_name))
             models = parse_fn(layer)
-            save_batches(models, replace, batch_size=batch_size)
+            save_batches(models, replace, filter_fn, batch_size=batch_size,
+                         writers=writers)
+        return True
     except requests.exceptions.RequestException:
         logger.exception("Problem retrieving %s", url)
+        return False
 
 
 def load_geometry(feature: Feature) -> MultiPolygon:
@@ -144,15 +156,67 @@ def parse_tracts(layer: Layer, state: us.states.State) -> Iterator[Tract]:
         yield model
 
 
+def load_state_tracts(year: int, fips: str, replace: bool,
+                      writers: int = 0) -> bool:
+    """Load one state's tracts. Run in a worker process when loading in
+    parallel, so it's addressed by picklable values."""
+    state = us.states.lookup(fips)
+    return load_shapes(
+        tract_tpl(year=year, state=fips), replace, 100,
+        partial(parse_tracts, state=state),
+        KeySetFilter(county_id=County.objects.filter(state_id=fips)),
+        writers,
+    )
+
+
+def load_tracts(states: List[us.states.State], year: int, replace: bool,
+                jobs: int = 1, writers: int = 0) -> List[us.states.State]:
+    """Load tracts for each state, `jobs` states at a time. Each worker
+    downloads, parses and saves with its own database connection. A state
+    which fails doesn't stop the others; we return those that failed."""
+    failed = []
+    if jobs > 1:
+        # Forked workers mustn't share our database socket
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {
+                pool.submit(load_state_tracts, year, state.fips, replace,
+                            writers):
+                state for state in states
+            }
+            for future in tqdm(as_completed(futures), total=len(futures),
+                               desc="Tracts by State"):
+                state = futures[future]
+                try:
+                    if not future.result():
+                        failed.append(state)
+                except Exception:
+                    logger.exception("Couldn't load tracts for %s", state)
+                    failed.append(state)
+    else:
+        for state in tqdm(states, desc="Tracts by State"):
+            try:
+                if not load_state_tracts(year, state.fips, replace,
+                                         writers):
+                    failed.append(state)
+            except Exception:
+                logger.exception("Couldn't load tracts for %s", state)
+                failed.append(state)
+    return failed
+
+
 def default_year() -> int:
     """Try the current year of TIGER files, but use last year if it"s not
-    published yet."""
+    published yet. A cached copy is proof enough, and all we can go on
+    offline."""
     this_year = date.today().year
-    response = requests.head(state_tpl(year=this_year))
-    if response.status_code == requests.codes.ok:
+    url = state_tpl(year=this_year)
+    if is_cached(url):
         return this_year
-    else:
-        return this_year - 1
+    if not is_offline() \
+            and requests.head(url).status_code == requests.codes.ok:
+        return this_year
+    return this_year - 1
 
 
 class Command(BaseCommand):
@@ -191,26 +255,43 @@ class Command(BaseCommand):
             state_shapes=True, cbsa_shapes=True, county_shapes=True,
             tract_shapes=True,
         )
+        parser.add_argument(
+            "--jobs", type=int, default=1,
+            help="Number of states' tracts to load in parallel",
+        )
+        add_writer_arguments(parser)
+        add_cache_arguments(parser)
 
     def handle(self, *args, **options):
-        year, replace = options["year"], options["replace"]
-        if year is None:
-            year = default_year()
-        relevant_fips = {state.fips for state in options["states"]}
-
-        if options["state_shapes"]:
-            load_shapes(state_tpl(year=year), replace, 10,
-                        partial(parse_states, only_states=relevant_fips))
-        if options["cbsa_shapes"]:
-            load_shapes(cbsa_tpl(year=year), replace, 100, parse_cbsas)
-        if options["metdiv_shapes"]:
-            load_shapes(metdiv_tpl(year=year), replace, 100, parse_metdivs)
-        if options["county_shapes"]:
-            load_shapes(county_tpl(year=year), replace, 100,
-                        partial(parse_counties, only_states=relevant_fips))
-
-        if options["tract_shapes"]:
-            for state in tqdm(options["states"], desc="Tracts by State"):
-                load_shapes(tract_tpl(year=year, state=state.fips), replace,
-                            100, partial(parse_tracts, state=state))
-            logger.info("Loaded tracts for %s states", len(options["states"]))
+        with download_cache(options["cache_dir"], options["offline"]):
+            year, replace = options["year"], options["replace"]
+            writers = options["writers"]
+            if year is None:
+                year = default_year()
+            relevant_fips = {state.fips for state in options["states"]}
+
+            if options["state_shapes"]:
+                load_shapes(state_tpl(year=year), replace, 10,
+                            partial(parse_states, only_states=relevant_fips),
+                            writers=writers)
+            if options["cbsa_shapes"]:
+                load_shapes(cbsa_tpl(year=year), replace, 100, parse_cbsas,
+                            writers=writers)
+            if options["metdiv_shapes"]:
+                load_shapes(metdiv_tpl(year=year), replace, 100, parse_metdivs,
+                            writers=writers)
+            if options["county_shapes"]:
+                load_shapes(county_tpl(year=year), replace, 100,
+                            partial(parse_counties, only_states=relevant_fips),
+                            KeySetFilter(state_id=State.objects.all()),
+                            writers)
+
+            if options["tract_shapes"]:
+                failed = load_tracts(options["states"], year, replace,
+                                     options["jobs"], writers)
+                logger.info("Loaded tracts for %s states",
+                            len(options["states"]) - len(failed))
+                if failed:
+                    logger.error("Failed to load tracts for: %s",
+                                 ", ".join(state.name for state in failed))
+                invalidate_tiles()
@@ -0,0 +1,82 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+TABLES = [
+    "geo_state",
+    "geo_corebasedstatisticalarea",
+    "geo_metrodivision",
+    "geo_county",
+    "geo_tract",
+]
+
+
+def generalize_sql(table):
+    return f"""
+        UPDATE {table} SET
+            geom_low = ST_Multi(ST_SimplifyPreserveTopology(geom, 0.01)),
+            geom_mid = ST_Multi(ST_SimplifyPreserveTopology(geom, 0.001))
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0002_auto_20190120_0352'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='state',
+            name='geom_low',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='state',
+            name='geom_mid',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='corebasedstatisticalarea',
+            name='geom_low',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='corebasedstatisticalarea',
+            name='geom_mid',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='metrodivision',
+            name='geom_low',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='metrodivision',
+            name='geom_mid',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='county',
+            name='geom_low',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='county',
+            name='geom_mid',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='tract',
+            name='geom_low',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.AddField(
+            model_name='tract',
+            name='geom_mid',
+            field=django.contrib.gis.db.models.fields.MultiPolygonField(blank=True, null=True, srid=4326),
+        ),
+        migrations.RunSQL(
+            [generalize_sql(table) for table in TABLES],
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0003_generalized_geoms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TileGeneration',
+            fields=[
+                ('year', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('generation', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
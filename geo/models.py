@@ -2,14 +2,50 @@ from typing import Union
 
 import us
 from django.contrib.gis.db import models
+from django.contrib.gis.geos import GEOSGeometry, MultiPolygon, Polygon
 from django.core.validators import RegexValidator
 from django.db.models import QuerySet
 
+# Coarser copies of each geometry, coarsest first: (field, simplification
+# tolerance in degrees, highest zoom level it's detailed enough for). Each
+# tolerance is under a pixel at its max zoom.
+GENERALIZATIONS = (
+    ("geom_low", 0.01, 6),
+    ("geom_mid", 0.001, 10),
+)
+
+
+def geom_field_for_zoom(zoom: int) -> str:
+    """The least detailed geometry field which suffices at a zoom level."""
+    for field, _, max_zoom in GENERALIZATIONS:
+        if zoom <= max_zoom:
+            return field
+    return "geom"
+
+
+def geom_field_for_tolerance(tolerance: float) -> str:
+    """The least detailed geometry field at least as precise as
+    `tolerance` (in degrees)."""
+    for field, field_tolerance, _ in GENERALIZATIONS:
+        if field_tolerance <= tolerance:
+            return field
+    return "geom"
+
+
+def generalize(geom: GEOSGeometry, tolerance: float) -> MultiPolygon:
+    simplified = geom.simplify(tolerance, preserve_topology=True)
+    if isinstance(simplified, Polygon):
+        return MultiPolygon(simplified)
+    return simplified
+
 
 class GeoModel(models.Model):
     """Base for new geo models."""
     name = models.CharField(max_length=64)
     geom = models.MultiPolygonField()
+    # See GENERALIZATIONS
+    geom_low = models.MultiPolygonField(blank=True, null=True)
+    geom_mid = models.MultiPolygonField(blank=True, null=True)
     interior_lat = models.FloatField()
     interior_lon = models.FloatField()
     min_lat = models.FloatField()
@@ -21,16 +57,11 @@ class GeoModel(models.Model):
         abstract = True
 
     def autofields(self):
-        points = [point
-                  for polygon in self.geom.coords
-                  for line in polygon
-                  for point in line]
-        lons, lats = zip(*points)   # unzips into pairs
-
-        self.min_lat = min(lats)
-        self.max_lat = max(lats)
-        self.min_lon = min(lons)
-        self.max_lon = max(lons)
+        # GEOS computes the envelope without building Python coordinates
+        self.min_lon, self.min_lat, self.max_lon, self.max_lat = \
+            self.geom.extent
+        for field, tolerance, _ in GENERALIZATIONS:
+            setattr(self, field, generalize(self.geom, tolerance))
 
 
 class State(GeoModel):
@@ -99,3 +130,12 @@ class Tract(GeoModel):
     county = models.ForeignKey(County, models.CASCADE)
     tract_only = models.CharField(
         validators=[RegexValidator(r"\d{6}")], max_length=6)
+
+
+class TileGeneration(models.Model):
+    """A counter per year of LAR data (0 for all years), bumped when that
+    data changes, which names cached tiles. Years without a row share the
+    all-years counter. It lives in the database, not the cache, so a bump
+    by a loader is seen by every web process."""
+    year = models.PositiveSmallIntegerField(primary_key=True)
+    generation = models.PositiveIntegerField(default=0)
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from geo.models import CoreBasedStatisticalArea, County
+from geo.models import CoreBasedStatisticalArea, County, Tract
 
 
 class PointsSerializer(serializers.ModelSerializer):
@@ -33,3 +33,9 @@ class CountySerializer(PointsSerializer):
     class Meta:
         model = County
         fields = ("geoid", "name", "points", "state")
+
+
+class TractSerializer(PointsSerializer):
+    class Meta:
+        model = Tract
+        fields = ("geoid", "name", "points", "county")
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+from django.core.management import call_command
+
+from geo.management.commands import as_geojson
+from geo.tests.factories import CountyFactory
+
+
+def test_to_lines():
+    lines = as_geojson.to_lines([
+        ("01001", "First", '{"type": "Point", "coordinates": [1, 2]}'),
+        ("01002", "Second", '{"type": "Point", "coordinates": [3, 4]}'),
+    ])
+    features = [json.loads(line) for line in lines.splitlines()]
+    assert features[0] == {
+        "type": "Feature",
+        "id": 1001,
+        "geometry": {"type": "Point", "coordinates": [1, 2]},
+        "properties": {"geoid": "01001", "name": "First"},
+    }
+    assert features[1]["id"] == 1002
+
+
+@pytest.mark.django_db
+def test_handle(tmpdir):
+    geoids = sorted(c.geoid for c in CountyFactory.create_batch(5))
+    output = tmpdir.join("counties.json")
+
+    call_command("as_geojson", str(output), "--layer", "county",
+                 "--page-size", "2")
+
+    features = [json.loads(line) for line in output.readlines()]
+    assert [f["properties"]["geoid"] for f in features] == geoids
+    assert features[0]["geometry"]["type"] == "MultiPolygon"
+    assert not tmpdir.join("counties.json.checkpoint").exists()
+
+
+@pytest.mark.django_db
+def test_handle_resumes(tmpdir):
+    geoids = sorted(c.geoid for c in CountyFactory.create_batch(5))
+    output = tmpdir.join("counties.json")
+    first_line = '{"made": "up"}\n'
+    output.write(first_line + '{"partial": ')
+    checkpoint = as_geojson.Checkpoint(
+        str(output) + ".checkpoint", "county", 0.0001)
+    checkpoint.save(geoids[0], len(first_line))
+
+    call_command("as_geojson", str(output), "--layer", "county")
+
+    lines = output.readlines()
+    assert lines[0] == first_line
+    assert [json.loads(line)["properties"]["geoid"] for line in lines[1:]] \
+        == geoids[1:]
+
+
+@pytest.mark.django_db
+def test_handle_resumes_without_output(tmpdir):
+    geoids = sorted(c.geoid for c in CountyFactory.create_batch(3))
+    output = tmpdir.join("counties.json")
+    checkpoint = as_geojson.Checkpoint(
+        str(output) + ".checkpoint", "county", 0.0001)
+    checkpoint.save(geoids[0], 100)
+
+    call_command("as_geojson", str(output), "--layer", "county")
+
+    assert [json.loads(line)["properties"]["geoid"]
+            for line in output.readlines()] == geoids
@@ -10,6 +10,7 @@ from django.core.management import call_command
 from freezegun import freeze_time
 
 from geo.management.commands import fetch_load_geos
+from mapusaurus.fetch_zip import download_cache
 
 
 def test_load_shapes_shapefile(monkeypatch):
@@ -198,8 +199,16 @@ def test_default_year_past(responses):
         assert fetch_load_geos.default_year() == 2016
 
 
+def test_default_year_offline(responses, tmpdir):
+    with freeze_time("2017-02-03"), \
+            download_cache(str(tmpdir), offline=True):
+        assert fetch_load_geos.default_year() == 2016
+    assert len(responses.calls) == 0
+
+
 def test_fetch_flags(monkeypatch):
     monkeypatch.setattr(fetch_load_geos, "load_shapes", Mock())
+    monkeypatch.setattr(fetch_load_geos, "invalidate_tiles", Mock())
     call_command(
         "fetch_load_geos",
         "--state", "17", "DC", "Puerto Rico",
@@ -212,12 +221,15 @@ def test_fetch_flags(monkeypatch):
     calls = fetch_load_geos.load_shapes.call_args_list
     urls = [call[0][0] for call in calls]
     assert all("2014" in url for url in urls)
+    # New tracts mean new tiles for every year
+    assert fetch_load_geos.invalidate_tiles.call_args == call()
 
 
 def test_fetch_flags_default(monkeypatch):
     monkeypatch.setattr(fetch_load_geos, "load_shapes", Mock())
     monkeypatch.setattr(
         fetch_load_geos, "default_year", Mock(return_value=2016))
+    monkeypatch.setattr(fetch_load_geos, "invalidate_tiles", Mock())
 
     call_command("fetch_load_geos")
 
@@ -226,3 +238,17 @@ def test_fetch_flags_default(monkeypatch):
     calls = fetch_load_geos.load_shapes.call_args_list
     urls = [call[0][0] for call in calls]
     assert all("2016" in url for url in urls)
+
+
+@pytest.mark.parametrize("jobs", (1, 2))
+def test_load_tracts_isolates_failures(monkeypatch, jobs):
+    def load_shapes(url, *args):
+        if "_11_" in url:
+            raise ValueError("Invalid geometry")
+        return "_72_" not in url
+    monkeypatch.setattr(fetch_load_geos, "load_shapes", load_shapes)
+    states = [us.states.IL, us.states.DC, us.states.PR, us.states.MD]
+
+    failed = fetch_load_geos.load_tracts(states, 2014, False, jobs)
+
+    assert sorted(state.abbr for state in failed) == ["DC", "PR"]
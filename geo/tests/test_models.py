@@ -0,0 +1,44 @@
+import pytest
+from django.contrib.gis.geos import MultiPolygon, Polygon
+
+from geo import models
+from geo.models import State
+
+
+def test_autofields():
+    state = State(geom=MultiPolygon(
+        Polygon(((0, 0), (0, 2), (-1, 2), (0, 0))),
+        Polygon(((3, -1), (4, -1), (4, 1), (3, -1))),
+    ))
+    state.autofields()
+    assert (state.min_lon, state.max_lon) == (-1, 4)
+    assert (state.min_lat, state.max_lat) == (-1, 2)
+
+
+def test_autofields_generalizes():
+    # A square with a tiny notch in one side
+    state = State(geom=MultiPolygon(Polygon((
+        (0, 0), (0.5, 0), (0.5, 0.0005), (0.5005, 0), (1, 0), (1, 1), (0, 1),
+        (0, 0),
+    ))))
+    state.autofields()
+    assert isinstance(state.geom_low, MultiPolygon)
+    assert state.geom_low.num_coords == 5
+    assert state.geom_mid.num_coords == 5
+    assert state.geom.num_coords == 8
+
+
+@pytest.mark.parametrize("zoom, field", (
+    (2, "geom_low"), (6, "geom_low"), (7, "geom_mid"), (10, "geom_mid"),
+    (11, "geom"), (18, "geom"),
+))
+def test_geom_field_for_zoom(zoom, field):
+    assert models.geom_field_for_zoom(zoom) == field
+
+
+@pytest.mark.parametrize("tolerance, field", (
+    (0.1, "geom_low"), (0.01, "geom_low"), (0.005, "geom_mid"),
+    (0.0001, "geom"),
+))
+def test_geom_field_for_tolerance(tolerance, field):
+    assert models.geom_field_for_tolerance(tolerance) == field
@@ -0,0 +1,125 @@
+from unittest.mock import Mock
+
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from geo import tiles
+from geo.models import TileGeneration
+from geo.tests.factories import TractFactory
+from hmda.models import LARCube
+from hmda.tests.factories import LARFactory
+
+client = APIClient()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    tiles._generations.clear()
+
+
+def test_tile_bounds():
+    assert tiles.tile_bounds(0, 0, 0) == pytest.approx((
+        -tiles.ORIGIN_SHIFT, -tiles.ORIGIN_SHIFT,
+        tiles.ORIGIN_SHIFT, tiles.ORIGIN_SHIFT,
+    ))
+    assert tiles.tile_bounds(1, 1, 0) == pytest.approx((
+        0, 0, tiles.ORIGIN_SHIFT, tiles.ORIGIN_SHIFT))
+
+
+def test_valid_tile():
+    assert tiles.valid_tile(0, 0, 0)
+    assert tiles.valid_tile(3, 7, 7)
+    assert not tiles.valid_tile(3, 8, 0)
+    assert not tiles.valid_tile(3, 0, -1)
+
+
+@pytest.mark.django_db
+def test_invalidate_tiles():
+    tiles.invalidate_tiles(2014)
+    before_year = tiles.cache_key(8, 1, 2, 2013, "")
+    before_other = tiles.cache_key(8, 1, 2, 2014, "")
+    before_all = tiles.cache_key(8, 1, 2, None, "")
+
+    tiles.invalidate_tiles(2013)
+
+    assert tiles.cache_key(8, 1, 2, 2013, "") != before_year
+    assert tiles.cache_key(8, 1, 2, 2014, "") == before_other
+    assert tiles.cache_key(8, 1, 2, None, "") != before_all
+
+
+@pytest.mark.django_db
+def test_invalidate_all_tiles():
+    tiles.invalidate_tiles(2013)
+    years = (2013, 2014, None)  # 2014's never been bumped on its own
+    before = {year: tiles.generation(year) for year in years}
+
+    tiles.invalidate_tiles()
+
+    after = {year: tiles.generation(year) for year in years}
+    for year in years:
+        assert after[year] > before[year]
+    # A year's first bump moves it on from the generation it shared
+    tiles.invalidate_tiles(2014)
+    assert tiles.generation(2014) > after[2014]
+
+
+@pytest.mark.django_db
+def test_generation_read_once_per_ttl(monkeypatch, django_assert_num_queries):
+    monkeypatch.setattr(tiles, "monotonic", Mock(return_value=100.0))
+    with django_assert_num_queries(1):
+        tiles.generation(2013)
+        tiles.generation(2013)
+
+    tiles.monotonic.return_value += tiles.GENERATION_TTL
+    with django_assert_num_queries(1):
+        tiles.generation(2013)
+
+
+@pytest.mark.django_db
+def test_invalidation_seen_by_other_processes(monkeypatch):
+    """A loader bumps the generation without touching the web process's
+    (per-process) cache; the web process must still re-render, once its
+    copy of the generation expires."""
+    monkeypatch.setattr(tiles, "render_tile", Mock(return_value=b"tile"))
+    monkeypatch.setattr(tiles, "monotonic", Mock(return_value=100.0))
+    client.get("/api/tiles/8/1/2.mvt")
+    client.get("/api/tiles/8/1/2.mvt")
+    assert tiles.render_tile.call_count == 1
+
+    # As from another process: only the database is shared
+    TileGeneration.objects.create(year=0, generation=1)
+    client.get("/api/tiles/8/1/2.mvt")
+    assert tiles.render_tile.call_count == 1
+
+    tiles.monotonic.return_value += tiles.GENERATION_TTL
+    client.get("/api/tiles/8/1/2.mvt")
+    assert tiles.render_tile.call_count == 2
+
+
+def test_tile_view_bad_requests():
+    assert client.get("/api/tiles/2/4/0.mvt").status_code == 404
+    assert client.get("/api/tiles/2/0/0.mvt", {"year": "2013"})\
+        .status_code == 400
+
+
+@pytest.mark.django_db
+def test_tile_view():
+    # The example geometry's near (0, 0) lat/lon
+    tract = TractFactory(geoid="11111111111")
+    lars = LARFactory.create_batch(3, tract=tract, as_of_year=2013)
+    LARCube.rebuild_all()
+
+    result = client.get("/api/tiles/8/128/127.mvt")
+    assert result.status_code == 200
+    assert result["Content-Type"] == "application/vnd.mapbox-vector-tile"
+    assert tiles.LAYER_NAME.encode("utf-8") in result.content
+    assert b"11111111111" in result.content
+
+    result = client.get(
+        "/api/tiles/8/128/127.mvt", {"lender": lars[0].institution_id})
+    assert b"normalized_loans" in result.content
+
+    assert client.get("/api/tiles/8/0/0.mvt").content == b""
+    assert client.get("/api/tiles/4/8/7.mvt").content == b""
@@ -1,7 +1,8 @@
 import pytest
+from django.contrib.gis.geos import MultiPolygon, Polygon
 from rest_framework.test import APIClient
 
-from geo.tests.factories import CBSAFactory, CountyFactory
+from geo.tests.factories import CBSAFactory, CountyFactory, TractFactory
 
 client = APIClient()
 
@@ -30,3 +31,34 @@ def test_search_county_name():
     result = client.get("/api/county/", {"q": "Coo"})
     geoids = {geo["geoid"] for geo in result.data["results"]}
     assert cook.pk in geoids
+
+
+def _square(west, south):
+    return MultiPolygon(Polygon.from_bbox((west, south, west + 1, south + 1)))
+
+
+@pytest.mark.django_db
+def test_county_bbox():
+    near = CountyFactory(geom=_square(-88, 41))
+    CountyFactory(geom=_square(-80, 41))
+
+    result = client.get("/api/county/", {"bbox": "-87.5,41.5,-87,42"})
+    assert [geo["geoid"] for geo in result.data["results"]] == [near.pk]
+
+    result = client.get("/api/county/", {"bbox": "-87.5,41.5,-87"})
+    assert result.status_code == 400
+
+
+@pytest.mark.django_db
+def test_tract_bbox_keyset_pages():
+    tracts = TractFactory.create_batch(150, geom=_square(-88, 41))
+    TractFactory(geom=_square(-80, 41))
+    bbox = "-88.5,40.5,-87.5,41.5"
+
+    result = client.get("/api/tract/", {"bbox": bbox})
+    first_page = [geo["geoid"] for geo in result.data["results"]]
+    result = client.get(result.data["next"])
+    second_page = [geo["geoid"] for geo in result.data["results"]]
+
+    assert first_page + second_page == sorted(t.pk for t in tracts)
+    assert result.data["next"] is None
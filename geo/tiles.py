@@ -0,0 +1,129 @@
+"""Mapbox vector tiles of census tracts, optionally carrying LAR volume."""
+import hashlib
+import math
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+from django.db import connection
+from django.db.models import QuerySet
+
+from geo.models import geom_field_for_zoom, TileGeneration
+
+EXTENT = 4096       # tile coordinate space, per the MVT spec
+BUFFER = 64
+MIN_ZOOM = 8        # below this, tracts are too small to be worth drawing
+LAYER_NAME = "tracts"
+# Half the circumference of the earth in web mercator (EPSG:3857) meters
+ORIGIN_SHIFT = math.pi * 6378137
+GENERATION_TTL = 5  # seconds
+# year -> (when it was read, generation)
+_generations: Dict[int, Tuple[float, int]] = {}
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Web mercator (xmin, ymin, xmax, ymax) of a z/x/y tile."""
+    size = 2 * ORIGIN_SHIFT / 2 ** z
+    xmin = -ORIGIN_SHIFT + x * size
+    ymax = ORIGIN_SHIFT - y * size
+    return (xmin, ymax - size, xmin + size, ymax)
+
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def render_tile(z: int, x: int, y: int,
+                lar: Optional[QuerySet] = None) -> bytes:
+    """Encode the tracts within a tile. Geometries are simplified to roughly
+    a pixel at this zoom. If given, `lar` should be a (values) queryset of
+    tract_id, volume and normalized_loans, which are attached to each
+    tract."""
+    if z < MIN_ZOOM:
+        return b""
+    bounds = tile_bounds(z, x, y)
+    tolerance = (bounds[2] - bounds[0]) / EXTENT
+    params = list(bounds) + [tolerance]
+    # Draw from a generalized copy where one's detailed enough
+    geom_field = geom_field_for_zoom(z)
+    lar_cte, lar_columns, lar_join = "", "", ""
+    if lar is not None:
+        lar_sql, lar_params = lar.query.sql_with_params()
+        lar_cte = f"lar AS ({lar_sql}),"
+        lar_columns = ", lar.volume, lar.normalized_loans"
+        lar_join = "LEFT JOIN lar ON (lar.tract_id = tract.geoid)"
+        params = list(lar_params) + params
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH {lar_cte}
+            bounds AS (SELECT ST_MakeEnvelope(%s, %s, %s, %s, 3857) AS geom)
+            SELECT ST_AsMVT(tile, '{LAYER_NAME}', {EXTENT}, 'mvtgeom')
+            FROM (
+                SELECT
+                    tract.geoid{lar_columns},
+                    ST_AsMVTGeom(
+                        ST_SimplifyPreserveTopology(
+                            ST_Transform(tract.{geom_field}, 3857), %s),
+                        bounds.geom, {EXTENT}, {BUFFER}, true
+                    ) AS mvtgeom
+                FROM geo_tract tract
+                CROSS JOIN bounds
+                {lar_join}
+                WHERE tract.geom && ST_Transform(bounds.geom, 4326)
+            ) tile
+            WHERE mvtgeom IS NOT NULL
+        """, params)
+        tile = cursor.fetchone()[0]
+    return bytes(tile or b"")
+
+
+def generation(year: Optional[int]) -> int:
+    """The generation naming `year`'s tiles. A year which has never been
+    bumped on its own shares the all-years generation. Each process reuses
+    what it last read for GENERATION_TTL seconds, rather than querying per
+    tile, so a bump from elsewhere takes that long to be seen."""
+    year = year or 0
+    now = monotonic()
+    read_at, current = _generations.get(year, (None, 0))
+    if read_at is None or now - read_at >= GENERATION_TTL:
+        current = TileGeneration.objects.filter(year__in={year, 0})\
+            .order_by("-year").values_list("generation", flat=True)\
+            .first() or 0
+        _generations[year] = (now, current)
+    return current
+
+
+def invalidate_tiles(year: Optional[int] = None):
+    """Tiles are cached under a per-year generation number; bumping it
+    orphans every tile built from that year's (or all years') data. With no
+    `year`, e.g. as the tracts themselves have changed, every year's is
+    bumped. A year's first bump starts it past the all-years generation it
+    had been sharing, so it never reuses an old name."""
+    with connection.cursor() as cursor:
+        if year is None:
+            cursor.execute("""
+                UPDATE geo_tilegeneration SET generation = generation + 1
+                WHERE year <> 0
+            """)
+        else:
+            cursor.execute("""
+                INSERT INTO geo_tilegeneration (year, generation)
+                SELECT %s, COALESCE(MAX(generation), 0) + 1
+                FROM geo_tilegeneration WHERE year = 0
+                ON CONFLICT (year) DO UPDATE
+                SET generation = geo_tilegeneration.generation + 1
+            """, [year])
+        cursor.execute("""
+            INSERT INTO geo_tilegeneration (year, generation)
+            VALUES (0, 1)
+            ON CONFLICT (year) DO UPDATE
+            SET generation = geo_tilegeneration.generation + 1
+        """)
+    _generations.clear()
+
+
+def cache_key(z: int, x: int, y: int, year: Optional[int],
+              filters: str) -> str:
+    """`filters` is a canonical encoding of the LAR filters, if any."""
+    digest = hashlib.md5(filters.encode("utf-8")).hexdigest()
+    return f"tiles:{generation(year)}:{year or 'all'}:{z}:{x}:{y}:{digest}"
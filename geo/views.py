@@ -0,0 +1,48 @@
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, JsonResponse)
+from django.views.decorators.cache import cache_control
+
+from geo import tiles
+from hmda.filters import LARFilters
+from hmda.models import LARCube
+
+TILE_TIMEOUT = 60 * 60 * 24
+# LAR filters which only shape lists of tracts. Tiles ignore them, so they
+# neither change a tile nor split its cache entries.
+LIST_ONLY_FILTERS = ("limit", "ordering", "min_volume")
+
+
+@cache_control(max_age=0)   # cached (and invalidated) below, not per-URL
+def tile(request, z: str, x: str, y: str):
+    """Vector tile of census tracts. If a lender's specified, LAR filters
+    (as with /api/lar/) are applied and tracts carry volume and
+    normalized_loans."""
+    zoom, col, row = int(z), int(x), int(y)
+    if not tiles.valid_tile(zoom, col, row):
+        raise Http404("No such tile")
+
+    params = request.GET.copy()
+    for name in LIST_ONLY_FILTERS:
+        params.pop(name, None)
+    lar, year = None, None
+    if params.get("lender"):
+        filterset = LARFilters(params, queryset=LARCube.objects.all())
+        if not filterset.is_valid():
+            return JsonResponse(filterset.errors, status=400)
+        lar = filterset.qs
+        if filterset.form.cleaned_data.get("year") is not None:
+            year = int(filterset.form.cleaned_data["year"])
+    elif params:
+        return HttpResponseBadRequest("LAR filters require a lender")
+
+    filters = urlencode(sorted(params.items()))
+    key = tiles.cache_key(zoom, col, row, year, filters)
+    content = cache.get(key)
+    if content is None:
+        content = tiles.render_tile(zoom, col, row, lar)
+        cache.set(key, content, TILE_TIMEOUT)
+    return HttpResponse(
+        content, content_type="application/vnd.mapbox-vector-tile")
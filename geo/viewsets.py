@@ -1,11 +1,35 @@
 from rest_framework import viewsets
+from rest_framework.pagination import CursorPagination
 
-from geo.filters import CBSAFilters, CountyFilters
-from geo.models import CoreBasedStatisticalArea, County
-from geo.serializers import CBSASerializer, CountySerializer
+from geo.filters import CBSAFilters, CountyFilters, TractFilters
+from geo.models import CoreBasedStatisticalArea, County, Tract
+from geo.serializers import (
+    CBSASerializer, CountySerializer, TractSerializer)
 
 
-class MetroViewSet(viewsets.ReadOnlyModelViewSet):
+class GeoidCursorPagination(CursorPagination):
+    """Keyset pagination: each page picks up after the last geoid seen, so
+    deep pages cost no more than the first."""
+    ordering = "geoid"
+    page_size = 100
+
+
+class BBoxPaginationMixin:
+    """Queries by bbox may cover many geographies; page through those by
+    keyset. Others (e.g. searches, ordered by relevance) keep the default
+    pagination."""
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            if self.request.query_params.get("bbox"):
+                self._paginator = GeoidCursorPagination()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+
+class MetroViewSet(BBoxPaginationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = CoreBasedStatisticalArea.objects\
         .filter(metro=True)\
         .order_by("name")
@@ -13,7 +37,14 @@ class MetroViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = CBSAFilters
 
 
-class CountyViewSet(viewsets.ReadOnlyModelViewSet):
+class CountyViewSet(BBoxPaginationMixin, viewsets.ReadOnlyModelViewSet):
     queryset = County.objects.order_by("name")
     serializer_class = CountySerializer
     filterset_class = CountyFilters
+
+
+class TractViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Tract.objects.order_by("geoid")
+    serializer_class = TractSerializer
+    filterset_class = TractFilters
+    pagination_class = GeoidCursorPagination
@@ -1,11 +1,13 @@
 from typing import Tuple
 
 import django_filters
-from django.db.models import Count, Sum
+from django import forms
+from django.db.models import ExpressionWrapper, F, FloatField, Func, Sum, Value
+from django.db.models.functions import Cast, Coalesce
 
 from hmda.models import (
-    ACTION_TAKEN_CHOICES, LIEN_STATUS_CHOICES, LOAN_PURPOSE_CHOICES,
-    LoanApplicationRecord, OWNER_OCCUPANCY_CHOICES, PROPERTY_TYPE_CHOICES,
+    ACTION_TAKEN_CHOICES, LARCube, LIEN_STATUS_CHOICES, LOAN_PURPOSE_CHOICES,
+    OWNER_OCCUPANCY_CHOICES, PROPERTY_TYPE_CHOICES,
 )
 
 
@@ -19,6 +21,23 @@ class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
     pass
 
 
+class IntegerFilter(django_filters.NumberFilter):
+    field_class = forms.IntegerField
+
+
+class NullIf(Func):
+    function = "NULLIF"
+
+
+ORDERING_CHOICES = (
+    ("tract_id", "Tract"),
+    ("volume", "Volume"),
+    ("-volume", "Volume, descending"),
+    ("normalized_loans", "Loans per household"),
+    ("-normalized_loans", "Loans per household, descending"),
+)
+
+
 class LARFilters(django_filters.FilterSet):
     action_taken = ChoiceInFilter(choices=ACTION_TAKEN_CHOICES,
                                   lookup_expr="in")
@@ -34,9 +53,14 @@ class LARFilters(django_filters.FilterSet):
     year = django_filters.NumberFilter(method="filter_year")
     county = CharInFilter(field_name="tract__county_id", lookup_expr="in")
     metro = CharInFilter(field_name="tract__county__cbsa_id", lookup_expr="in")
+    # These apply to the aggregated rows, so are handled in `qs`
+    ordering = django_filters.ChoiceFilter(
+        choices=ORDERING_CHOICES, method="after_aggregation")
+    limit = IntegerFilter(min_value=1, method="after_aggregation")
+    min_volume = IntegerFilter(min_value=0, method="after_aggregation")
 
     class Meta:
-        model = LoanApplicationRecord
+        model = LARCube
         fields: Tuple[str, ...] = ()
 
     @property
@@ -44,12 +68,30 @@ class LARFilters(django_filters.FilterSet):
         queryset = super().qs\
             .values("tract_id", "tract__interior_lat", "tract__interior_lon")\
             .annotate(
-                volume=Count("tract_id"),
-                num_households=Sum("tract__demographics__households"),
+                volume=Sum("num_records"),
+                # as though summed per LAR record
+                num_households=Sum(
+                    F("num_records") * F("tract__demographics__households")),
             )\
-            .order_by("tract_id")
+            .annotate(normalized_loans=Coalesce(
+                ExpressionWrapper(
+                    Cast("volume", FloatField())
+                    / NullIf(F("num_households"), Value(0)),
+                    output_field=FloatField(),
+                ),
+                Value(0.0),
+            ))
+        params = self.form.cleaned_data
+        if params.get("min_volume"):
+            queryset = queryset.filter(volume__gte=params["min_volume"])
+        queryset = queryset.order_by(params.get("ordering") or "tract_id",
+                                     "tract_id")
+        if params.get("limit"):
+            queryset = queryset[:params["limit"]]
+        return queryset
+
+    def after_aggregation(self, queryset, field, value):
         return queryset
 
     def filter_year(self, queryset, field, value):
-        return queryset.filter(
-            as_of_year=value, tract__demographics__year=value)
+        return queryset.filter(year=value, tract__demographics__year=value)
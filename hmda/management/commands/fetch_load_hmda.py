@@ -5,11 +5,14 @@ import requests
 from django.core.management.base import BaseCommand
 from tqdm import tqdm
 
-from hmda.management.commands.load_hmda import (filter_by_fks, load_from_csv,
-                                                update_num_loans)
-from hmda.models import LARYear
+from hmda import partitions
+from hmda.management.commands.load_hmda import (
+    CONFLICT_FIELDS, copy_batches, fk_filter, lar_mode, load_from_csv,
+    rebuild_summaries, update_num_loans,
+)
 from mapusaurus.batch_utils import save_batches
-from mapusaurus.fetch_zip import fetch_and_unzip_file
+from mapusaurus.fetch_zip import (
+    add_cache_arguments, download_cache, fetch_and_unzip_file)
 
 logger = logging.getLogger(__name__)
 FILE_URLS = {}
@@ -32,18 +35,42 @@ class Command(BaseCommand):
         parser.add_argument("--year", type=int, nargs="*", default=choices,
                             choices=choices,
                             help="Years to download. Defaults to >=2012")
-        parser.add_argument("--replace", action="store_true")
+        parser.add_argument(
+            "--replace", action="store_true",
+            help="Replace existing records which are also in the file",
+        )
+        parser.add_argument(
+            "--replace-years", action="store_true",
+            help="Replace each year wholesale, deleting that year's records "
+                 "which aren't in its file. Implies --copy",
+        )
+        parser.add_argument(
+            "--copy", action="store_true",
+            help="Bulk load via COPY and a staging table",
+        )
+        add_cache_arguments(parser)
 
     def handle(self, *args, **options):
-        year_pbar = tqdm(options["year"])
-        for year in year_pbar:
-            year_pbar.set_description(f"{year}")
-            try:
-                with fetch_and_unzip_file(FILE_URLS[year]) as lar_file:
-                    models = load_from_csv(TextIOWrapper(lar_file, "utf-8"))
-                    save_batches(models, options["replace"], filter_by_fks,
-                                 batch_size=10000)
-            except requests.exceptions.RequestException:
-                logger.exception("Couldn't process year %s", year)
-        update_num_loans()
-        LARYear.rebuild_all()
+        with download_cache(options["cache_dir"], options["offline"]):
+            year_pbar = tqdm(options["year"])
+            loaded = set()
+            for year in year_pbar:
+                year_pbar.set_description(f"{year}")
+                try:
+                    with fetch_and_unzip_file(FILE_URLS[year]) as lar_file:
+                        models = load_from_csv(
+                            TextIOWrapper(lar_file, "utf-8"))
+                        if options["copy"] or options["replace_years"]:
+                            copy_batches(models, options["replace"],
+                                         options["replace_years"])
+                        else:
+                            partitions.create_partition(year)
+                            save_batches(models, options["replace"],
+                                         fk_filter(), batch_size=10000,
+                                         mode=lar_mode(options["replace"]),
+                                         conflict_fields=CONFLICT_FIELDS)
+                    loaded.add(year)
+                except requests.exceptions.RequestException:
+                    logger.exception("Couldn't process year %s", year)
+            update_num_loans(loaded)
+            rebuild_summaries(loaded)
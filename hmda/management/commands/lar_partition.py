@@ -0,0 +1,49 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hmda import partitions
+from hmda.management.commands.load_hmda import (
+    rebuild_summaries, update_num_loans)
+
+logger = logging.getLogger(__name__)
+ACTIONS = {
+    "create": partitions.create_partition,
+    "attach": partitions.attach_partition,
+    "detach": partitions.detach_partition,
+    "drop": partitions.drop_partition,
+}
+
+
+class Command(BaseCommand):
+    help = "Manage the per-year partitions of the LAR table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "action", choices=list(ACTIONS),
+            help="create: give a year its own partition; "
+                 "attach: re-attach a detached year's table; "
+                 "detach: keep a year's rows in a standalone table; "
+                 "drop: delete a year's rows",
+        )
+        parser.add_argument("year", type=int)
+
+    def handle(self, *args, **options):
+        action, year = options["action"], options["year"]
+        attached = year in partitions.attached_years()
+        if action == "create" and attached:
+            logger.info("%s already has a partition", year)
+            return
+        if action == "attach" and attached:
+            raise CommandError(f"{year} is already attached")
+        if action == "detach" and not attached:
+            raise CommandError(f"{year} has no attached partition")
+        if action in ("attach", "drop") and not partitions.table_exists(
+                partitions.partition_name(year)):
+            raise CommandError(f"There's no table for {year}")
+
+        ACTIONS[action](year)
+        logger.info("%s: %s", action, partitions.partition_name(year))
+        if action != "create":
+            update_num_loans([year])
+            rebuild_summaries([year])
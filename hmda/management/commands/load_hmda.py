@@ -1,91 +1,313 @@
 import argparse
 import csv
 import logging
-from typing import Iterator, List, TextIO
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import StringIO
+from itertools import chain
+from typing import (
+    Any, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set,
+    TextIO,
+)
 
-from django.core.management.base import BaseCommand
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from django.db.models.expressions import RawSQL
 from tqdm import tqdm
 
 from geo import errors
 from geo.models import Tract
-from hmda.models import LARYear, LoanApplicationRecord
-from mapusaurus.batch_utils import save_batches
+from geo.tiles import invalidate_tiles
+from hmda import partitions
+from hmda.models import LARCube, LARYear, LoanApplicationRecord
+from mapusaurus.batch_utils import (
+    add_writer_arguments, batches, KeySetFilter, save_batch, save_pipelined)
+from mapusaurus.batch_validation import BatchValidator
 from reports.models import DisparityReport, LenderReport
 from respondents.models import Institution
 
 logger = logging.getLogger(__name__)
+STAGING_TABLE = "hmda_lar_staging"
+CHUNK_SIZE = 16 * 1024 * 1024
+# The partitioned table's primary key, as the year's needed to find a row
+CONFLICT_FIELDS = ("hmda_record_id", "as_of_year")
+validator = BatchValidator(
+    LoanApplicationRecord, exclude=["tract", "institution"])
+
+
+def parse_row(row: List[str], idx: int) -> Dict[str, Any]:
+    """Convert a single LAR CSV row into (unvalidated) model field values.
+    `idx` is the row's zero-indexed position in the file; it stands in for a
+    missing sequence number."""
+    as_of_year = int(row[0])
+    respondent_id = row[1].strip()
+    agency_code = row[2].strip()
+    sequence_number = (row[37] or str(idx)).zfill(8)
+    institution_id = f"{as_of_year}{agency_code}{respondent_id}"
+    tract_id = row[11] + row[12] + row[13].replace(".", "")
+    return {
+        "as_of_year": as_of_year,
+        "respondent_id": respondent_id,
+        "agency_code": agency_code,
+        "loan_type": row[3].strip(),
+        "property_type": int(row[4]),
+        "loan_purpose": int(row[5]),
+        "owner_occupancy": int(row[6]),
+        "loan_amount_000s": int(row[7] or "0"),
+        "preapproval": row[8].strip(),
+        "action_taken": int(row[9]),
+        "applicant_ethnicity": row[14].strip(),
+        "co_applicant_ethnicity": row[15].strip(),
+        "applicant_race_1": row[16].strip(),
+        "applicant_race_2": row[17].strip(),
+        "applicant_race_3": row[18].strip(),
+        "applicant_race_4": row[19].strip(),
+        "applicant_race_5": row[20].strip(),
+        "co_applicant_race_1": row[21].strip(),
+        "co_applicant_race_2": row[22].strip(),
+        "co_applicant_race_3": row[23].strip(),
+        "co_applicant_race_4": row[24].strip(),
+        "co_applicant_race_5": row[25].strip(),
+        "applicant_sex": int(row[26]),
+        "co_applicant_sex": int(row[27]),
+        "applicant_income_000s": (
+            None if row[28].strip() == "NA" else int(row[28])),
+        "purchaser_type": row[29].strip(),
+        "denial_reason_1": row[30].strip(),
+        "denial_reason_2": row[31].strip(),
+        "denial_reason_3": row[32].strip(),
+        "rate_spread": row[33].strip(),
+        "hoepa_status": row[34].strip(),
+        "lien_status": row[35].strip(),
+        "edit_status": row[36].strip(),
+        "sequence_number": sequence_number,
+        "application_date_indicator": 0,
+        "tract_id": errors.change_specific_year(tract_id, as_of_year),
+        "institution_id": institution_id,
+        "hmda_record_id": institution_id + sequence_number,
+    }
+
+
+def parse_rows(rows: Iterator[List[str]],
+               first_idx: int = 0) -> Iterator[LoanApplicationRecord]:
+    """Parse and validate CSV rows a batch at a time. Models are only built
+    for rows which pass validation; we stop at the first which doesn't."""
+    for batch in batches(enumerate(rows, first_idx), 10000):
+        values = [parse_row(row, idx) for idx, row in batch]
+        invalid = validator.validate(values)
+        if invalid:
+            bad_idx = min(invalid)
+            logger.error("Invalid LAR on line %s", batch[bad_idx][0] + 1)
+            raise ValidationError(invalid[bad_idx])
+        yield from (LoanApplicationRecord(**value) for value in values)
 
 
 def load_from_csv(csv_file: TextIO) -> Iterator[LoanApplicationRecord]:
     pbar = tqdm(csv.reader(csv_file), unit=" records")
-    for idx, row in enumerate(pbar):
-        record = LoanApplicationRecord(
-            as_of_year=int(row[0]),
-            respondent_id=row[1].strip(),
-            agency_code=row[2].strip(),
-            loan_type=row[3].strip(),
-            property_type=int(row[4]),
-            loan_purpose=int(row[5]),
-            owner_occupancy=int(row[6]),
-            loan_amount_000s=int(row[7] or "0"),
-            preapproval=row[8].strip(),
-            action_taken=int(row[9]),
-            applicant_ethnicity=row[14].strip(),
-            co_applicant_ethnicity=row[15].strip(),
-            applicant_race_1=row[16].strip(),
-            applicant_race_2=row[17].strip(),
-            applicant_race_3=row[18].strip(),
-            applicant_race_4=row[19].strip(),
-            applicant_race_5=row[20].strip(),
-            co_applicant_race_1=row[21].strip(),
-            co_applicant_race_2=row[22].strip(),
-            co_applicant_race_3=row[23].strip(),
-            co_applicant_race_4=row[24].strip(),
-            co_applicant_race_5=row[25].strip(),
-            applicant_sex=int(row[26]),
-            co_applicant_sex=int(row[27]),
-            applicant_income_000s=(
-                None if row[28].strip() == "NA" else int(row[28])),
-            purchaser_type=row[29].strip(),
-            denial_reason_1=row[30].strip(),
-            denial_reason_2=row[31].strip(),
-            denial_reason_3=row[32].strip(),
-            rate_spread=row[33].strip(),
-            hoepa_status=row[34].strip(),
-            lien_status=row[35].strip(),
-            edit_status=row[36].strip(),
-            sequence_number=(row[37] or str(idx)).zfill(8),
-            application_date_indicator=0,
-        )
-        tract_id = row[11] + row[12] + row[13].replace(".", "")
-        tract_id = errors.change_specific_year(tract_id, record.as_of_year)
-        record.tract_id = tract_id
-        record.institution_id = f"{record.as_of_year}{record.agency_code}"
-        record.institution_id += record.respondent_id
-        record.hmda_record_id = record.institution_id + record.sequence_number
-        record.full_clean(
-            exclude=["tract", "institution"], validate_unique=False)
-        yield record
-
-
-def filter_by_fks(
-        batch: List[LoanApplicationRecord]) -> List[LoanApplicationRecord]:
+    return parse_rows(pbar)
+
+
+class Chunk(NamedTuple):
+    path: str
+    start: int
+    end: int
+    first_idx: int  # zero-indexed row number of the chunk's first line
+
+
+def chunk_file(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Chunk]:
+    """Split a file into byte ranges which end on line boundaries. We count
+    the lines in each so that generated sequence numbers match those of a
+    serial load. Assumes no newlines within quoted fields, which holds for
+    LAR files."""
+    with open(path, "rb") as data_file:
+        start, first_idx = 0, 0
+        while True:
+            data = data_file.read(chunk_size)
+            if not data:
+                return
+            data += data_file.readline()    # finish the current line
+            yield Chunk(path, start, start + len(data), first_idx)
+            start += len(data)
+            first_idx += data.count(b"\n")
+
+
+def parse_chunk(chunk: Chunk) -> List[LoanApplicationRecord]:
+    """Parse and validate the rows in a byte range. Runs in a worker
+    process."""
+    with open(chunk.path, "rb") as data_file:
+        data_file.seek(chunk.start)
+        text = data_file.read(chunk.end - chunk.start).decode("utf-8")
+    rows = csv.reader(StringIO(text))
+    return list(parse_rows(rows, chunk.first_idx))
+
+
+def is_regular_file(data_file: TextIO) -> bool:
+    """Whether we can split the file by name and offset, as
+    parse_in_parallel does."""
+    name = getattr(data_file, "name", "")    # e.g. "<stdin>"
+    return data_file.seekable() and os.path.isfile(name)
+
+
+def parse_in_parallel(
+        path: str, workers: int) -> Iterator[List[LoanApplicationRecord]]:
+    """Parse a LAR file in a pool of processes, yielding batches of models in
+    file order. At most two chunks per worker are in flight at once."""
+    with ProcessPoolExecutor(workers) as pool, \
+            tqdm(unit=" records") as pbar:
+        pending: Deque[Future] = deque()
+        for chunk in chunk_file(path):
+            pending.append(pool.submit(parse_chunk, chunk))
+            if len(pending) >= workers * 2:
+                models = pending.popleft().result()
+                pbar.update(len(models))
+                yield from batches(iter(models), 10000)
+        while pending:
+            models = pending.popleft().result()
+            pbar.update(len(models))
+            yield from batches(iter(models), 10000)
+
+
+def fk_filter() -> KeySetFilter:
     """We don"t want to insert records with no associated census tract or no
-    associated bank."""
-    tract_ids = set(
-        Tract.objects.filter(pk__in={m.tract_id for m in batch})
-        .values_list("pk", flat=True).distinct(),
-    )
-    inst_ids = set(Institution.objects
-                   .filter(pk__in={m.institution_id for m in batch})
-                   .values_list("pk", flat=True).distinct())
-    return [m for m in batch
-            if m.tract_id in tract_ids and m.institution_id in inst_ids]
-
-
-def update_num_loans():
-    Institution.objects.update(num_loans=RawSQL("""
+    associated bank. All their keys are loaded once, per load."""
+    return KeySetFilter(tract_id=Tract.objects.all(),
+                        institution_id=Institution.objects.all())
+
+
+def lar_mode(replace: bool) -> str:
+    """The save_batch mode for loading LAR records. They have no dependents,
+    so replacing them can update them in place rather than deleting and
+    re-inserting them."""
+    return "upsert" if replace else "skip"
+
+
+def copy_value(value: Any) -> str:
+    """Format a single value for PostgreSQL's COPY text format."""
+    if value is None:
+        return r"\N"
+    return str(value)\
+        .replace("\\", "\\\\")\
+        .replace("\t", "\\t")\
+        .replace("\n", "\\n")\
+        .replace("\r", "\\r")
+
+
+def copy_batches(models: Iterator[LoanApplicationRecord],
+                 replace: bool = False, replace_years: bool = False,
+                 batch_size: int = 10000) -> Set[int]:
+    """Stream records into a temporary staging table via COPY, then move them
+    into the LAR table with a set-based INSERT per year. Like fk_filter,
+    records with no associated census tract or no associated bank are
+    dropped, but as part of that INSERT's joins. Existing records are kept
+    or, when replacing, updated. With `replace_years`, each year in the file
+    is instead loaded into a fresh table which is then swapped in as that
+    year's partition, i.e. the file is taken to hold complete years and
+    records it doesn't mention are deleted. Where the file repeats a record,
+    its last occurrence wins. Returns the years loaded."""
+    fields = LoanApplicationRecord._meta.concrete_fields
+    columns = ", ".join(field.column for field in fields)
+    staged_columns = ", ".join(f"staging.{field.column}" for field in fields)
+    conflict = f"ON CONFLICT ({', '.join(CONFLICT_FIELDS)}) DO "
+    if replace:
+        conflict += "UPDATE SET " + ", ".join(
+            f"{field.column} = EXCLUDED.{field.column}" for field in fields
+            if field.name not in CONFLICT_FIELDS)
+    else:
+        conflict += "NOTHING"
+
+    def insert_from_staging(cursor, table: str, year: int, conflict: str):
+        cursor.execute(f"""
+            INSERT INTO {table} ({columns})
+            SELECT DISTINCT ON (staging.hmda_record_id) {staged_columns}
+            FROM {STAGING_TABLE} staging
+            INNER JOIN geo_tract tract
+                ON (tract.geoid = staging.tract_id)
+            INNER JOIN respondents_institution inst
+                ON (inst.institution_id = staging.institution_id)
+            WHERE staging.as_of_year = %s
+            ORDER BY staging.hmda_record_id, staging.seq DESC
+            {conflict}
+        """, [year])
+        logger.info("Inserted %s records for %s", cursor.rowcount, year)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE {STAGING_TABLE} (
+                LIKE hmda_loanapplicationrecord INCLUDING DEFAULTS,
+                seq bigserial
+            )
+        """)
+        for batch in batches(models, batch_size):
+            buff = StringIO()
+            for model in batch:
+                buff.write("\t".join(copy_value(getattr(model, field.attname))
+                                     for field in fields))
+                buff.write("\n")
+            buff.seek(0)
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} ({columns}) FROM STDIN", buff)
+
+        cursor.execute(f"SELECT DISTINCT as_of_year FROM {STAGING_TABLE}")
+        years = {row[0] for row in cursor.fetchall()}
+        for year in sorted(years):
+            if replace_years:
+                load_table = f"{partitions.partition_name(year)}_load"
+                partitions.create_load_table(load_table, year)
+                insert_from_staging(cursor, load_table, year, "")
+                partitions.swap_partition(year, load_table)
+            else:
+                partitions.create_partition(year)
+                insert_from_staging(
+                    cursor, "hmda_loanapplicationrecord", year, conflict)
+        cursor.execute(f"DROP TABLE {STAGING_TABLE}")
+    return years
+
+
+def note_years(batch: List[LoanApplicationRecord],
+               years: Set[int]) -> List[LoanApplicationRecord]:
+    """Record which years a batch covers, passing it through unchanged."""
+    years.update(model.as_of_year for model in batch)
+    return batch
+
+
+def partitioned(model_batches: Iterator[List[LoanApplicationRecord]],
+                years: Set[int]) -> Iterator[List[LoanApplicationRecord]]:
+    """Make sure the years of the first batch (usually the file's only year)
+    have partitions before any batch is written, so no DDL runs while
+    writers are busy. Years first seen later land in the default partition
+    until the load is done; see create_partitions."""
+    first = next(model_batches, [])
+    for year in {model.as_of_year for model in first}:
+        partitions.create_partition(year)
+    return (note_years(batch, years)
+            for batch in chain([first], model_batches))
+
+
+def create_partitions(years: Iterable[int]):
+    """Once all writers are done, give each year loaded its own partition,
+    moving across any of its rows which landed in the default one."""
+    for year in sorted(years):
+        partitions.create_partition(year)
+
+
+def rebuild_summaries(years: Iterable[int]):
+    """Recompute the per-year aggregates for only the years we've loaded."""
+    for year in sorted(years):
+        logger.info("Rebuilding summaries for %s", year)
+        LARYear.rebuild_year(year)
+        LARCube.rebuild_year(year)
+        DisparityReport.rebuild_year(year)
+        LenderReport.rebuild_year(year)
+        invalidate_tiles(year)
+
+
+def update_num_loans(years: Optional[Iterable[int]] = None):
+    institutions = Institution.objects.all()
+    if years is not None:
+        institutions = institutions.filter(year__in=years)
+    institutions.update(num_loans=RawSQL("""
         SELECT count(*)
         FROM hmda_loanapplicationrecord
         WHERE hmda_loanapplicationrecord.institution_id =
@@ -98,16 +320,56 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("file_name", type=argparse.FileType("r"))
-        parser.add_argument("--replace", action="store_true")
+        parser.add_argument(
+            "--replace", action="store_true",
+            help="Replace existing records which are also in the file",
+        )
+        parser.add_argument(
+            "--replace-years", action="store_true",
+            help="Replace each year in the file wholesale, deleting that "
+                 "year's records which aren't in the file. Swaps in a new "
+                 "partition per year, so implies --copy",
+        )
+        parser.add_argument(
+            "--copy", action="store_true",
+            help="Bulk load via COPY and a staging table",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=1,
+            help="Number of processes parsing the file (and, without --copy "
+                 "or --writers, threads writing to the database)",
+        )
+        add_writer_arguments(parser)
 
     def handle(self, *args, **options):
-        models = load_from_csv(options["file_name"])
-        save_batches(models, options["replace"], filter_by_fks,
-                     batch_size=10000)
+        workers, replace = options["workers"], options["replace"]
+        if workers > 1 and not is_regular_file(options["file_name"]):
+            raise CommandError(
+                "--workers needs a file it can split, not a pipe or stdin")
+        if workers > 1:
+            model_batches = parse_in_parallel(
+                options["file_name"].name, workers)
+        else:
+            model_batches = batches(load_from_csv(options["file_name"]),
+                                    10000)
+        if options["copy"] or options["replace_years"]:
+            years = copy_batches(chain.from_iterable(model_batches), replace,
+                                 options["replace_years"])
+        else:
+            years = set()
+            model_batches = partitioned(model_batches, years)
+            filter_fn = fk_filter()
+            mode = lar_mode(replace)
+            writers = options["writers"] or (workers if workers > 1 else 0)
+            if writers:
+                save_pipelined(model_batches, replace, filter_fn, mode,
+                               conflict_fields=CONFLICT_FIELDS,
+                               writers=writers)
+            else:
+                for batch in model_batches:
+                    save_batch(batch, replace, filter_fn, mode,
+                               conflict_fields=CONFLICT_FIELDS)
+            create_partitions(years)
         options["file_name"].close()
-        update_num_loans()
-        LARYear.rebuild_all()
-        logger.info("Rebuilding disparity report materialized view")
-        DisparityReport.rebuild_all()
-        logger.info("Rebuilding lender report materialized view")
-        LenderReport.rebuild_all()
+        update_num_loans(years)
+        rebuild_summaries(years)
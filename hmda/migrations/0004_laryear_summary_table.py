@@ -0,0 +1,34 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hmda', '0003_auto_20190218_2203'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "ALTER MATERIALIZED VIEW hmda_laryear RENAME TO hmda_laryear_mv",
+            "ALTER MATERIALIZED VIEW hmda_laryear_mv RENAME TO hmda_laryear",
+        ),
+        migrations.RunSQL(
+            "CREATE TABLE hmda_laryear AS SELECT * FROM hmda_laryear_mv",
+            "DROP TABLE hmda_laryear",
+        ),
+        migrations.RunSQL(
+            "DROP MATERIALIZED VIEW hmda_laryear_mv",
+            """
+                CREATE MATERIALIZED VIEW hmda_laryear_mv
+                AS (
+                    SELECT as_of_year AS year
+                    FROM hmda_loanapplicationrecord
+                    GROUP BY as_of_year
+                )
+            """,
+        ),
+        migrations.RunSQL(
+            "ALTER TABLE hmda_laryear ADD PRIMARY KEY (year)",
+            "ALTER TABLE hmda_laryear DROP CONSTRAINT hmda_laryear_pkey",
+        ),
+    ]
@@ -0,0 +1,96 @@
+from django.db import migrations
+
+TABLE = "hmda_loanapplicationrecord"
+FK_SUFFIX = "_fk_%(to_table)s_%(to_column)s"
+
+
+def constraint_statements(apps, schema_editor):
+    """The indexes and foreign keys Django would create for the LAR model,
+    under the same names, so later migrations can find them."""
+    model = apps.get_model("hmda", "LoanApplicationRecord")
+    foreign_keys = [
+        schema_editor._create_fk_sql(
+            model, model._meta.get_field(name), FK_SUFFIX)
+        for name in ("institution", "tract")
+    ]
+    return schema_editor._model_indexes_sql(model), foreign_keys
+
+
+def add_constraints(primary_key):
+    def add(apps, schema_editor):
+        indexes, foreign_keys = constraint_statements(apps, schema_editor)
+        schema_editor.execute(f"""
+            ALTER TABLE {TABLE}
+            ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY ({primary_key})
+        """)
+        for statement in indexes + foreign_keys:
+            schema_editor.execute(str(statement))
+    return add
+
+
+def drop_constraints(apps, schema_editor):
+    indexes, foreign_keys = constraint_statements(apps, schema_editor)
+    for statement in foreign_keys:
+        schema_editor.execute(f"""
+            ALTER TABLE {TABLE} DROP CONSTRAINT {statement.parts['name']}
+        """)
+    for statement in indexes:
+        schema_editor.execute(f"DROP INDEX {statement.parts['name']}")
+    schema_editor.execute(f"ALTER TABLE {TABLE} DROP CONSTRAINT {TABLE}_pkey")
+
+
+def copy_into_partitions(apps, schema_editor):
+    """Create a partition per year already loaded, then move the rows."""
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT as_of_year FROM {TABLE}_old")
+        for row in cursor.fetchall():
+            year = int(row[0])
+            cursor.execute(f"""
+                CREATE TABLE {TABLE}_{year} PARTITION OF {TABLE}
+                FOR VALUES IN ({year})
+            """)
+        cursor.execute(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_old")
+
+
+def copy_out_of_partitions(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {TABLE}_old SELECT * FROM {TABLE}")
+
+
+class Migration(migrations.Migration):
+    """Postgres (11+) requires the partition key be part of the primary key,
+    so the database-level key becomes (hmda_record_id, as_of_year). As the
+    year prefixes hmda_record_id, that's no less strict.
+
+    Constraints are added once the old table, and with it the old
+    constraints' names, are gone."""
+
+    dependencies = [
+        ('hmda', '0004_laryear_summary_table'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            migrations.RunPython.noop, add_constraints("hmda_record_id")),
+        migrations.RunSQL(
+            f"ALTER TABLE {TABLE} RENAME TO {TABLE}_old",
+            f"ALTER TABLE {TABLE}_old RENAME TO {TABLE}",
+        ),
+        migrations.RunSQL(
+            [
+                f"""
+                CREATE TABLE {TABLE} (LIKE {TABLE}_old INCLUDING DEFAULTS)
+                PARTITION BY LIST (as_of_year)
+                """,
+                f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT",
+            ],
+            f"DROP TABLE {TABLE}",
+        ),
+        migrations.RunPython(copy_into_partitions, copy_out_of_partitions),
+        migrations.RunSQL(
+            f"DROP TABLE {TABLE}_old",
+            f"CREATE TABLE {TABLE}_old (LIKE {TABLE} INCLUDING DEFAULTS)",
+        ),
+        migrations.RunPython(
+            add_constraints("hmda_record_id, as_of_year"), drop_constraints),
+    ]
@@ -0,0 +1,89 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('geo', '0002_auto_20190120_0352'),
+        ('hmda', '0005_partition_lar_by_year'),
+        ('respondents', '0001_squashed_0014_auto_20181229_0439'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LARCube',
+            fields=[
+                ('compound_id', models.CharField(max_length=35, primary_key=True, serialize=False)),
+                ('year', models.SmallIntegerField()),
+                ('action_taken', models.PositiveIntegerField(choices=[(1, 'Loan originated'), (2, 'Application approved but not accepted'), (3, 'Application denied by financial institution'), (4, 'Application withdrawn by applicant'), (5, 'File closed for incompleteness'), (6, 'Loan purchased by the institution'), (7, 'Preapproval request denied by financial institution'), (8, 'Preapproval request approved but not accepted (optional reporting)')])),
+                ('lien_status', models.CharField(choices=[('1', 'Secured by a first lien'), ('2', 'Secured by a subordinate lien'), ('3', 'Not secured by a lien'), ('4', 'Not applicable (purchased loans)')], max_length=1)),
+                ('loan_purpose', models.PositiveIntegerField(choices=[(1, 'Home purchase'), (2, 'Home improvement'), (3, 'Refinancing')])),
+                ('owner_occupancy', models.PositiveIntegerField(choices=[(1, 'Owner-occupied as a principal dwelling'), (2, 'Not owner-occupied'), (3, 'Not applicable')])),
+                ('property_type', models.CharField(choices=[('1', 'One to four-family (other than manufactured housing)'), ('2', 'Manufactured housing'), ('3', 'Multifamily')], max_length=1)),
+                ('num_records', models.IntegerField()),
+                ('institution', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='respondents.Institution', to_field='institution_id')),
+                ('tract', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, to='geo.Tract')),
+            ],
+            options={
+                'abstract': False,
+                'managed': False,
+            },
+        ),
+        migrations.RunSQL(
+            """
+            CREATE TABLE hmda_larcube (
+                compound_id VARCHAR(35) PRIMARY KEY,
+                year SMALLINT NOT NULL,
+                institution_id VARCHAR(15) NOT NULL,
+                tract_id VARCHAR(11) NOT NULL,
+                action_taken INTEGER NOT NULL,
+                lien_status VARCHAR(1) NOT NULL,
+                loan_purpose INTEGER NOT NULL,
+                owner_occupancy INTEGER NOT NULL,
+                property_type VARCHAR(1) NOT NULL,
+                num_records INTEGER NOT NULL
+            )
+            """,
+            "DROP TABLE hmda_larcube",
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO hmda_larcube
+            SELECT
+                as_of_year || institution_id || tract_id || action_taken
+                    || lien_status || loan_purpose || owner_occupancy
+                    || property_type,
+                as_of_year,
+                institution_id,
+                tract_id,
+                action_taken,
+                lien_status,
+                loan_purpose,
+                owner_occupancy,
+                property_type,
+                COUNT(*)
+            FROM hmda_loanapplicationrecord
+            GROUP BY
+                as_of_year, institution_id, tract_id, action_taken,
+                lien_status, loan_purpose, owner_occupancy, property_type
+            """,
+            migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            [
+                """
+                CREATE INDEX hmda_larcube_lender_idx
+                ON hmda_larcube (institution_id, tract_id)
+                """,
+                """
+                CREATE INDEX hmda_larcube_tract_idx
+                ON hmda_larcube (tract_id, year)
+                """,
+            ],
+            [
+                "DROP INDEX hmda_larcube_tract_idx",
+                "DROP INDEX hmda_larcube_lender_idx",
+            ],
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
 
-from mapusaurus.materialized_view import MaterializedView
+from mapusaurus.summary_table import YearlySummary
 
 AGENCY_CHOICES = (
     ("1", "Office of the Comptroller of the Currency (OCC)"),
@@ -400,9 +400,58 @@ class LoanApplicationRecord(models.Model):
         FEMALE = models.Q(applicant_sex=2)
 
 
-class LARYear(MaterializedView):
+class LARYear(YearlySummary):
     class Meta:
         managed = False
         ordering = ["-year"]
 
     year = models.PositiveIntegerField(primary_key=True)
+
+    SOURCE_SQL = """
+        SELECT as_of_year
+        FROM hmda_loanapplicationrecord
+        WHERE %(year)s IS NULL OR as_of_year = %(year)s
+        GROUP BY as_of_year
+    """
+
+
+class LARCube(YearlySummary):
+    """Counts of LAR records, pre-aggregated by tract, lender and each field
+    the map can filter on. Answering map requests from this rather than the
+    raw records reads a small fraction of the rows."""
+    compound_id = models.CharField(max_length=4 + 15 + 11 + 5,
+                                   primary_key=True)
+    year = models.SmallIntegerField()
+    institution = models.ForeignKey(
+        "respondents.Institution", models.DO_NOTHING,
+        to_field="institution_id")
+    tract = models.ForeignKey("geo.Tract", models.DO_NOTHING)
+    action_taken = models.PositiveIntegerField(choices=ACTION_TAKEN_CHOICES)
+    lien_status = models.CharField(max_length=1, choices=LIEN_STATUS_CHOICES)
+    loan_purpose = models.PositiveIntegerField(choices=LOAN_PURPOSE_CHOICES)
+    owner_occupancy = models.PositiveIntegerField(
+        choices=OWNER_OCCUPANCY_CHOICES)
+    property_type = models.CharField(
+        max_length=1, choices=PROPERTY_TYPE_CHOICES)
+    num_records = models.IntegerField()
+
+    SOURCE_SQL = """
+        SELECT
+            as_of_year || institution_id || tract_id || action_taken
+                || lien_status || loan_purpose || owner_occupancy
+                || property_type,
+            as_of_year,
+            institution_id,
+            tract_id,
+            action_taken,
+            lien_status,
+            loan_purpose,
+            owner_occupancy,
+            property_type,
+            COUNT(*)
+        FROM hmda_loanapplicationrecord
+        WHERE %(year)s IS NULL OR as_of_year = %(year)s
+        GROUP BY
+            as_of_year, institution_id, tract_id, action_taken, lien_status,
+            loan_purpose, owner_occupancy, property_type
+    """
@@ -0,0 +1,109 @@
+"""The LAR table is partitioned by as_of_year, one partition per year. Rows
+for years without a partition land in a catch-all default partition."""
+from typing import List
+
+from django.db import connection, transaction
+
+from hmda.models import LoanApplicationRecord
+
+PARENT = LoanApplicationRecord._meta.db_table
+DEFAULT_PARTITION = f"{PARENT}_default"
+
+
+def partition_name(year: int) -> str:
+    return f"{PARENT}_{int(year)}"
+
+
+def attached_years() -> List[int]:
+    """The years with their own partition, read from the partition bounds
+    (e.g. "FOR VALUES IN (2013)") rather than the partitions' names."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT substring(
+                pg_get_expr(child.relpartbound, child.oid)
+                FROM 'FOR VALUES IN \\((\\d+)\\)'
+            )
+            FROM pg_inherits
+            INNER JOIN pg_class parent ON (parent.oid = inhparent)
+            INNER JOIN pg_class child ON (child.oid = inhrelid)
+            WHERE parent.relname = %s
+        """, [PARENT])
+        return sorted(int(row[0]) for row in cursor.fetchall() if row[0])
+
+
+def table_exists(table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [table])
+        return cursor.fetchone()[0]
+
+
+def create_load_table(table: str, year: int):
+    """A standalone table shaped like the LAR table. The CHECK constraint
+    lets it be attached as `year`'s partition without a validating scan."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE TABLE {table} (
+                LIKE {PARENT} INCLUDING DEFAULTS,
+                CHECK (as_of_year IS NOT NULL AND as_of_year = {int(year)})
+            )
+        """)
+
+
+def attach_partition(year: int, table: str = ""):
+    """Attach a standalone table as `year`'s partition. Any of that year's
+    rows which had landed in the default partition are moved into it
+    first, as Postgres won't attach while they remain."""
+    table = table or partition_name(year)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION} WHERE as_of_year = %s
+                RETURNING *
+            )
+            INSERT INTO {table} SELECT * FROM moved
+        """, [year])
+        cursor.execute(f"""
+            ALTER TABLE {PARENT} ATTACH PARTITION {table}
+            FOR VALUES IN ({int(year)})
+        """)
+
+
+def create_partition(year: int):
+    """Give `year` its own partition, if it doesn't already have one."""
+    if year in attached_years():
+        return
+    with transaction.atomic():
+        create_load_table(partition_name(year), year)
+        attach_partition(year)
+
+
+def detach_partition(year: int):
+    """Remove `year`'s rows from the LAR table, keeping them in a standalone
+    table of the same name."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"ALTER TABLE {PARENT} DETACH PARTITION {partition_name(year)}")
+
+
+def drop_partition(year: int):
+    with transaction.atomic(), connection.cursor() as cursor:
+        if year in attached_years():
+            detach_partition(year)
+        cursor.execute(f"DROP TABLE {partition_name(year)}")
+
+
+def swap_partition(year: int, table: str):
+    """Replace all of `year`'s rows with those of a standalone table, which
+    takes that year's partition's place (and name). Much cheaper than
+    deleting the year's rows one by one."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        if year in attached_years():
+            drop_partition(year)
+        else:
+            cursor.execute(
+                f"DELETE FROM {DEFAULT_PARTITION} WHERE as_of_year = %s",
+                [year],
+            )
+        cursor.execute(
+            f"ALTER TABLE {table} RENAME TO {partition_name(year)}")
+        attach_partition(year)
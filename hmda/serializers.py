@@ -7,3 +7,4 @@ class LARSerializer(serializers.Serializer):
     lon = serializers.FloatField(source="tract__interior_lon")
     volume = serializers.IntegerField()
     num_households = serializers.IntegerField()
+    normalized_loans = serializers.FloatField()
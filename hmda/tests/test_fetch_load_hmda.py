@@ -11,9 +11,10 @@ from hmda.management.commands import fetch_load_hmda
 def test_handle_no_args(monkeypatch):
     monkeypatch.setattr(fetch_load_hmda, "fetch_and_unzip_file", MagicMock())
     fetch_call = fetch_load_hmda.fetch_and_unzip_file
-    monkeypatch.setattr(fetch_load_hmda, "LARYear", Mock())
+    monkeypatch.setattr(fetch_load_hmda, "rebuild_summaries", Mock())
     monkeypatch.setattr(fetch_load_hmda, "load_from_csv", Mock())
     monkeypatch.setattr(fetch_load_hmda, "save_batches", Mock())
+    monkeypatch.setattr(fetch_load_hmda, "partitions", Mock())
     monkeypatch.setattr(fetch_load_hmda, "update_num_loans", Mock())
     with freeze_time("2018-01-01"):
         call_command("fetch_load_hmda")
@@ -28,14 +29,17 @@ def test_handle_no_args(monkeypatch):
     replace = fetch_load_hmda.save_batches.call_args[0][1]
     assert not replace
     assert fetch_load_hmda.update_num_loans.call_count == 1
+    assert fetch_load_hmda.rebuild_summaries.call_args[0][0] == set(
+        range(2012, 2018))
 
 
 def test_handle_specific_args(monkeypatch):
     monkeypatch.setattr(fetch_load_hmda, "fetch_and_unzip_file", MagicMock())
     fetch_call = fetch_load_hmda.fetch_and_unzip_file
-    monkeypatch.setattr(fetch_load_hmda, "LARYear", Mock())
+    monkeypatch.setattr(fetch_load_hmda, "rebuild_summaries", Mock())
     monkeypatch.setattr(fetch_load_hmda, "load_from_csv", Mock())
     monkeypatch.setattr(fetch_load_hmda, "save_batches", Mock())
+    monkeypatch.setattr(fetch_load_hmda, "partitions", Mock())
     monkeypatch.setattr(fetch_load_hmda, "update_num_loans", Mock())
     call_command(
         "fetch_load_hmda",
@@ -51,6 +55,20 @@ def test_handle_specific_args(monkeypatch):
     assert fetch_load_hmda.save_batches.call_count == 2
     replace = fetch_load_hmda.save_batches.call_args[0][1]
     assert replace
+    assert fetch_load_hmda.save_batches.call_args[1]["mode"] == "upsert"
+
+
+def test_handle_replace_years(monkeypatch):
+    monkeypatch.setattr(fetch_load_hmda, "fetch_and_unzip_file", MagicMock())
+    monkeypatch.setattr(fetch_load_hmda, "rebuild_summaries", Mock())
+    monkeypatch.setattr(fetch_load_hmda, "load_from_csv", Mock())
+    monkeypatch.setattr(fetch_load_hmda, "copy_batches", Mock())
+    monkeypatch.setattr(fetch_load_hmda, "update_num_loans", Mock())
+    call_command("fetch_load_hmda", "--year", "2014", "--replace-years")
+
+    # Replacing whole years is done by COPY, even without --copy
+    copy_args = fetch_load_hmda.copy_batches.call_args[0]
+    assert copy_args[1:] == (False, True)
 
 
 @pytest.mark.parametrize("exception", (
@@ -61,7 +79,7 @@ def test_handle_specific_args(monkeypatch):
 ))
 def test_handle_404(monkeypatch, exception):
     monkeypatch.setattr(fetch_load_hmda, "fetch_and_unzip_file", MagicMock())
-    monkeypatch.setattr(fetch_load_hmda, "LARYear", Mock())
+    monkeypatch.setattr(fetch_load_hmda, "rebuild_summaries", Mock())
     monkeypatch.setattr(fetch_load_hmda, "logger", Mock())
     monkeypatch.setattr(fetch_load_hmda, "update_num_loans", Mock())
     fetch_call = fetch_load_hmda.fetch_and_unzip_file
@@ -1,13 +1,16 @@
 import os
 from collections import Counter
+from io import StringIO
 
 import pytest
 from django.conf import settings
-from django.core.management import call_command
+from django.core.management import call_command, CommandError
 
 from geo.tests.factories import TractFactory
+from hmda import partitions
 from hmda.management.commands import load_hmda
 from hmda.models import LoanApplicationRecord
+from hmda.tests.factories import LARFactory
 
 
 @pytest.fixture(autouse=True)
@@ -39,6 +42,69 @@ def test_handle():
         {"11222333300", "11222333400", "11223333300", "12222333300"}
 
 
+def test_handle_copy():
+    call_command(
+        "load_hmda",
+        os.path.join(settings.BASE_DIR, "hmda", "tests", "mock_2013.csv"),
+        "--copy",
+    )
+
+    # Same filtering as the ORM path: 8 records for known tracts + lenders
+    assert LoanApplicationRecord.objects.count() == 8
+    lenders = {r.institution_id for r in LoanApplicationRecord.objects.all()}
+    assert lenders == {
+        "2013" + "9" + "1000000001",
+        "2013" + "9" + "1000000002",
+        "2013" + "9" + "0000451965",
+    }
+    record = LoanApplicationRecord.objects.get(
+        hmda_record_id="201390000451965" + "00000081")
+    assert record.applicant_income_000s == 182
+    assert record.applicant_race_2 == ""
+
+
+def test_handle_copy_replace():
+    path = os.path.join(settings.BASE_DIR, "hmda", "tests", "mock_2013.csv")
+    call_command("load_hmda", path, "--copy")
+    LoanApplicationRecord.objects.update(loan_amount_000s=0)
+
+    call_command("load_hmda", path, "--copy")
+    assert LoanApplicationRecord.objects.count() == 8
+    assert not LoanApplicationRecord.objects\
+        .exclude(loan_amount_000s=0).exists()
+
+    # Replacing updates the records in the file, leaving any others be
+    extra = LARFactory(as_of_year=2013, loan_amount_000s=0)
+    call_command("load_hmda", path, "--copy", "--replace")
+    assert LoanApplicationRecord.objects.count() == 9
+    assert list(LoanApplicationRecord.objects.filter(loan_amount_000s=0)) \
+        == [extra]
+
+    # Replacing years swaps out the whole year, including records not in
+    # the file
+    call_command("load_hmda", path, "--replace-years")
+    assert LoanApplicationRecord.objects.count() == 8
+    assert not LoanApplicationRecord.objects.filter(loan_amount_000s=0)\
+        .exists()
+
+
+def test_handle_copy_duplicates(tmpdir):
+    path = os.path.join(settings.BASE_DIR, "hmda", "tests", "mock_2013.csv")
+    with open(path) as csv_file:
+        line = csv_file.readlines()[2].split(",")   # sequence number 81
+    first, last = list(line), list(line)
+    first[7], last[7] = "00070", "00090"    # loan amounts
+    data_file = tmpdir.join("duplicates.csv")
+    data_file.write(",".join(first) + ",".join(last))
+
+    call_command("load_hmda", str(data_file), "--copy")
+
+    # The file's last occurrence of a record wins
+    record = LoanApplicationRecord.objects.get()
+    assert record.hmda_record_id == "201390000451965" + "00000081"
+    assert record.loan_amount_000s == 90
+
+
 def test_handle_errors_dict(monkeypatch):
     monkeypatch.setattr(load_hmda.errors, "changes",
                         {2013: {"11222333300": "11222333400"}})
@@ -52,3 +118,72 @@ def test_handle_errors_dict(monkeypatch):
     # 11222333300 got replaced
     assert "11222333300" not in tracts
     assert tracts["11222333400"] == 4
+
+
+def test_chunks_match_serial_parse(tmpdir):
+    path = os.path.join(settings.BASE_DIR, "hmda", "tests", "mock_2013.csv")
+    with open(path) as csv_file:
+        # blank out the sequence numbers so they're generated
+        lines = [line.split(",") for line in csv_file]
+    for line in lines:
+        line[37] = ""
+    data_file = tmpdir.join("no_sequence.csv")
+    data_file.write("".join(",".join(line) for line in lines))
+
+    with open(str(data_file)) as csv_file:
+        serial = [r.hmda_record_id for r in load_hmda.load_from_csv(csv_file)]
+    chunks = list(load_hmda.chunk_file(str(data_file), chunk_size=300))
+    assert len(chunks) > 1
+    chunked = [r.hmda_record_id
+               for chunk in chunks
+               for r in load_hmda.parse_chunk(chunk)]
+    assert chunked == serial
+    assert serial[0].endswith("00000000")
+    assert serial[-1].endswith(str(len(lines) - 1).zfill(8))
+
+
+def test_handle_copy_workers():
+    call_command(
+        "load_hmda",
+        os.path.join(settings.BASE_DIR, "hmda", "tests", "mock_2013.csv"),
+        "--copy", "--workers", "2",
+    )
+    assert LoanApplicationRecord.objects.count() == 8
+
+
+# Writer threads have their own connections, so can't see uncommitted rows
+def test_handle_writers(transactional_db):
+    call_command(
+        "load_hmda",
+        os.path.join(settings.BASE_DIR, "hmda", "tests", "mock_2013.csv"),
+        "--workers", "2",
+    )
+    assert LoanApplicationRecord.objects.count() == 8
+
+
+def test_handle_workers_needs_a_file(monkeypatch):
+    with open(os.path.join(settings.BASE_DIR, "hmda", "tests",
+                           "mock_2013.csv")) as csv_file:
+        monkeypatch.setattr("sys.stdin", StringIO(csv_file.read()))
+    with pytest.raises(CommandError):
+        call_command("load_hmda", "-", "--workers", "2")
+    assert LoanApplicationRecord.objects.count() == 0
+
+    call_command("load_hmda", "-")    # but a serial load's fine
+    assert LoanApplicationRecord.objects.count() == 8
+
+
+def test_partitions_made_outside_writes():
+    model_batches = iter([[LARFactory.build(as_of_year=2013)],
+                          [LARFactory.build(as_of_year=2014)]])
+    years = set()
+    model_batches = load_hmda.partitioned(model_batches, years)
+    # The first batch's years are ready before any batch is written
+    assert partitions.attached_years() == [2013]
+
+    assert len(list(model_batches)) == 2
+    assert years == {2013, 2014}
+    assert partitions.attached_years() == [2013]
+
+    load_hmda.create_partitions(years)
+    assert partitions.attached_years() == [2013, 2014]
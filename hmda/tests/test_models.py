@@ -16,3 +16,16 @@ def test_lar_year_rebuild_all():
     assert LARYear.objects.all().count() == 3
     assert list(LARYear.objects.values_list("year", flat=True)) == [
         2017, 2012, 2010]
+
+
+@pytest.mark.django_db
+def test_lar_year_rebuild_year():
+    LARFactory(as_of_year=2010)
+    LARYear.rebuild_all()
+    LARFactory(as_of_year=2012)
+    LARFactory(as_of_year=2014)
+
+    LARYear.rebuild_year(2012)
+
+    assert list(LARYear.objects.values_list("year", flat=True)) == [
+        2012, 2010]
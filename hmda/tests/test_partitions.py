@@ -0,0 +1,78 @@
+import pytest
+from django.core.management import call_command, CommandError
+from django.db import connection
+
+from hmda import partitions
+from hmda.models import LoanApplicationRecord
+from hmda.tests.factories import LARFactory
+
+
+def count_rows(table: str) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_create_partition_moves_default_rows():
+    LARFactory.create_batch(3, as_of_year=2013)
+    LARFactory(as_of_year=2014)
+    assert partitions.attached_years() == []
+
+    partitions.create_partition(2013)
+    partitions.create_partition(2013)   # no-op
+
+    assert partitions.attached_years() == [2013]
+    assert count_rows(partitions.partition_name(2013)) == 3
+    assert count_rows(partitions.DEFAULT_PARTITION) == 1
+    assert LoanApplicationRecord.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_attached_years_reads_bounds():
+    partitions.create_partition(2013)
+    load_table = f"{partitions.partition_name(2012)}_load"
+    partitions.create_load_table(load_table, 2012)
+    partitions.attach_partition(2012, load_table)
+
+    # Neither the default partition nor oddly named ones trip it up
+    assert partitions.attached_years() == [2012, 2013]
+
+
+@pytest.mark.django_db
+def test_detach_attach_drop():
+    partitions.create_partition(2013)
+    LARFactory.create_batch(2, as_of_year=2013)
+
+    call_command("lar_partition", "detach", "2013")
+    assert not LoanApplicationRecord.objects.exists()
+    assert count_rows(partitions.partition_name(2013)) == 2
+
+    call_command("lar_partition", "attach", "2013")
+    assert LoanApplicationRecord.objects.count() == 2
+
+    call_command("lar_partition", "drop", "2013")
+    assert not LoanApplicationRecord.objects.exists()
+    assert not partitions.table_exists(partitions.partition_name(2013))
+
+
+@pytest.mark.django_db
+def test_swap_partition():
+    partitions.create_partition(2013)
+    LARFactory.create_batch(2, as_of_year=2013)
+    LARFactory(as_of_year=2014)
+    partitions.create_load_table("swap_in", 2013)
+
+    partitions.swap_partition(2013, "swap_in")
+
+    assert partitions.attached_years() == [2013]
+    assert list(LoanApplicationRecord.objects.values_list(
+        "as_of_year", flat=True)) == [2014]
+
+
+@pytest.mark.django_db
+def test_lar_partition_errors():
+    with pytest.raises(CommandError):
+        call_command("lar_partition", "detach", "2013")
+    with pytest.raises(CommandError):
+        call_command("lar_partition", "drop", "2013")
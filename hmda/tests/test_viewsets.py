@@ -1,9 +1,13 @@
+import json
+import struct
+
 import pytest
 from rest_framework.test import APIClient
 
 from ffiec.tests.factories import TractDemFactory
 from geo.models import Tract
-from geo.tests.factories import CBSAFactory, CountyFactory
+from geo.tests.factories import CBSAFactory, CountyFactory, TractFactory
+from hmda.models import LARCube
 from hmda.tests.factories import LARFactory
 
 client = APIClient()
@@ -19,6 +23,7 @@ def test_filter_to_metro():
     for tract in Tract.objects.all():
         TractDemFactory(year=2010, tract=tract)
         TractDemFactory(year=2011, tract=tract)
+    LARCube.rebuild_all()
 
     result = client.get("/api/lar/", {"metro": first.pk})
     assert len(result.data) == 5 + 7
@@ -44,6 +49,7 @@ def test_filter_to_county():
     for tract in Tract.objects.all():
         TractDemFactory(tract=tract, year=2010)
         TractDemFactory(tract=tract, year=2011)
+    LARCube.rebuild_all()
 
     result = client.get("/api/lar/", {"county": first.pk})
     assert len(result.data) == 5 + 7
@@ -57,3 +63,79 @@ def test_filter_to_county():
     result = client.get(
         "/api/lar/", {"county": f"{first.pk},{second.pk}", "year": "2010"})
     assert len(result.data) == 5 + 3
+
+
+@pytest.mark.django_db
+def test_aggregates():
+    county = CountyFactory()
+    tract = TractFactory(
+        geoid="11111222222", county=county, interior_lat=1, interior_lon=2)
+    LARFactory.create_batch(
+        4, as_of_year=2010, tract=tract, action_taken=1, lien_status="1")
+    LARFactory.create_batch(
+        2, as_of_year=2010, tract=tract, action_taken=3, lien_status="1")
+    LARFactory(as_of_year=2011, tract=tract)
+    TractDemFactory(tract=tract, year=2010, households=10)
+    TractDemFactory(tract=tract, year=2011, households=20)
+    LARCube.rebuild_all()
+
+    result = client.get("/api/lar/", {"county": county.pk, "year": "2010"})
+    assert result.data == [{
+        "geoid": "11111222222", "lat": 1, "lon": 2,
+        "volume": 6, "num_households": 6 * 10, "normalized_loans": 0.1,
+    }]
+
+    result = client.get("/api/lar/", {
+        "county": county.pk, "year": "2010", "action_taken": "1"})
+    assert result.data[0]["volume"] == 4
+
+    result = client.get(
+        "/api/lar/", {"county": county.pk, "year": "2010", "format": "bin"})
+    assert result["Content-Type"] == "application/octet-stream"
+    count, lat, lon, volume, households, normalized, geoid = struct.unpack(
+        "<IffIIf11s", result.content)
+    assert (count, lat, lon, volume, households, geoid) == (
+        1, 1.0, 2.0, 6, 6 * 10, b"11111222222")
+    assert normalized == pytest.approx(0.1)
+
+
+@pytest.mark.django_db
+def test_binary_errors_are_json():
+    result = client.get("/api/lar/", {"year": "not-a-year", "format": "bin"})
+    assert result.status_code == 400
+    assert result["Content-Type"] == "application/json"
+    assert "year" in json.loads(result.content)
+
+
+@pytest.mark.django_db
+def test_ordering_and_limits():
+    county = CountyFactory()
+    for geoid, volume, households in (("11111111111", 2, 10),
+                                      ("22222222222", 4, 5),
+                                      ("33333333333", 1, 1)):
+        tract = TractFactory(geoid=geoid, county=county)
+        LARFactory.create_batch(volume, as_of_year=2010, tract=tract)
+        TractDemFactory(tract=tract, year=2010, households=households)
+    LARCube.rebuild_all()
+    params = {"county": county.pk, "year": "2010"}
+
+    result = client.get(
+        "/api/lar/", {**params, "ordering": "-normalized_loans"})
+    assert [r["geoid"] for r in result.data] == [
+        "33333333333", "22222222222", "11111111111"]
+    # households are weighted per record, so this is 1 / households
+    assert [r["normalized_loans"] for r in result.data] == pytest.approx(
+        [1.0, 0.2, 0.1])
+
+    result = client.get("/api/lar/", {**params, "ordering": "-volume"})
+    assert [r["volume"] for r in result.data] == [4, 2, 1]
+
+    result = client.get("/api/lar/", {
+        **params, "ordering": "-volume", "limit": "2", "min_volume": "2"})
+    assert [r["volume"] for r in result.data] == [4, 2]
+
+    result = client.get("/api/lar/", {**params, "min_volume": "3"})
+    assert [r["geoid"] for r in result.data] == ["22222222222"]
+
+    result = client.get("/api/lar/", {**params, "ordering": "name"})
+    assert result.status_code == 400
@@ -1,12 +1,15 @@
 from rest_framework import viewsets
+from rest_framework.renderers import JSONRenderer
 
 from hmda.filters import LARFilters
-from hmda.models import LoanApplicationRecord
+from hmda.models import LARCube
+from hmda.renderers import LARBinaryRenderer
 from hmda.serializers import LARSerializer
 
 
 class LARViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = LoanApplicationRecord.objects.order_by("pk")
+    queryset = LARCube.objects.order_by("pk")
     serializer_class = LARSerializer
     pagination_class = None
     filterset_class = LARFilters
+    renderer_classes = (JSONRenderer, LARBinaryRenderer)
@@ -1,10 +1,20 @@
-from typing import Any, Callable, Iterator, List, Optional, Type, TypeVar
+import logging
+from queue import Queue
+from threading import Lock, Thread
+from time import monotonic
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set,
+    TypeVar,
+)
 
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import QuerySet
 from typing_extensions import Protocol
 
 T = TypeVar("T")
 FilterFn = Callable[[List["DjangoModel"]], List["DjangoModel"]]
+MODES = ("skip", "upsert", "replace")
+logger = logging.getLogger(__name__)
 
 
 class DjangoModel(Protocol):
@@ -27,37 +37,216 @@ def batches(elts: Iterator[T], batch_size: int = 100) -> Iterator[List[T]]:
     yield batch
 
 
-def save_batches(models: Iterator[DjangoModel], replace: bool = False,
-                 filter_fn: Optional[FilterFn] = None, batch_size: int = 100):
-    """Save (optionally, replacing) batches of models."""
-    for batch in batches(models, batch_size):
-        with transaction.atomic():
-            if filter_fn:
-                batch = filter_fn(batch)
-            pks = {m.pk for m in batch}
-            if not batch:
-                continue
+def insert_on_conflict(batch: List[DjangoModel], mode: str,
+                       conflict_fields: Sequence[str] = ()):
+    """Insert a batch of models in a single statement, skipping ("skip") or
+    updating ("upsert") rows which conflict on `conflict_fields` (by
+    default, the primary key). Models need their keys set up front, i.e.
+    no AutoFields. Where the batch repeats a key, its last model wins, as
+    Postgres won't touch the same row twice in one statement."""
+    meta = batch[0]._meta
+    fields = meta.concrete_fields
+    columns = ", ".join(field.column for field in fields)
+    key_fields = [meta.get_field(name)
+                  for name in conflict_fields or [meta.pk.name]]
+    conflict = ", ".join(field.column for field in key_fields)
+    batch = list({
+        tuple(getattr(model, field.attname) for field in key_fields): model
+        for model in batch
+    }.values())
+    updates = [f"{field.column} = EXCLUDED.{field.column}" for field in fields
+               if field not in key_fields and not field.primary_key]
+    if mode == "upsert" and updates:
+        action = "UPDATE SET " + ", ".join(updates)
+    else:   # skipping, or there are only keys to update
+        action = "NOTHING"
+    row = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    params = [
+        field.get_db_prep_save(field.pre_save(model, True), connection)
+        for model in batch for field in fields
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {meta.db_table} ({columns})
+            VALUES {", ".join([row] * len(batch))}
+            ON CONFLICT ({conflict}) DO {action}
+        """, params)
+
+
+def save_batch(batch: List[DjangoModel], replace: bool = False,
+               filter_fn: Optional[FilterFn] = None,
+               mode: Optional[str] = None,
+               conflict_fields: Sequence[str] = ()):
+    """Save a single batch of models. Existing rows are kept ("skip"),
+    updated in place ("upsert") or deleted, with their dependents, and
+    re-inserted ("replace"). Unless `mode` says otherwise, `replace` means
+    "replace" and otherwise rows are skipped."""
+    mode = mode or ("replace" if replace else "skip")
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    with transaction.atomic():
+        if filter_fn:
+            batch = filter_fn(batch)
+        if not batch:
+            return
 
+        if mode == "replace":
             model_class = batch[0].__class__
-            existing = model_class.objects.filter(pk__in=pks)
-            if replace:
-                existing.delete()
-            else:
-                existing_ids = set(existing.values_list("pk", flat=True))
-                batch = [m for m in batch if m.pk not in existing_ids]
+            model_class.objects.filter(pk__in={m.pk for m in batch}).delete()
             model_class.objects.bulk_create(batch)
+        else:
+            insert_on_conflict(batch, mode, conflict_fields)
+
+
+class PipelineStats:
+    """Where a pipelined save spent its time. A producer often blocked on a
+    full queue means the database is the bottleneck (more writers may help);
+    writers often idle on an empty queue means parsing is. Updated as the
+    save progresses, so it can be watched from another thread."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.queued = 0
+        self.written = 0
+        self.rows = 0
+        self.producer_blocked = 0.0     # seconds waiting on a full queue
+        self.writer_idle = 0.0          # seconds, summed over writers
+        self.max_depth = 0
+        self.total_depth = 0
+        self.lock = Lock()
 
+    def record_put(self, depth: int, blocked: float):
+        with self.lock:
+            self.queued += 1
+            self.producer_blocked += blocked
+            self.max_depth = max(self.max_depth, depth)
+            self.total_depth += depth
 
-def make_filter_fn(
-        fk_model_cls: Type[DjangoModel], fk_field: str = "pk") -> FilterFn:
-    """Generate a save_batches-compatible filter function based on entries in
-    the database."""
-    def fn(batch: List[DjangoModel]) -> List[DjangoModel]:
-        ids = set(
-            fk_model_cls.objects
-            .filter(pk__in={getattr(m, fk_field) for m in batch})
-            .values_list("pk", flat=True)
-            .distinct(),
+    def record_write(self, rows: int, idle: float):
+        with self.lock:
+            self.written += 1
+            self.rows += rows
+            self.writer_idle += idle
+
+    @property
+    def mean_depth(self) -> float:
+        return self.total_depth / self.queued if self.queued else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.written}/{self.queued} batches ({self.rows} rows) "
+            f"written; producer blocked {self.producer_blocked:.1f}s, "
+            f"writers idle {self.writer_idle:.1f}s; queue depth mean "
+            f"{self.mean_depth:.1f}, max {self.max_depth}/{self.queue_size}"
         )
-        return [m for m in batch if getattr(m, fk_field) in ids]
-    return fn
+
+
+def save_pipelined(model_batches: Iterable[List[DjangoModel]],
+                   replace: bool = False,
+                   filter_fn: Optional[FilterFn] = None,
+                   mode: Optional[str] = None,
+                   conflict_fields: Sequence[str] = (), writers: int = 1,
+                   queue_size: int = 0,
+                   stats: Optional[PipelineStats] = None) -> PipelineStats:
+    """Save batches from `writers` threads, each with its own database
+    connection, while this thread carries on producing (i.e. parsing) them.
+    Batches are handed over via a bounded queue, by default two per writer,
+    so parsing can't race too far ahead of the database. `filter_fn` is
+    shared between writers, so must be thread safe."""
+    queue_size = queue_size or writers * 2
+    stats = stats or PipelineStats(queue_size)
+    work: Queue = Queue(maxsize=queue_size)
+    failures: List[Exception] = []
+
+    def write():
+        try:
+            while True:
+                started = monotonic()
+                batch = work.get()
+                idle = monotonic() - started
+                if batch is None:
+                    return
+                if not failures:    # keep draining after a failure
+                    try:
+                        save_batch(batch, replace, filter_fn, mode,
+                                   conflict_fields)
+                    except Exception as err:    # re-raised below
+                        failures.append(err)
+                stats.record_write(len(batch), idle)
+        finally:
+            connection.close()
+
+    threads = [Thread(target=write) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for batch in model_batches:
+            if failures:
+                break
+            started = monotonic()
+            work.put(batch)
+            stats.record_put(work.qsize(), monotonic() - started)
+    finally:
+        for _ in threads:
+            work.put(None)
+        for thread in threads:
+            thread.join()
+    logger.info("Pipelined save: %s", stats)
+    if failures:
+        raise failures[0]
+    return stats
+
+
+def save_batches(models: Iterator[DjangoModel], replace: bool = False,
+                 filter_fn: Optional[FilterFn] = None, batch_size: int = 100,
+                 mode: Optional[str] = None,
+                 conflict_fields: Sequence[str] = (), writers: int = 0):
+    """Save batches of models; see save_batch. With `writers`, batches are
+    saved by that many threads while the models are still being generated;
+    see save_pipelined."""
+    model_batches = batches(models, batch_size)
+    if writers:
+        save_pipelined(model_batches, replace, filter_fn, mode,
+                       conflict_fields, writers)
+    else:
+        for batch in model_batches:
+            save_batch(batch, replace, filter_fn, mode, conflict_fields)
+
+
+def add_writer_arguments(parser):
+    """The --writers flag shared by our loaders."""
+    parser.add_argument(
+        "--writers", type=int, default=0,
+        help="Number of threads writing to the database while parsing "
+             "continues (default: parse and write in turn)",
+    )
+
+
+class KeySetFilter:
+    """A save_batches-compatible filter function which drops models whose
+    foreign keys reference missing rows. Each referenced table's keys are
+    loaded once, on first use, rather than queried per batch, so it suits
+    tables small enough to hold in memory (e.g. tracts). Safe to share
+    between writer threads."""
+
+    def __init__(self, **querysets: QuerySet):
+        """Keyword arguments map a foreign key field to the rows it may
+        reference, e.g. tract_id=Tract.objects.all()"""
+        self.querysets = querysets
+        self.keys: Optional[Dict[str, Set]] = None
+        self.lock = Lock()
+
+    def load(self) -> Dict[str, Set]:
+        with self.lock:
+            if self.keys is None:
+                self.keys = {
+                    field: set(queryset.values_list("pk", flat=True))
+                    for field, queryset in self.querysets.items()
+                }
+        return self.keys
+
+    def __call__(self, batch: List[DjangoModel]) -> List[DjangoModel]:
+        keys = self.load()
+        return [m for m in batch
+                if all(getattr(m, field) in field_keys
+                       for field, field_keys in keys.items())]
@@ -0,0 +1,131 @@
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+
+from django.core.exceptions import ValidationError
+from django.core.validators import (
+    MaxLengthValidator, MaxValueValidator, MinValueValidator)
+from django.db import models
+
+from mapusaurus.batch_utils import DjangoModel
+
+Row = Dict[str, Any]
+RowErrors = Dict[str, List[str]]
+Check = Callable[[Any], bool]
+INTEGER_FIELDS = (
+    models.BigIntegerField, models.IntegerField,
+    models.PositiveIntegerField, models.PositiveSmallIntegerField,
+    models.SmallIntegerField,
+)
+
+
+def _passes_validators(field: models.Field, value: Any) -> bool:
+    try:
+        field.run_validators(value)
+        return True
+    except ValidationError:
+        return False
+
+
+def _choice_check(field: models.Field) -> Check:
+    allowed = {key for key, _ in field.flatchoices
+               if _passes_validators(field, key)}
+    types = {type(key) for key in allowed}
+    return lambda value: type(value) in types and value in allowed
+
+
+def _char_check(field: models.CharField) -> Optional[Check]:
+    if any(not isinstance(v, MaxLengthValidator) for v in field.validators):
+        return None
+    max_length, blank = field.max_length, field.blank
+    return lambda value: (type(value) is str and (value or blank)
+                          and len(value) <= max_length)
+
+
+def _integer_check(field: models.IntegerField) -> Optional[Check]:
+    low, high = float("-inf"), float("inf")
+    for validator in field.validators:
+        if isinstance(validator, MinValueValidator):
+            low = max(low, validator.limit_value)
+        elif isinstance(validator, MaxValueValidator):
+            high = min(high, validator.limit_value)
+        else:
+            return None
+    return lambda value: type(value) is int and low <= value <= high
+
+
+def fast_check(field: models.Field) -> Optional[Check]:
+    """Build a cheap predicate which only accepts values that field.clean()
+    would accept *and* return unchanged. Anything it rejects needs a closer
+    look."""
+    if field.choices:
+        return _choice_check(field)
+    if isinstance(field, models.CharField):
+        return _char_check(field)
+    if isinstance(field, INTEGER_FIELDS):
+        return _integer_check(field)
+    return None
+
+
+class BatchValidator:
+    """Validates many rows of field values at once, mirroring what
+    Model.full_clean(validate_unique=False) does per instance. Each column is
+    checked in a single pass against sets of valid choices, lengths and
+    integer ranges derived from the model's fields. A value which fails that
+    check is converted once, as Field.to_python() would (e.g. "1" to 1 for
+    an integer field), and checked again. Only values which still fail are
+    handed to Django's own Field.clean(), so error messages are exactly
+    Django's."""
+
+    def __init__(self, model_cls: Type[DjangoModel],
+                 exclude: Iterable[str] = ()):
+        exclude = set(exclude)
+        self.fields = [field for field in model_cls._meta.fields
+                       if field.name not in exclude]
+        self.checks = {field.attname: fast_check(field)
+                       for field in self.fields}
+
+    @staticmethod
+    def convert(field: models.Field, check: Check,
+                rows: List[Row]) -> List[int]:
+        """Convert the field's values which don't pass its check as they
+        stand, keeping those which then do. Returns the indexes of the rows
+        whose values still need cleaning."""
+        attname = field.attname
+        suspects = []
+        for idx, row in enumerate(rows):
+            value = row[attname]
+            if check(value):
+                continue
+            try:
+                value = field.to_python(value)
+            except ValidationError:
+                suspects.append(idx)
+                continue
+            if check(value):
+                row[attname] = value
+            else:
+                suspects.append(idx)
+        return suspects
+
+    def validate(self, rows: List[Row]) -> Dict[int, RowErrors]:
+        """Clean each row (a dict keyed by field attname) in place. Returns
+        the errors of any invalid rows, keyed by the row's index; each
+        row's errors match ValidationError.message_dict."""
+        errors: Dict[int, RowErrors] = defaultdict(dict)
+        for field in self.fields:
+            attname = field.attname
+            check = self.checks[attname]
+            if check:
+                suspects = self.convert(field, check, rows)
+            else:
+                suspects = list(range(len(rows)))
+
+            for idx in suspects:
+                value = rows[idx][attname]
+                if field.blank and value in field.empty_values:
+                    continue
+                try:
+                    rows[idx][attname] = field.clean(value, None)
+                except ValidationError as err:
+                    errors[idx][field.name] = err.messages
+        return dict(errors)
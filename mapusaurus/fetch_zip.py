@@ -1,43 +1,215 @@
+import hashlib
+import json
+import os
 from contextlib import contextmanager
-from io import BytesIO
 from pathlib import Path
-from tempfile import TemporaryDirectory
-from typing import BinaryIO, cast, Iterator
+from tempfile import NamedTemporaryFile, TemporaryDirectory, TemporaryFile
+from typing import BinaryIO, cast, Dict, Iterator, Optional
 from zipfile import ZipFile
 
 import requests
 
+CHUNK_SIZE = 1024 * 1024
+
+
+class IncompleteDownload(requests.exceptions.RequestException):
+    """The server sent a different number of bytes than it promised."""
+
+
+class NotCached(requests.exceptions.RequestException):
+    """We're offline and have no copy of the requested file."""
+
+
+def _is_zip(name: str) -> bool:
+    return name.lower().endswith(".zip")
+
+
+def _download(response: requests.Response, spool: BinaryIO) -> str:
+    """Copy a (streaming) response into `spool`, a chunk at a time, so that
+    large files never sit in memory. Verifies the size against the
+    Content-Length header, if present. Returns the sha256 of the body."""
+    digest = hashlib.sha256()
+    for chunk in response.iter_content(CHUNK_SIZE):
+        spool.write(chunk)
+        digest.update(chunk)
+    expected = response.headers.get("Content-Length")
+    # iter_content decodes compressed responses, changing the size
+    encoded = response.headers.get("Content-Encoding", "identity")
+    if expected and encoded == "identity" and int(expected) != spool.tell():
+        raise IncompleteDownload(
+            f"Expected {expected} bytes from {response.url}, "
+            f"received {spool.tell()}"
+        )
+    return digest.hexdigest()
+
+
+class DownloadCache:
+    """Downloads, stored by the hash of their content, plus an index from
+    each URL to its content and the server's ETag and Last-Modified headers.
+    Cached URLs are re-requested conditionally, so an unchanged file costs a
+    round trip but no transfer; offline, the index is trusted as-is."""
+
+    def __init__(self, directory: str, offline: bool = False):
+        self.directory = Path(directory)
+        self.offline = offline
+        (self.directory / "objects").mkdir(parents=True, exist_ok=True)
+        (self.directory / "urls").mkdir(exist_ok=True)
+
+    def _index_path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.directory / "urls" / f"{key}.json"
+
+    def _object_path(self, sha256: str) -> Path:
+        return self.directory / "objects" / sha256
+
+    def lookup(self, url: str) -> Optional[Dict[str, str]]:
+        """Index entry for a URL, if its content's still present."""
+        index_path = self._index_path(url)
+        if not index_path.exists():
+            return None
+        entry = json.loads(index_path.read_text())
+        if not self._object_path(entry["sha256"]).exists():
+            return None
+        return entry
+
+    def _store(self, url: str, response: requests.Response) -> Path:
+        with NamedTemporaryFile(dir=self.directory, delete=False) as spool:
+            try:
+                sha256 = _download(response, cast(BinaryIO, spool))
+            except Exception:
+                os.remove(spool.name)
+                raise
+        object_path = self._object_path(sha256)
+        os.replace(spool.name, object_path)
+        entry = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "sha256": sha256,
+            "url": url,
+        }
+        index_path = self._index_path(url)
+        tmp_path = index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entry))
+        os.replace(tmp_path, index_path)
+        return object_path
+
+    def fetch(self, url: str) -> Path:
+        """Path to a local copy of the URL's content, downloading it only if
+        we've no copy or the server's is newer."""
+        entry = self.lookup(url)
+        if self.offline:
+            if not entry:
+                raise NotCached(f"{url} is not in {self.directory}")
+            return self._object_path(entry["sha256"])
+
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        with requests.get(url, headers=headers, timeout=120,
+                          stream=True) as response:
+            if entry and response.status_code == requests.codes.not_modified:
+                return self._object_path(entry["sha256"])
+            response.raise_for_status()
+            return self._store(url, response)
+
+
+_cache: Optional[DownloadCache] = None
+
+
+@contextmanager
+def download_cache(directory: Optional[str],
+                   offline: bool = False) -> Iterator[Optional[DownloadCache]]:
+    """Route fetches within this block through a cache in `directory`. With
+    no directory, downloads aren't cached (and can't be offline)."""
+    global _cache
+    if offline and not directory:
+        raise ValueError("Working offline requires a cache directory")
+    previous = _cache
+    _cache = DownloadCache(directory, offline) if directory else None
+    try:
+        yield _cache
+    finally:
+        _cache = previous
+
+
+def add_cache_arguments(parser):
+    """The --cache-dir and --offline flags shared by our fetch commands."""
+    parser.add_argument(
+        "--cache-dir", default=os.environ.get("DOWNLOAD_CACHE_DIR"),
+        help="Keep downloads in this directory (default: $DOWNLOAD_CACHE_DIR)",
+    )
+    parser.add_argument(
+        "--offline", action="store_true",
+        help="Use only files already in the cache directory",
+    )
+
+
+def is_cached(url: str) -> bool:
+    return bool(_cache and _cache.lookup(url))
+
+
+def is_offline() -> bool:
+    return bool(_cache and _cache.offline)
+
+
+@contextmanager
+def fetch_to_tempfile(url: str) -> Iterator[BinaryIO]:
+    """Stream a download to disk, yielding it as an open file. Uses the
+    active download cache, if any; otherwise, the file's temporary."""
+    if _cache:
+        with _cache.fetch(url).open("rb") as cached:
+            yield cast(BinaryIO, cached)
+        return
+    with requests.get(url, timeout=120, stream=True) as response:
+        response.raise_for_status()
+        with TemporaryFile() as spool:
+            _download(response, cast(BinaryIO, spool))
+            spool.seek(0)
+            yield cast(BinaryIO, spool)
+
 
 @contextmanager
 def unzip_archive(buff: BinaryIO) -> Iterator[Path]:
-    """Recursively unzips archives."""
+    """Recursively unzips archives. Nested archives are read straight out
+    of their parent rather than being extracted first."""
     with ZipFile(buff) as archive:
-        with TemporaryDirectory() as tmp_dir_str:
-            tmp_dir = Path(tmp_dir_str)
-            archive.extractall(tmp_dir)
-            zips = [f for f in tmp_dir.iterdir() if f.suffix.lower() == ".zip"]
-            if zips:
-                with zips[0].open("rb") as inner_zip, \
-                        unzip_archive(cast(BinaryIO, inner_zip)) as inner_dir:
-                    yield inner_dir
-            else:
+        zips = [name for name in archive.namelist() if _is_zip(name)]
+        if zips:
+            with archive.open(zips[0]) as inner_zip, \
+                    unzip_archive(cast(BinaryIO, inner_zip)) as inner_dir:
+                yield inner_dir
+        else:
+            with TemporaryDirectory() as tmp_dir_str:
+                tmp_dir = Path(tmp_dir_str)
+                archive.extractall(tmp_dir)
                 yield tmp_dir
 
 
+@contextmanager
+def open_last_member(buff: BinaryIO) -> Iterator[BinaryIO]:
+    """Stream the last file in an archive, descending into nested archives.
+    Nothing is extracted to disk or read into memory."""
+    with ZipFile(buff) as archive:
+        file_name = archive.namelist().pop()
+        with archive.open(file_name) as member:
+            if _is_zip(file_name):
+                with open_last_member(cast(BinaryIO, member)) as inner:
+                    yield inner
+            else:
+                yield cast(BinaryIO, member)
+
+
 @contextmanager
 def fetch_and_unzip_dir(url: str) -> Iterator[Path]:
-    response = requests.get(url, timeout=120)
-    response.raise_for_status()
-    with unzip_archive(BytesIO(response.content)) as unzipped_path:
+    with fetch_to_tempfile(url) as spool, \
+            unzip_archive(spool) as unzipped_path:
         yield unzipped_path
 
 
 @contextmanager
-def fetch_and_unzip_file(url: str):
-    response = requests.get(url, timeout=120)
-    response.raise_for_status()
-    resp_buffer = BytesIO(response.content)
-    with ZipFile(resp_buffer) as archive:
-        file_name = archive.namelist().pop()
-        with archive.open(file_name) as unzipped_file:
-            yield unzipped_file
+def fetch_and_unzip_file(url: str) -> Iterator[BinaryIO]:
+    with fetch_to_tempfile(url) as spool, \
+            open_last_member(spool) as unzipped_file:
+        yield unzipped_file
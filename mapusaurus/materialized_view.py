@@ -7,6 +7,10 @@ class MaterializedView(models.Model):
         managed = False
 
     @classmethod
-    def rebuild_all(cls):
+    def rebuild_all(cls, concurrently: bool = False):
+        """A concurrent refresh doesn't lock out readers, but is slower and
+        requires a unique index on the view."""
+        modifier = "CONCURRENTLY " if concurrently else ""
         with connection.cursor() as cursor:
-            cursor.execute(f"REFRESH MATERIALIZED VIEW {cls._meta.db_table}")
+            cursor.execute(
+                f"REFRESH MATERIALIZED VIEW {modifier}{cls._meta.db_table}")
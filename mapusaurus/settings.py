@@ -144,6 +144,8 @@ MAPBOX_TOKEN = os.environ.get(
     "MAPBOX_TOKEN",
     "pk.eyJ1IjoiY2ZwYiIsImEiOiJodmtiSk5zIn0.VkCynzmVYcLBxbyHzlvaQw",
 )
+# At this zoom level and below, branch locations are returned as clusters
+BRANCH_CLUSTER_MAX_ZOOM = int(os.environ.get("BRANCH_CLUSTER_MAX_ZOOM", "9"))
 
 GOOGLE_ANALYTICS_ANONYMIZE_IP = True
 GOOGLE_ANALYTICS_SITE_SPEED = True
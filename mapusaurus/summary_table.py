@@ -0,0 +1,37 @@
+from typing import Optional
+
+from django.db import connection, models, transaction
+
+
+class YearlySummary(models.Model):
+    """An aggregate table which, unlike a materialized view, can be rebuilt
+    one year at a time. Subclasses define SOURCE_SQL, a SELECT which produces
+    rows (in field order) for the year given as %(year)s, or for every year
+    if that's NULL. Postgres folds away the NULL check, so a single year's
+    rebuild only reads that year's source rows."""
+    SOURCE_SQL = ""
+
+    class Meta:
+        abstract = True
+        managed = False
+
+    @classmethod
+    def rebuild_year(cls, year: int):
+        cls._rebuild(year)
+
+    @classmethod
+    def rebuild_all(cls):
+        cls._rebuild(None)
+
+    @classmethod
+    def _rebuild(cls, year: Optional[int]):
+        table = cls._meta.db_table
+        columns = ", ".join(f.column for f in cls._meta.concrete_fields)
+        params = {"year": year}
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"""
+                DELETE FROM {table}
+                WHERE %(year)s IS NULL OR year = %(year)s
+            """, params)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) {cls.SOURCE_SQL}", params)
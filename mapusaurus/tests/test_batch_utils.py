@@ -0,0 +1,134 @@
+from unittest.mock import Mock
+
+import pytest
+from django.contrib.contenttypes.models import ContentType
+
+from geo.models import Tract
+from geo.tests.factories import CountyFactory, TractFactory
+from hmda.models import LoanApplicationRecord
+from hmda.tests.factories import LARFactory
+from mapusaurus import batch_utils
+from mapusaurus.batch_utils import KeySetFilter, save_batches
+from respondents.models import Institution
+from respondents.tests.factories import InstitutionFactory
+
+
+@pytest.mark.django_db
+def test_key_set_filter(django_assert_num_queries):
+    tract, inst = TractFactory(), InstitutionFactory()
+    lar_filter = KeySetFilter(tract_id=Tract.objects.all(),
+                              institution_id=Institution.objects.all())
+    valid = LARFactory.build(tract=tract, institution=inst)
+    batch = [
+        valid,
+        LARFactory.build(institution=inst),   # with an unsaved tract
+        LARFactory.build(tract=tract),        # with an unsaved institution
+    ]
+
+    with django_assert_num_queries(2):
+        assert lar_filter(batch) == [valid]
+    with django_assert_num_queries(0):
+        assert lar_filter(batch[1:]) == []
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("mode, name", (
+    ("skip", "Old"), ("upsert", "New"), ("replace", "New"),
+))
+def test_save_batches_modes(mode, name):
+    county = CountyFactory()
+    TractFactory(geoid="11111111111", county=county, name="Old")
+    tracts = [TractFactory.build(geoid=geoid, county=county, name="New")
+              for geoid in ("11111111111", "22222222222")]
+
+    save_batches(iter(tracts), mode=mode)
+
+    assert Tract.objects.count() == 2
+    assert Tract.objects.get(pk="11111111111").name == name
+    assert Tract.objects.get(pk="22222222222").geom == tracts[1].geom
+
+
+@pytest.mark.django_db
+def test_save_batches_replace_flag():
+    county = CountyFactory()
+    old = TractFactory(geoid="11111111111", county=county, name="Old")
+    LARFactory(tract=old)
+    tract = TractFactory.build(geoid="11111111111", county=county, name="New")
+
+    save_batches(iter([tract]), replace=False)
+    assert Tract.objects.get().name == "Old"
+    # Replacing deletes and re-inserts, taking dependents with it
+    save_batches(iter([tract]), replace=True)
+    assert Tract.objects.get().name == "New"
+    assert not LoanApplicationRecord.objects.exists()
+
+
+@pytest.mark.django_db
+def test_save_batches_lar_conflicts():
+    lar = LARFactory(as_of_year=2014)
+    duplicate = LARFactory.build(
+        hmda_record_id=lar.hmda_record_id, as_of_year=2014,
+        tract=lar.tract, institution=lar.institution, loan_amount_000s=1)
+
+    save_batches(iter([duplicate]), mode="upsert",
+                 conflict_fields=("hmda_record_id", "as_of_year"))
+
+    lar.refresh_from_db()
+    assert lar.loan_amount_000s == 1
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("mode", ("skip", "upsert"))
+def test_save_batches_repeated_keys(mode):
+    county = CountyFactory()
+    tracts = [TractFactory.build(geoid="11111111111", county=county, name=name)
+              for name in ("First", "Last")]
+
+    save_batches(iter(tracts), mode=mode)
+
+    assert Tract.objects.get().name == "Last"
+
+
+@pytest.mark.django_db
+def test_save_batches_upsert_only_keys():
+    existing, _ = ContentType.objects.get_or_create(
+        app_label="geo", model="tract")
+    duplicate = ContentType(
+        id=existing.pk + 1000, app_label="geo", model="tract")
+
+    # With nothing but keys to update, conflicting rows are left be
+    save_batches(iter([duplicate]), mode="upsert",
+                 conflict_fields=("app_label", "model"))
+
+    assert ContentType.objects.get(app_label="geo", model="tract") == existing
+
+
+# Writer threads have their own connections, so can't see uncommitted rows
+@pytest.mark.django_db(transaction=True)
+def test_save_batches_pipelined():
+    county = CountyFactory()
+    tracts = [TractFactory.build(county=county) for _ in range(5)]
+
+    stats = batch_utils.save_pipelined(
+        batch_utils.batches(iter(tracts), 2), writers=2)
+
+    assert Tract.objects.count() == 5
+    assert stats.queued == stats.written == 3
+    assert stats.rows == 5
+    assert 1 <= stats.max_depth <= stats.queue_size == 4
+
+
+def test_save_pipelined_failure(monkeypatch):
+    monkeypatch.setattr(batch_utils, "save_batch",
+                        Mock(side_effect=ValueError("Bad batch")))
+    produced = []
+
+    def model_batches():
+        for idx in range(100):
+            produced.append(idx)
+            yield [Mock()]
+
+    with pytest.raises(ValueError):
+        batch_utils.save_pipelined(model_batches(), writers=1, queue_size=1)
+    # Parsing stops soon after the first failure
+    assert len(produced) < 100
@@ -0,0 +1,66 @@
+import csv
+import os
+from unittest.mock import Mock
+
+import pytest
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
+from hmda.management.commands.load_hmda import parse_row
+from hmda.models import LoanApplicationRecord
+from mapusaurus.batch_validation import BatchValidator
+
+EXCLUDE = ["tract", "institution"]
+
+
+def valid_values():
+    path = os.path.join(settings.BASE_DIR, "hmda", "tests", "mock_2013.csv")
+    with open(path) as csv_file:
+        return parse_row(next(csv.reader(csv_file)), 0)
+
+
+def test_cleans_like_full_clean():
+    values = valid_values()
+    model = LoanApplicationRecord(**values)
+    model.full_clean(exclude=EXCLUDE, validate_unique=False)
+
+    assert BatchValidator(LoanApplicationRecord, EXCLUDE)\
+        .validate([values]) == {}
+    assert values["property_type"] == "1"
+    assert values["loan_type"] == 1
+    for field in LoanApplicationRecord._meta.concrete_fields:
+        assert values[field.attname] == getattr(model, field.attname)
+
+
+def test_converts_before_cleaning(monkeypatch):
+    field = LoanApplicationRecord._meta.get_field("loan_amount_000s")
+    monkeypatch.setattr(field, "clean", Mock(side_effect=field.clean))
+    rows = [dict(valid_values(), loan_amount_000s=amount)
+            for amount in ("00160", 80, "-1")]
+
+    errors = BatchValidator(LoanApplicationRecord, EXCLUDE).validate(rows)
+
+    assert [row["loan_amount_000s"] for row in rows] == [160, 80, "-1"]
+    # Only the value which isn't valid once converted is cleaned
+    assert field.clean.call_count == 1
+    assert list(errors) == [2]
+
+
+@pytest.mark.parametrize("changes", (
+    {"action_taken": 9},
+    {"property_type": "7", "applicant_race_1": ""},
+    {"loan_amount_000s": -1},
+    {"rate_spread": "123456"},
+    {"loan_type": "x"},
+    {"agency_code": None},
+    {"applicant_race_2": "9", "edit_status": "12"},
+))
+def test_errors_match_full_clean(changes):
+    values = dict(valid_values(), **changes)
+    with pytest.raises(ValidationError) as err:
+        LoanApplicationRecord(**values).full_clean(
+            exclude=EXCLUDE, validate_unique=False)
+
+    rows = [valid_values(), values, valid_values()]
+    errors = BatchValidator(LoanApplicationRecord, EXCLUDE).validate(rows)
+    assert errors == {1: err.value.message_dict}
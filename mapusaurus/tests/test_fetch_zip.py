@@ -2,6 +2,9 @@ import re
 from io import BytesIO
 from zipfile import ZipFile
 
+import pytest
+import requests
+
 from mapusaurus import fetch_zip
 
 
@@ -17,6 +20,64 @@ def test_fetch_and_unzip_file(responses):
         assert unzipped.read() == b"Some contents"
 
 
+def test_fetch_and_unzip_file_nested(responses):
+    inner, outer = BytesIO(), BytesIO()
+    with ZipFile(inner, "w") as archive:
+        with archive.open("contents.txt", "w") as contained_file:
+            contained_file.write(b"Nested contents")
+    with ZipFile(outer, "w") as archive:
+        with archive.open("inner.ZIP", "w") as contained_file:
+            contained_file.write(inner.getvalue())
+    responses.add(responses.GET, re.compile(".*"), body=outer.getvalue())
+
+    url = "http://example.com/something.zip"
+    with fetch_zip.fetch_and_unzip_file(url) as unzipped:
+        assert unzipped.read() == b"Nested contents"
+
+
+def test_fetch_to_tempfile_checks_size(responses):
+    responses.add(responses.GET, re.compile(".*"), body=b"12345",
+                  headers={"Content-Length": "10"})
+
+    # Newer urllib3s catch this themselves
+    with pytest.raises(requests.exceptions.RequestException):
+        with fetch_zip.fetch_to_tempfile("http://example.com/a.zip"):
+            pass
+
+
+def test_download_cache_revalidates(responses, tmpdir):
+    url = "http://example.com/a.zip"
+    responses.add(responses.GET, url, body=b"contents",
+                  headers={"ETag": '"v1"'})
+    responses.add(responses.GET, url, status=304)
+
+    with fetch_zip.download_cache(str(tmpdir)):
+        for _ in range(2):
+            with fetch_zip.fetch_to_tempfile(url) as spool:
+                assert spool.read() == b"contents"
+        assert fetch_zip.is_cached(url)
+
+    assert "If-None-Match" not in responses.calls[0].request.headers
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+
+
+def test_download_cache_offline(responses, tmpdir):
+    url = "http://example.com/a.zip"
+    responses.add(responses.GET, url, body=b"contents")
+    with fetch_zip.download_cache(str(tmpdir)):
+        with fetch_zip.fetch_to_tempfile(url):
+            pass
+
+    with fetch_zip.download_cache(str(tmpdir), offline=True):
+        with fetch_zip.fetch_to_tempfile(url) as spool:
+            assert spool.read() == b"contents"
+        with pytest.raises(fetch_zip.NotCached):
+            with fetch_zip.fetch_to_tempfile("http://example.com/b.zip"):
+                pass
+    assert len(responses.calls) == 1
+    assert not fetch_zip.is_cached(url)   # outside the block
+
+
 def test_unzip_archive_is_recursive():
     outer, middle, inner = BytesIO(), BytesIO(), BytesIO()
     with ZipFile(inner, "w") as archive:
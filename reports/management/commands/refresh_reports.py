@@ -0,0 +1,73 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Type, Union
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from hmda.models import LARCube, LARYear
+from mapusaurus.materialized_view import MaterializedView
+from mapusaurus.summary_table import YearlySummary
+from reports.models import (
+    DisparityReport, IncomeHousingReport, LenderReport, PopulationReport)
+
+logger = logging.getLogger(__name__)
+Aggregate = Type[Union[MaterializedView, YearlySummary]]
+# Each stage only reads from raw data or earlier stages, so the members of a
+# stage can be refreshed side by side.
+STAGES: List[List[Aggregate]] = [
+    [LARYear, LARCube],
+    [PopulationReport, IncomeHousingReport, DisparityReport, LenderReport],
+]
+
+
+def refresh(model: Aggregate, concurrently: bool, year: Optional[int]):
+    """Refresh a single view or summary table, logging how long it took.
+    Summary tables are rebuilt within a transaction, so they never block
+    readers; materialized views only avoid doing so when `concurrently`."""
+    name = model._meta.db_table
+    start = time.monotonic()
+    try:
+        if issubclass(model, YearlySummary):
+            if year is None:
+                model.rebuild_all()
+            else:
+                model.rebuild_year(year)
+        else:
+            model.rebuild_all(concurrently=concurrently)
+    finally:
+        connection.close()
+    logger.info("Refreshed %s in %.1fs", name, time.monotonic() - start)
+
+
+class Command(BaseCommand):
+    help = "Refresh the aggregates which back reports, in dependency order."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--parallel", type=int, default=1,
+            help="Number of views to refresh at once within each stage",
+        )
+        parser.add_argument(
+            "--concurrently", action="store_true",
+            help="Refresh materialized views without blocking readers",
+        )
+        parser.add_argument(
+            "--year", type=int,
+            help="Only rebuild this year of the per-year summary tables",
+        )
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options["parallel"]) as pool:
+            for stage in STAGES:
+                futures = [
+                    pool.submit(refresh, model, options["concurrently"],
+                                options["year"])
+                    for model in stage
+                ]
+                for future in futures:
+                    future.result()
+        logger.info("Refreshed all reports in %.1fs",
+                    time.monotonic() - start)
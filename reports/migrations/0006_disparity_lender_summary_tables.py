@@ -0,0 +1,138 @@
+from importlib import import_module
+
+from django.db import migrations
+
+
+def original_sql(migration_name, table):
+    """SQL which created a materialized view in an earlier migration,
+    retargeted at a renamed view."""
+    module = import_module(f"reports.migrations.{migration_name}")
+    sql = module.Migration.operations[0].sql
+    return sql.replace(
+        f"MATERIALIZED VIEW {table}", f"MATERIALIZED VIEW {table}_mv")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hmda', '0004_laryear_summary_table'),
+        ('reports', '0005_disparityreport_incomehousingreport_lenderreport_populationreport'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            ALTER MATERIALIZED VIEW reports_disparityreport
+            RENAME TO reports_disparityreport_mv
+            """,
+            [
+                """
+                ALTER MATERIALIZED VIEW reports_disparityreport_mv
+                RENAME TO reports_disparityreport
+                """,
+                """
+                CREATE INDEX reports_disparityreport_idx
+                ON reports_disparityreport (
+                    year, county_id,
+                    lien_status, loan_purpose, owner_occupancy, property_type
+                )
+                """,
+                """
+                CREATE INDEX reports_disparityreport_approved_idx
+                ON reports_disparityreport (
+                    year, county_id,
+                    lien_status, loan_purpose, owner_occupancy, property_type
+                )
+                WHERE approved IS true
+                """,
+            ],
+        ),
+        migrations.RunSQL(
+            """
+            CREATE TABLE reports_disparityreport
+            AS SELECT * FROM reports_disparityreport_mv
+            """,
+            "DROP TABLE reports_disparityreport",
+        ),
+        migrations.RunSQL(
+            "DROP MATERIALIZED VIEW reports_disparityreport_mv",
+            original_sql("0003_disparityreport", "reports_disparityreport"),
+        ),
+        migrations.RunSQL(
+            [
+                "ALTER TABLE reports_disparityreport ADD PRIMARY KEY (compound_id)",
+                """
+                CREATE INDEX reports_disparityreport_idx
+                ON reports_disparityreport (
+                    year, county_id,
+                    lien_status, loan_purpose, owner_occupancy, property_type
+                )
+                """,
+                """
+                CREATE INDEX reports_disparityreport_approved_idx
+                ON reports_disparityreport (
+                    year, county_id,
+                    lien_status, loan_purpose, owner_occupancy, property_type
+                )
+                WHERE approved IS true
+                """,
+            ],
+            [
+                "DROP INDEX reports_disparityreport_approved_idx",
+                "DROP INDEX reports_disparityreport_idx",
+                """
+                ALTER TABLE reports_disparityreport
+                DROP CONSTRAINT reports_disparityreport_pkey
+                """,
+            ],
+        ),
+        migrations.RunSQL(
+            """
+            ALTER MATERIALIZED VIEW reports_lenderreport
+            RENAME TO reports_lenderreport_mv
+            """,
+            [
+                """
+                ALTER MATERIALIZED VIEW reports_lenderreport_mv
+                RENAME TO reports_lenderreport
+                """,
+                """
+                CREATE INDEX reports_lenderreport_idx
+                ON reports_lenderreport (
+                    year, county_id,
+                    lien_status, loan_purpose, owner_occupancy, property_type
+                )
+                """,
+            ],
+        ),
+        migrations.RunSQL(
+            """
+            CREATE TABLE reports_lenderreport
+            AS SELECT * FROM reports_lenderreport_mv
+            """,
+            "DROP TABLE reports_lenderreport",
+        ),
+        migrations.RunSQL(
+            "DROP MATERIALIZED VIEW reports_lenderreport_mv",
+            original_sql("0004_lenderreport", "reports_lenderreport"),
+        ),
+        migrations.RunSQL(
+            [
+                "ALTER TABLE reports_lenderreport ADD PRIMARY KEY (compound_id)",
+                """
+                CREATE INDEX reports_lenderreport_idx
+                ON reports_lenderreport (
+                    year, county_id,
+                    lien_status, loan_purpose, owner_occupancy, property_type
+                )
+                """,
+            ],
+            [
+                "DROP INDEX reports_lenderreport_idx",
+                """
+                ALTER TABLE reports_lenderreport
+                DROP CONSTRAINT reports_lenderreport_pkey
+                """,
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """REFRESH MATERIALIZED VIEW CONCURRENTLY needs a unique index."""
+
+    dependencies = [
+        ('reports', '0006_disparity_lender_summary_tables'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            CREATE UNIQUE INDEX reports_populationreport_compound_id
+            ON reports_populationreport (compound_id)
+            """,
+            "DROP INDEX reports_populationreport_compound_id",
+        ),
+        migrations.RunSQL(
+            """
+            CREATE UNIQUE INDEX reports_incomehousingreport_compound_id
+            ON reports_incomehousingreport (compound_id)
+            """,
+            "DROP INDEX reports_incomehousingreport_compound_id",
+        ),
+    ]
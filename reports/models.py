@@ -6,6 +6,7 @@ from django.db.models.functions import Coalesce
 
 from geo.models import County, Division
 from mapusaurus.materialized_view import MaterializedView
+from mapusaurus.summary_table import YearlySummary
 from reports.serializers import ReportInput
 from respondents.models import Institution
 
@@ -90,7 +91,7 @@ class IncomeHousingReport(MaterializedView):
                 )
 
 
-class DisparityReport(MaterializedView):
+class DisparityReport(YearlySummary):
     compound_id = models.CharField(max_length=4 + 5 + 1 + 4, primary_key=True)
     year = models.SmallIntegerField()
     county = models.ForeignKey(County, on_delete=models.DO_NOTHING)
@@ -114,6 +115,112 @@ class DisparityReport(MaterializedView):
     mint = models.IntegerField(verbose_name="Applicant in Minority Tract")
     whitet = models.IntegerField(verbose_name="White Majority Tracts")
 
+    SOURCE_SQL = """
+        SELECT
+            as_of_year
+            || tract.county_id
+            || CASE WHEN action_taken = 1 THEN 'A' ELSE 'D' END
+            || lien_status
+            || loan_purpose
+            || owner_occupancy
+            || property_type
+            AS compound_id,
+            as_of_year AS year,
+            tract.county_id,
+            action_taken = 1 AS approved,
+            lien_status,
+            loan_purpose,
+            owner_occupancy,
+            property_type,
+            COUNT(hmda_record_id) AS all_records,
+            COUNT(hmda_record_id) FILTER (
+                WHERE applicant_ethnicity = '2'
+                AND applicant_race_1 = '5'
+            ) AS white,
+            COUNT(hmda_record_id) FILTER (
+                WHERE applicant_ethnicity = '2'
+                AND applicant_race_1 = '3'
+            ) AS black,
+            COUNT(hmda_record_id) FILTER (
+                WHERE applicant_ethnicity = '1'
+            ) AS hispanic,
+            COUNT(hmda_record_id) FILTER (
+                WHERE applicant_ethnicity = '2'
+                AND applicant_race_1 = '2'
+            ) AS asian,
+            COUNT(hmda_record_id) FILTER (
+                WHERE applicant_ethnicity = '1'
+                OR applicant_race_1 IN ('1', '2', '3', '4')
+            ) AS minb,
+            COUNT(hmda_record_id) FILTER (
+                WHERE applicant_income_000s < (
+                    COALESCE(
+                        metdivdem.ffiec_est_med_fam_income,
+                        cbsadem.ffiec_est_med_fam_income,
+                        lowpopdem.ffiec_est_med_fam_income,
+                        0
+                    ) * .8 / 1000
+                )
+            ) AS lmib,
+            COUNT(hmda_record_id) FILTER (
+                WHERE applicant_income_000s >= (
+                    COALESCE(
+                        metdivdem.ffiec_est_med_fam_income,
+                        cbsadem.ffiec_est_med_fam_income,
+                        lowpopdem.ffiec_est_med_fam_income,
+                        0
+                    ) * .8 / 1000
+                )
+            ) AS muib,
+            COUNT(hmda_record_id) FILTER (
+                WHERE applicant_sex = 2
+            ) AS female,
+            COUNT(hmda_record_id) FILTER (
+                WHERE applicant_sex = 1
+            ) AS male,
+            COUNT(hmda_record_id) FILTER (
+                WHERE tractdem.income_indicator IN ('low', 'mod')
+            ) AS lmit,
+            COUNT(hmda_record_id) FILTER (
+                WHERE tractdem.income_indicator IN ('mid', 'high')
+            ) AS muit,
+            COUNT(hmda_record_id) FILTER (
+                WHERE tractdem.non_hispanic_white
+                < tractdem.persons / 2
+            ) AS mint,
+            COUNT(hmda_record_id) FILTER (
+                WHERE tractdem.non_hispanic_white
+                >= tractdem.persons / 2
+            ) AS whitet
+            FROM hmda_loanapplicationrecord lar
+            INNER JOIN geo_tract tract ON (lar.tract_id = tract.geoid)
+            INNER JOIN geo_county county
+                ON (tract.county_id = county.geoid)
+            LEFT JOIN ffiec_tractdemographics tractdem
+                ON (tractdem.tract_id = lar.tract_id
+                    AND tractdem.year = as_of_year)
+            LEFT JOIN ffiec_metdivdemographics metdivdem
+                ON (metdivdem.metdiv_id = county.metdiv_id
+                    AND metdivdem.year = as_of_year)
+            LEFT JOIN ffiec_cbsademographics cbsadem
+                ON (cbsadem.cbsa_id = county.cbsa_id
+                    AND cbsadem.year = as_of_year)
+            LEFT JOIN ffiec_lowpopulationdemographics lowpopdem
+                ON (lowpopdem.state_id = county.state_id
+                    AND lowpopdem.year = as_of_year)
+            WHERE action_taken <= 5
+            AND (%(year)s IS NULL OR as_of_year = %(year)s)
+            GROUP BY (
+                as_of_year,
+                tract.county_id,
+                action_taken = 1,
+                lien_status,
+                loan_purpose,
+                owner_occupancy,
+                property_type
+            )
+    """
+
     GROUPED_COLUMNS = (
         ("white", ["white", "black", "hispanic", "asian", "minb"]),
         ("muib", ["lmib"]),
@@ -187,7 +294,7 @@ class GroupedDisparityRows(NamedTuple):
     rows: List[DisparityRow]
 
 
-class LenderReport(MaterializedView):
+class LenderReport(YearlySummary):
     compound_id = models.CharField(max_length=4 + 5 + 4 + 15, primary_key=True)
     year = models.SmallIntegerField()
     county = models.ForeignKey(County, on_delete=models.DO_NOTHING)
@@ -204,6 +311,87 @@ class LenderReport(MaterializedView):
     mint_approved = models.IntegerField()
     minb_approved = models.IntegerField()
 
+    SOURCE_SQL = """
+        SELECT
+            as_of_year
+            || tract.county_id
+            || lien_status
+            || loan_purpose
+            || owner_occupancy
+            || property_type
+            || lender.institution_id
+            AS compound_id,
+            as_of_year AS year,
+            tract.county_id,
+            lien_status,
+            loan_purpose,
+            owner_occupancy,
+            property_type,
+            lender.institution_id AS lender_id,
+            lender.name AS lender_name,
+            COUNT(hmda_record_id) AS applications,
+            COUNT(hmda_record_id) FILTER (
+                WHERE action_taken = 1
+            ) AS approved,
+            COUNT(hmda_record_id) FILTER (
+                WHERE action_taken = 1
+                AND tractdem.income_indicator IN ('low', 'mod')
+            ) AS lmit_approved,
+            COUNT(hmda_record_id) FILTER (
+                WHERE action_taken = 1
+                AND applicant_income_000s < (
+                    COALESCE(
+                        metdivdem.ffiec_est_med_fam_income,
+                        cbsadem.ffiec_est_med_fam_income,
+                        lowpopdem.ffiec_est_med_fam_income,
+                        0
+                    ) * .8 / 1000
+                )
+            ) AS lmib_approved,
+            COUNT(hmda_record_id) FILTER (
+                WHERE action_taken = 1
+                AND tractdem.non_hispanic_white < tractdem.persons / 2
+            ) AS mint_approved,
+            COUNT(hmda_record_id) FILTER (
+                WHERE action_taken = 1
+                AND (
+                    applicant_ethnicity = '1'
+                    OR applicant_race_1 IN ('1', '2', '3', '4')
+                )
+            ) AS minb_approved
+            FROM hmda_loanapplicationrecord lar
+            INNER JOIN geo_tract tract ON (lar.tract_id = tract.geoid)
+            INNER JOIN geo_county county
+                ON (tract.county_id = county.geoid)
+            INNER JOIN respondents_institution lender ON (
+                lar.institution_id = lender.institution_id
+            )
+            LEFT JOIN ffiec_tractdemographics tractdem
+                ON (tractdem.tract_id = lar.tract_id
+                    AND tractdem.year = as_of_year)
+            LEFT JOIN ffiec_metdivdemographics metdivdem
+                ON (metdivdem.metdiv_id = county.metdiv_id
+                    AND metdivdem.year = as_of_year)
+            LEFT JOIN ffiec_cbsademographics cbsadem
+                ON (cbsadem.cbsa_id = county.cbsa_id
+                    AND cbsadem.year = as_of_year)
+            LEFT JOIN ffiec_lowpopulationdemographics lowpopdem
+                ON (lowpopdem.state_id = county.state_id
+                    AND lowpopdem.year = as_of_year)
+            WHERE action_taken <= 5
+            AND (%(year)s IS NULL OR as_of_year = %(year)s)
+            GROUP BY (
+                as_of_year,
+                tract.county_id,
+                lien_status,
+                loan_purpose,
+                owner_occupancy,
+                property_type,
+                lender.institution_id,
+                lender.name
+            )
+    """
+
     AGG_COLUMNS = (
         "applications", "approved", "lmit_approved", "lmib_approved",
         "mint_approved", "minb_approved",
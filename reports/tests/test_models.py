@@ -33,7 +33,7 @@ def test_population_report():
     assert asian != 0
     assert poverty != 0
 
-    models.PopulationReport.rebuild_all()
+    models.PopulationReport.rebuild_all(concurrently=True)
     assert list(models.PopulationReport.generate_for(metdiv, 2010)) == [
         ("All Population", total, 100),
         ("White", white, white * 100 // total),
@@ -327,6 +327,24 @@ def test_top_lender_lender_selection():
     assert rows[2].requested is True
 
 
+@pytest.mark.django_db
+def test_lender_report_rebuild_year():
+    lender = InstitutionFactory()
+    tract = TractFactory()
+    LARFactory.create_batch(
+        2, action_taken=1, as_of_year=2011, tract=tract, institution=lender)
+    models.LenderReport.rebuild_all()
+    LARFactory.create_batch(
+        3, action_taken=1, as_of_year=2011, tract=tract, institution=lender)
+    LARFactory.create_batch(
+        4, action_taken=1, as_of_year=2012, tract=tract, institution=lender)
+
+    models.LenderReport.rebuild_year(2011)
+
+    assert list(models.LenderReport.objects.values_list(
+        "year", "applications")) == [(2011, 5)]
+
+
 @pytest.mark.django_db
 def test_top_lender_stats():
     lender = InstitutionFactory()
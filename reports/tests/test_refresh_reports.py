@@ -0,0 +1,34 @@
+from unittest.mock import Mock
+
+from hmda.models import LARYear
+from reports.management.commands import refresh_reports
+from reports.models import DisparityReport, PopulationReport
+
+
+def test_handle_stage_order(monkeypatch):
+    monkeypatch.setattr(refresh_reports, "refresh", Mock())
+    monkeypatch.setattr(refresh_reports, "STAGES", [
+        [LARYear], [PopulationReport, DisparityReport]])
+
+    refresh_reports.Command().handle(
+        parallel=2, concurrently=True, year=2012)
+
+    calls = [c[0] for c in refresh_reports.refresh.call_args_list]
+    assert calls[0] == (LARYear, True, 2012)
+    assert set(calls[1:]) == {
+        (PopulationReport, True, 2012), (DisparityReport, True, 2012)}
+
+
+def test_refresh_dispatch(monkeypatch):
+    monkeypatch.setattr(refresh_reports, "connection", Mock())
+    monkeypatch.setattr(PopulationReport, "rebuild_all", Mock())
+    monkeypatch.setattr(DisparityReport, "rebuild_all", Mock())
+    monkeypatch.setattr(DisparityReport, "rebuild_year", Mock())
+
+    refresh_reports.refresh(PopulationReport, True, 2012)
+    refresh_reports.refresh(DisparityReport, True, 2012)
+    refresh_reports.refresh(DisparityReport, True, None)
+
+    PopulationReport.rebuild_all.assert_called_once_with(concurrently=True)
+    DisparityReport.rebuild_year.assert_called_once_with(2012)
+    DisparityReport.rebuild_all.assert_called_once_with()
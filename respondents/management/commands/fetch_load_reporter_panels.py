@@ -5,8 +5,10 @@ from io import TextIOWrapper
 import requests
 from django.core.management.base import BaseCommand
 
-from mapusaurus.fetch_zip import fetch_and_unzip_file
-from respondents.management.commands.load_reporter_panel import ReporterRow
+from mapusaurus.fetch_zip import (
+    add_cache_arguments, download_cache, fetch_and_unzip_file)
+from respondents.management.commands.load_reporter_panel import (
+    ReporterRow, update_institutions)
 
 logger = logging.getLogger(__name__)
 
@@ -15,8 +17,8 @@ def fetch_pre_2017(year: int):
     """Update institutions from a pre-2017 file format."""
     url = f"http://www.ffiec.gov/hmdarawdata/OTHER/{year}HMDAReporterPanel.zip"
     with fetch_and_unzip_file(url) as panel_file:
-        for line in TextIOWrapper(panel_file, "utf-8"):
-            ReporterRow.from_line(line).update_institution()
+        update_institutions([ReporterRow.from_line(line)
+                             for line in TextIOWrapper(panel_file, "utf-8")])
 
 
 def fetch_post_2016(year: int):
@@ -25,8 +27,8 @@ def fetch_post_2016(year: int):
            f"{year}_public_panel_csv.zip")
     with fetch_and_unzip_file(url) as panel_file:
         csv_file = csv.reader(TextIOWrapper(panel_file, "utf-8"))
-        for line in csv_file:
-            ReporterRow.from_csv_row(line).update_institution()
+        update_institutions(
+            [ReporterRow.from_csv_row(line) for line in csv_file])
 
 
 class Command(BaseCommand):
@@ -37,14 +39,16 @@ class Command(BaseCommand):
         parser.add_argument("--year", type=int, nargs="*", default=choices,
                             choices=choices,
                             help="Years to download. Defaults to >=2012")
+        add_cache_arguments(parser)
 
     def handle(self, *args, **options):
-        for year in options["year"]:
-            logger.info("Loading Reporter Panel for %s", year)
-            try:
-                if year > 2016:
-                    fetch_post_2016(year)
-                else:
-                    fetch_pre_2017(year)
-            except requests.exceptions.RequestException:
-                logger.exception("Couldn't process year %s", year)
+        with download_cache(options["cache_dir"], options["offline"]):
+            for year in options["year"]:
+                logger.info("Loading Reporter Panel for %s", year)
+                try:
+                    if year > 2016:
+                        fetch_post_2016(year)
+                    else:
+                        fetch_pre_2017(year)
+                except requests.exceptions.RequestException:
+                    logger.exception("Couldn't process year %s", year)
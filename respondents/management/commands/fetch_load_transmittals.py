@@ -5,10 +5,12 @@ from io import TextIOWrapper
 import requests
 from django.core.management.base import BaseCommand
 
-from mapusaurus.batch_utils import save_batches
-from mapusaurus.fetch_zip import fetch_and_unzip_file
+from mapusaurus.batch_utils import add_writer_arguments, save_batches
+from mapusaurus.fetch_zip import (
+    add_cache_arguments, download_cache, fetch_and_unzip_file)
 from respondents.management.commands.load_transmittal import load_from_csv
 from respondents.models import Agency
+from respondents.zipcode_utils import ZipcodeResolver
 
 logger = logging.getLogger(__name__)
 FILE_URLS = {}
@@ -32,19 +34,27 @@ class Command(BaseCommand):
                             choices=choices,
                             help="Years to download. Defaults to >=2012")
         parser.add_argument("--replace", action="store_true")
+        add_writer_arguments(parser)
+        add_cache_arguments(parser)
 
     def handle(self, *args, **options):
-        agencies = Agency.objects.get_all_by_code()
-        for year in options["year"]:
-            delimiter = "," if year >= 2017 else "\t"
-            logger.info("Loading Transmittal Sheet for %s", year)
-            try:
-                with fetch_and_unzip_file(FILE_URLS[year]) as transmittal_file:
-                    csv_file = csv.reader(
-                        TextIOWrapper(transmittal_file, "utf-8"),
-                        delimiter=delimiter,
-                    )
-                    institutions = load_from_csv(agencies, csv_file)
-                    save_batches(institutions, options["replace"])
-            except requests.exceptions.RequestException:
-                logger.exception("Couldn't process year %s", year)
+        with download_cache(options["cache_dir"], options["offline"]):
+            agencies = Agency.objects.get_all_by_code()
+            zipcodes = ZipcodeResolver()
+            for year in options["year"]:
+                delimiter = "," if year >= 2017 else "\t"
+                logger.info("Loading Transmittal Sheet for %s", year)
+                try:
+                    url = FILE_URLS[year]
+                    with fetch_and_unzip_file(url) as transmittal_file:
+                        csv_file = csv.reader(
+                            TextIOWrapper(transmittal_file, "utf-8"),
+                            delimiter=delimiter,
+                        )
+                        institutions = zipcodes.with_saved_zipcodes(
+                            load_from_csv(agencies, csv_file, zipcodes))
+                        save_batches(institutions, options["replace"],
+                                     batch_size=1000,
+                                     writers=options["writers"])
+                except requests.exceptions.RequestException:
+                    logger.exception("Couldn't process year %s", year)
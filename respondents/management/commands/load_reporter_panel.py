@@ -1,9 +1,12 @@
 import argparse
 import logging
-from typing import List, NamedTuple
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 
+from mapusaurus.batch_utils import batches
 from respondents.models import Institution, ParentInstitution
 
 logger = logging.getLogger(__name__)
@@ -106,33 +109,39 @@ class ReporterRow(NamedTuple):
                 rssd_id=self.parent_rssd_id,
             ).first()
 
+    def non_reporting_parent_fields(self):
+        return {
+            "year": self.year,
+            "name": self.parent_name,
+            "city": self.parent_city,
+            "state": self.parent_state,
+            "rssd_id": self.parent_rssd_id,
+        }
+
     def non_reporting_parent(self):
         parent, _ = ParentInstitution.objects.get_or_create(
             rssd_id=self.parent_rssd_id,
             year=self.year,
-            defaults={
-                "year": self.year,
-                "name": self.parent_name,
-                "city": self.parent_city,
-                "state": self.parent_state,
-                "rssd_id": self.parent_rssd_id,
-            },
+            defaults=self.non_reporting_parent_fields(),
         )
         return parent
 
-    def top_holder(self):
+    def top_holder_fields(self):
         state = self.top_holder_state if self.top_holder_state != "0" else None
+        return {
+            "year": self.year,
+            "name": self.top_holder_name,
+            "city": self.top_holder_city,
+            "rssd_id": self.top_holder_rssd_id,
+            "country": self.top_holder_country,
+            "state": state,
+        }
+
+    def top_holder(self):
         parent, _ = ParentInstitution.objects.get_or_create(
             rssd_id=self.top_holder_rssd_id,
             year=self.year,
-            defaults={
-                "year": self.year,
-                "name": self.top_holder_name,
-                "city": self.top_holder_city,
-                "rssd_id": self.top_holder_rssd_id,
-                "country": self.top_holder_country,
-                "state": state,
-            },
+            defaults=self.top_holder_fields(),
         )
         return parent
 
@@ -172,6 +181,138 @@ class ReporterRow(NamedTuple):
         bank.save()
 
 
+class PanelYear:
+    """A year's institutions and parent institutions, loaded up front (in
+    two queries) so that a whole reporter panel can be resolved in memory.
+    Mirrors ReporterRow's lookups, including their preference for the
+    lowest primary key."""
+
+    def __init__(self, year: str):
+        self.by_respondent: Dict[Tuple[int, str], Institution] = {}
+        self.by_parent_id: Dict[Tuple[str, str], Institution] = {}
+        self.by_rssd: Dict[str, Institution] = {}
+        institutions = Institution.objects\
+            .filter(year=year)\
+            .select_related("zip_code")\
+            .order_by("pk")
+        for inst in institutions:
+            self.by_respondent.setdefault(
+                (inst.agency_id, inst.respondent_id), inst)
+            self.by_parent_id.setdefault(
+                (inst.respondent_id, inst.zip_code.state), inst)
+        self.parents = {
+            parent.rssd_id: parent
+            for parent in ParentInstitution.objects.filter(year=year)
+        }
+        self.new_parents: List[ParentInstitution] = []
+
+    def index_rssds(self):
+        self.by_rssd.clear()
+        for inst in self.by_respondent.values():
+            self.by_rssd.setdefault(inst.rssd_id, inst)
+
+    def institution(self, row: ReporterRow) -> Optional[Institution]:
+        return self.by_respondent.get((row.agency_code, row.respondent_id))
+
+    def parent(self, row: ReporterRow) -> Optional[Institution]:
+        return self.by_parent_id.get((row.parent_id, row.parent_state)) \
+            or self.by_rssd.get(row.parent_rssd_id)
+
+    def parent_institution(self, rssd_id: str,
+                           fields: Dict) -> ParentInstitution:
+        """Get or (lazily) create a ParentInstitution."""
+        if rssd_id not in self.parents:
+            self.parents[rssd_id] = ParentInstitution(**fields)
+            self.new_parents.append(self.parents[rssd_id])
+        return self.parents[rssd_id]
+
+
+def _fk_id(model, field_name: str):
+    """The id of a foreign key, even if it was assigned before saving."""
+    field = model._meta.get_field(field_name)
+    if field.is_cached(model):
+        related = field.get_cached_value(model)
+        return related and related.pk
+    return getattr(model, field.attname)
+
+
+def update_year(year: str, rows: List[ReporterRow]):
+    """Set-based version of ReporterRow.update_institution for all of a
+    year's rows. Respondents' RSSD IDs are all assigned before parents are
+    looked up by them."""
+    panel = PanelYear(year)
+    banks: Dict[str, Institution] = {}
+    for row in rows:
+        bank = panel.institution(row)
+        if not bank:
+            logger.warning("Missing institution %s %s %s",
+                           row.year, row.agency_code, row.respondent_id)
+            continue
+        if row.respondent_rssd_id == "0000000000":
+            bank.rssd_id = None
+        else:
+            bank.rssd_id = row.respondent_rssd_id
+        banks[bank.pk] = bank
+    panel.index_rssds()
+
+    for row in rows:
+        bank = panel.institution(row)
+        if not bank:
+            continue
+        if row.parent_id == "":
+            bank.parent = None
+        else:
+            parent = panel.parent(row)
+            if parent:
+                bank.parent = parent
+            else:
+                bank.non_reporting_parent = panel.parent_institution(
+                    row.parent_rssd_id, row.non_reporting_parent_fields())
+        if row.top_holder_name == "":
+            bank.top_holder = None
+        else:
+            bank.top_holder = panel.parent_institution(
+                row.top_holder_rssd_id, row.top_holder_fields())
+
+    with transaction.atomic():
+        ParentInstitution.objects.bulk_create(panel.new_parents)
+        for batch in batches(iter(banks.values()), 1000):
+            if not batch:
+                continue
+            values = [
+                (bank.pk, bank.rssd_id, _fk_id(bank, "parent"),
+                 _fk_id(bank, "non_reporting_parent"),
+                 _fk_id(bank, "top_holder"))
+                for bank in batch
+            ]
+            placeholders = ", ".join(
+                ["(%s, %s::varchar, %s::varchar, %s::int, %s::int)"]
+                * len(values))
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    UPDATE respondents_institution AS inst
+                    SET rssd_id = v.rssd_id,
+                        parent_id = v.parent_id,
+                        non_reporting_parent_id = v.non_reporting_parent_id,
+                        top_holder_id = v.top_holder_id
+                    FROM (VALUES {placeholders})
+                        AS v(institution_id, rssd_id, parent_id,
+                             non_reporting_parent_id, top_holder_id)
+                    WHERE inst.institution_id = v.institution_id
+                """, [field for row in values for field in row])
+
+
+def update_institutions(rows: Iterable[ReporterRow]):
+    """Update institutions from a whole reporter panel, a year at a time.
+    Only a handful of queries are needed per year, rather than several per
+    row."""
+    by_year: Dict[str, List[ReporterRow]] = defaultdict(list)
+    for row in rows:
+        by_year[row.year].append(row)
+    for year, year_rows in by_year.items():
+        update_year(year, year_rows)
+
+
 class Command(BaseCommand):
     help = "Reporter panel contains parent information. Loads that."    # noqa
 
@@ -179,5 +320,5 @@ class Command(BaseCommand):
         parser.add_argument("file_name", type=argparse.FileType("r"))
 
     def handle(self, *args, **options):
-        for line in options["file_name"]:
-            ReporterRow.from_line(line).update_institution()
+        update_institutions(
+            [ReporterRow.from_line(line) for line in options["file_name"]])
@@ -6,9 +6,9 @@ from typing import Dict, Iterator, List
 from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand
 
-from mapusaurus.batch_utils import save_batches
+from mapusaurus.batch_utils import add_writer_arguments, save_batches
 from respondents.models import Agency, Institution
-from respondents.zipcode_utils import create_zipcode
+from respondents.zipcode_utils import ZipcodeResolver
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,10 @@ def fixup(line):
 
 
 def load_from_csv(
-        agencies: Dict[int, Agency], transmittal_reader: Iterator[List[str]]):
+        agencies: Dict[int, Agency], transmittal_reader: Iterator[List[str]],
+        zipcodes: ZipcodeResolver):
+    """Institutions from a transmittal sheet. Their zip codes may not be
+    saved yet; pass them through `zipcodes.with_saved_zipcodes`."""
     for zero_line_number, line in enumerate(transmittal_reader):
         line_number = zero_line_number + 1
         line = fixup(line)
@@ -33,7 +36,7 @@ def load_from_csv(
             )
             break
         year = int(line[0])
-        zipcode_city = create_zipcode(
+        zipcode_city = zipcodes.resolve(
             city=line[6], state=line[7], year=year, zip_code=line[8])
 
         agency_id = line[2]
@@ -61,7 +64,8 @@ def load_from_csv(
             assets=int(line[17]) if len(line) == 22 else None,
         )
         try:
-            inst.full_clean(exclude=["agency"], validate_unique=False)
+            inst.full_clean(exclude=["agency", "zip_code"],
+                            validate_unique=False)
         except ValidationError:
             logger.exception("Line %s has invalid data:", line_number)
             break
@@ -76,11 +80,15 @@ class Command(BaseCommand):
         parser.add_argument("file_name", type=argparse.FileType("r"))
         parser.add_argument("--replace", action="store_true")
         parser.add_argument("--delimiter", default="\t")
+        add_writer_arguments(parser)
 
     def handle(self, *args, **options):
         agencies = Agency.objects.get_all_by_code()
         transmittal_reader = csv.reader(
             options["file_name"], delimiter=options["delimiter"])
-        institutions = load_from_csv(agencies, transmittal_reader)
-        save_batches(institutions, options["replace"], batch_size=1000)
+        zipcodes = ZipcodeResolver()
+        institutions = zipcodes.with_saved_zipcodes(
+            load_from_csv(agencies, transmittal_reader, zipcodes))
+        save_batches(institutions, options["replace"], batch_size=1000,
+                     writers=options["writers"])
         options["file_name"].close()
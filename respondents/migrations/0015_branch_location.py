@@ -0,0 +1,24 @@
+import django.contrib.gis.db.models.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('respondents', '0001_squashed_0014_auto_20181229_0439'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(null=True, srid=4326),
+        ),
+        migrations.RunSQL(
+            """
+            UPDATE respondents_branch
+            SET location = ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+            """,
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Derive Branch.location from lon/lat in the database, as Model.save()
+    isn't called by bulk_create, update() or loaddata."""
+
+    dependencies = [
+        ('respondents', '0015_branch_location'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [
+                """
+                CREATE FUNCTION respondents_branch_set_location()
+                RETURNS trigger AS $$
+                BEGIN
+                    NEW.location := ST_SetSRID(
+                        ST_MakePoint(NEW.lon, NEW.lat), 4326);
+                    RETURN NEW;
+                END;
+                $$ LANGUAGE plpgsql
+                """,
+                """
+                CREATE TRIGGER respondents_branch_set_location
+                BEFORE INSERT OR UPDATE ON respondents_branch
+                FOR EACH ROW EXECUTE PROCEDURE
+                respondents_branch_set_location()
+                """,
+                """
+                UPDATE respondents_branch
+                SET location = ST_SetSRID(ST_MakePoint(lon, lat), 4326)
+                WHERE location IS NULL
+                """,
+            ],
+            [
+                "DROP TRIGGER respondents_branch_set_location "
+                "ON respondents_branch",
+                "DROP FUNCTION respondents_branch_set_location()",
+            ],
+        ),
+    ]
@@ -1,6 +1,4 @@
-import json
-
-from django.db import models
+from django.contrib.gis.db import models
 from django.template import defaultfilters
 from localflavor.us.models import USStateField
 
@@ -154,19 +152,6 @@ class Branch(models.Model):
     zipcode = models.IntegerField()
     lat = models.FloatField(help_text="y")
     lon = models.FloatField(help_text="x")
-
-    def branch_as_geojson(self):
-        """Convert this model into a geojson string"""
-        geojson = {"type": "Feature",
-                   "properties": {
-                       "year": self.year,
-                       "institution_id": self.institution_id,
-                       "name": self.name,
-                       "street": self.street,
-                       "city": self.city,
-                       "state": self.state,
-                       "zipcode": self.zipcode,
-                       "lat": self.lat,
-                       "lon": self.lon}}
-        geojson = json.dumps(geojson)
-        return geojson
+    # lon/lat again, but spatially indexed. A database trigger keeps it in
+    # sync, so that bulk_create, update() and fixtures set it too.
+    location = models.PointField(null=True)
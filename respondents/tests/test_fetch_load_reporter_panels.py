@@ -46,6 +46,8 @@ def test_fetch_pre_2017(monkeypatch):
     monkeypatch.setattr(
         fetch_load_reporter_panels, "fetch_and_unzip_file", MagicMock())
     monkeypatch.setattr(fetch_load_reporter_panels, "ReporterRow", Mock())
+    monkeypatch.setattr(
+        fetch_load_reporter_panels, "update_institutions", Mock())
     fetch_mock = fetch_load_reporter_panels.fetch_and_unzip_file
     fetch_mock.return_value.__enter__.return_value = BytesIO(b"line1\nline2\n")
 
@@ -54,12 +56,16 @@ def test_fetch_pre_2017(monkeypatch):
     assert "2015" in fetch_mock.call_args[0][0]
     assert fetch_load_reporter_panels.ReporterRow.from_line.call_args_list ==\
         [call("line1\n"), call("line2\n")]
+    rows = fetch_load_reporter_panels.update_institutions.call_args[0][0]
+    assert len(rows) == 2
 
 
 def test_fetch_post_2016(monkeypatch):
     monkeypatch.setattr(
         fetch_load_reporter_panels, "fetch_and_unzip_file", MagicMock())
     monkeypatch.setattr(fetch_load_reporter_panels, "ReporterRow", Mock())
+    monkeypatch.setattr(
+        fetch_load_reporter_panels, "update_institutions", Mock())
     fetch_mock = fetch_load_reporter_panels.fetch_and_unzip_file
     fetch_mock.return_value.__enter__.return_value = \
         BytesIO(b"one,two,three\nfour,five,six\n")
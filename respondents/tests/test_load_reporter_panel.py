@@ -56,3 +56,44 @@ def test_parent_rssd_id():
     row = load_reporter_panel.ReporterRow.from_line("1"*340)
     row = row._replace(year="2012", parent_rssd_id="0011223344")
     assert row.parent().pk == parent.pk
+
+
+@pytest.mark.usefixtures("load_agencies")
+def test_update_institutions(django_assert_max_num_queries):
+    zip_code = ZipcodeCityStateYearFactory(state="IL")
+    parent = InstitutionFactory(
+        year=2012, agency_id=3, respondent_id="9988776655",
+        zip_code=zip_code)
+    child = InstitutionFactory(
+        year=2012, agency_id=3, respondent_id="1122334455")
+    orphan = InstitutionFactory(
+        year=2012, agency_id=1, respondent_id="5555555555")
+    blank = load_reporter_panel.ReporterRow.from_line(" " * 340)._replace(
+        year="2012", agency_code=3, respondent_rssd_id="0000000000")
+    rows = [
+        blank._replace(respondent_id="9988776655",
+                       respondent_rssd_id="0000000111"),
+        blank._replace(respondent_id="1122334455", parent_id="9988776655",
+                       parent_state="IL", top_holder_name="Holdings",
+                       top_holder_rssd_id="0000000999"),
+        blank._replace(agency_code=1, respondent_id="5555555555",
+                       parent_id="7777777777", parent_name="Non-reporter",
+                       parent_rssd_id="0000000888",
+                       top_holder_name="Holdings",
+                       top_holder_rssd_id="0000000999"),
+        blank._replace(respondent_id="0000000000"),     # missing
+    ]
+
+    with django_assert_max_num_queries(8):
+        load_reporter_panel.update_institutions(rows)
+
+    parent.refresh_from_db()
+    child.refresh_from_db()
+    orphan.refresh_from_db()
+    assert parent.rssd_id == "0000000111"
+    assert child.rssd_id is None
+    assert child.parent_id == parent.pk
+    assert child.top_holder.name == "Holdings"
+    assert orphan.parent_id is None
+    assert orphan.non_reporting_parent.rssd_id == "0000000888"
+    assert orphan.top_holder_id == child.top_holder_id
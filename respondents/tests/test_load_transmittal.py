@@ -1,10 +1,11 @@
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 import pytest
 from django.core.management import call_command
 
+from mapusaurus.batch_utils import save_batches
 from respondents.management.commands import load_transmittal
-from respondents.models import Institution
+from respondents.models import Institution, ZipcodeCityStateYear
 from respondents.tests.factories import InstitutionFactory
 
 
@@ -48,3 +49,25 @@ def test_handle_replacements(monkeypatch, tmpdir):
     call_command("load_transmittal", str(data_file), "--replace")
     from_db = Institution.objects.get(institution_id=v1.institution_id)
     assert from_db.name == v2.name
+
+
+# Writer threads have their own connections, so can't see uncommitted rows
+@pytest.mark.django_db(transaction=True)
+def test_handle_writers(tmpdir):
+    call_command("loaddata", "agency")
+    line = ("2013\t{0:010d}\t1\tTAXIDHERE\tFAKE BK {0}\t1122 S 3RD ST\t"
+            "CITY {1}\tCA\t9021{1}\tFAKE CORPORATION\tONE ADDR\tTERRE HAUTE\t"
+            "CA\t90210\tFAKE BK NA\tTERRE HAUTE\tCA\t121212\t0\t3\t3657\tN\n")
+    data_file = tmpdir.join("somefile.dat")
+    data_file.write("".join(line.format(idx, idx % 5) for idx in range(30)))
+
+    def small_batches(models, replace, **kwargs):
+        save_batches(models, replace, **{**kwargs, "batch_size": 4})
+
+    with patch.object(load_transmittal, "save_batches", small_batches):
+        call_command("load_transmittal", str(data_file), "--writers", "2")
+
+    assert Institution.objects.count() == 30
+    assert ZipcodeCityStateYear.objects.count() == 5
+    assert {inst.zip_code.city for inst in Institution.objects.all()} == \
+        {f"CITY {idx}" for idx in range(5)}
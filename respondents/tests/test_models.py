@@ -1,7 +1,7 @@
 import pytest
 from django.core.management import call_command
 
-from respondents.models import Institution
+from respondents.models import Branch, Institution
 
 
 @pytest.mark.usefixtures("load_agencies")
@@ -37,3 +37,22 @@ def test_get_lender_hierarchy():
         True, True)
     assert hierarchy_list_exclude_order[0].institution_id == "201391000000002"
     assert len(hierarchy_list_exclude_order) == 2
+
+
+@pytest.mark.usefixtures("load_agencies")
+def test_branch_location_without_save():
+    call_command("loaddata", "fake_respondents", "fake_branches")
+    assert not Branch.objects.filter(location__isnull=True).exists()
+
+    branch = Branch.objects.first()
+    Branch.objects.filter(pk=branch.pk).update(lon=-77.5, lat=38.5)
+    Branch.objects.bulk_create([Branch(
+        year=2013, institution_id=branch.institution_id, name="Bulk",
+        street="1 Main St", city="Herndon", state="VA", zipcode=20171,
+        lat=10, lon=20,
+    )])
+
+    location = Branch.objects.get(pk=branch.pk).location
+    assert (location.x, location.y) == (-77.5, 38.5)
+    location = Branch.objects.get(name="Bulk").location
+    assert (location.x, location.y) == (20, 10)
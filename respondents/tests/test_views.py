@@ -1,10 +1,19 @@
+import json
+
 import pytest
 from django.core.management import call_command
+from django.http import QueryDict
 from django.urls import reverse
 
+from respondents import views
 from respondents.tests.factories import InstitutionFactory
 
 
+@pytest.fixture(autouse=True)
+def clear_search_cache():
+    views.search_page.cache_clear()
+
+
 @pytest.fixture
 def data_setup(db):
     call_command("loaddata", "agency", "fake_respondents", "fake_hierarchy",
@@ -24,20 +33,67 @@ def fetch_institutions(client, query, **kwargs):
 
 @pytest.mark.usefixtures("data_setup")
 def test_branch_locations(client):
-    resp = client.get(
+    response = client.get(
         reverse("branchLocations"),
         {"lender": "201391000000001",
          "neLat": "1",
          "neLon": "1",
          "swLat": "0",
          "swLon": "0"},
-    ).json()
-    assert resp["features"][0]["properties"]["institution_id"] == \
+    )
+    resp = json.loads(b"".join(response.streaming_content))
+    features = sorted(resp["features"],
+                      key=lambda feature: feature["properties"]["name"])
+    assert len(features) == 2
+    assert features[0]["properties"]["institution_id"] == \
         "201391000000001"
-    assert resp["features"][0]["properties"]["name"] == "Dev Test Branch 2"
-    assert resp["features"][1]["properties"]["institution_id"] == \
+    assert features[0]["properties"]["name"] == "Dev Test Branch 1"
+    assert features[0]["geometry"]["coordinates"] == [0.5, 0.5]
+    assert features[1]["properties"]["institution_id"] == \
         "201391000000001"
-    assert resp["features"][1]["properties"]["name"] == "Dev Test Branch 1"
+    assert features[1]["properties"]["name"] == "Dev Test Branch 2"
+
+
+def test_branch_locations_by_path(client):
+    response = client.get(
+        "/institutions/branchLocations/"
+        "1.000000/2.000000/-3.000000/-4.000000",
+        {"lender": "201391000000001"},
+    )
+    assert response.status_code == 301
+    path, query = response["Location"].split("?")
+    assert path == reverse("branchLocations")
+    assert QueryDict(query) == {
+        "lender": ["201391000000001"], "neLat": ["1.000000"],
+        "neLon": ["2.000000"], "swLat": ["-3.000000"],
+        "swLon": ["-4.000000"],
+    }
+
+
+@pytest.mark.usefixtures("data_setup")
+def test_branch_locations_clusters(client):
+    params = {"lender": "201391000000001", "neLat": "2", "neLon": "2",
+              "swLat": "0", "swLon": "0"}
+
+    response = client.get(reverse("branchLocations"), dict(params, zoom=2))
+    features = json.loads(b"".join(response.streaming_content))["features"]
+    assert len(features) == 1
+    assert features[0]["properties"] == {"count": 3}
+    lon, lat = features[0]["geometry"]["coordinates"]
+    assert lon == pytest.approx((0.5 + 0.3 + 1.5) / 3)
+    assert lat == pytest.approx((0.5 + 0.2 + 1.5) / 3)
+
+    response = client.get(reverse("branchLocations"), dict(params, zoom=12))
+    features = json.loads(b"".join(response.streaming_content))["features"]
+    assert len(features) == 3
+    assert all("name" in feature["properties"] for feature in features)
+
+
+@pytest.mark.django_db
+def test_branch_locations_bad_bounds(client):
+    response = client.get(reverse("branchLocations"),
+                          {"lender": "201391000000001", "neLat": "1"})
+    assert response.status_code == 400
 
 
 @pytest.mark.usefixtures("data_setup")
@@ -76,6 +132,21 @@ def test_search_trigram(client):
     assert fetch_institutions(client, "xxxx", year="2013") == []
 
 
+@pytest.mark.django_db
+def test_search_page_cached(django_assert_num_queries):
+    InstitutionFactory(name="Some Bank", year=2013, num_loans=1)
+    results, total = views.search_page("bank", "2013", "", 0, 25, 1)
+    assert total == 1
+
+    with django_assert_num_queries(0):
+        assert views.search_page("bank", "2013", "", 0, 25, 1) == \
+            (results, total)
+    with django_assert_num_queries(2):
+        views.search_page("bank", "2013", "", 0, 25, 2)    # expired
+    with pytest.raises(TypeError):      # shared between requests
+        results[0]["name"] = "Other Bank"
+
+
 @pytest.mark.usefixtures("load_agencies")
 def test_search_id(client):
     bank = InstitutionFactory(
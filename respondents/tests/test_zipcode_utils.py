@@ -28,3 +28,35 @@ def test_duplicate_entries():
     zipcode_utils.create_zipcode("20852", "Rockville", "MD", "2013")
     results = ZipcodeCityStateYear.objects.filter(state="MD")
     assert results.count() == 1
+
+
+@pytest.mark.django_db
+def test_resolver(django_assert_num_queries):
+    existing = zipcode_utils.create_zipcode("20852", "Rockville", "MD", 2013)
+    resolver = zipcode_utils.ZipcodeResolver()
+
+    with django_assert_num_queries(1):    # preloading 2013
+        assert resolver.resolve("20852", "Rockville", "MD", 2013) == existing
+        first = resolver.resolve("20001-1234", "Washington", "DC", 2013)
+        second = resolver.resolve("20001", "Washington", "DC", 2013)
+    assert first is second
+    assert first.pk is None
+    assert first.plus_four == 1234
+
+    resolver.save_new()
+    assert first.pk is not None
+    assert ZipcodeCityStateYear.objects.count() == 2
+    with pytest.raises(ValueError):
+        resolver.resolve("2oool", "Washington", "DC", 2013)
+
+
+@pytest.mark.django_db
+def test_resolver_reuses_concurrent_inserts():
+    resolver = zipcode_utils.ZipcodeResolver()
+    new = resolver.resolve("20001", "Washington", "DC", 2013)
+    # e.g. by a simultaneous load, since we preloaded 2013
+    existing = zipcode_utils.create_zipcode("20001", "Washington", "DC", 2013)
+
+    resolver.save_new()
+    assert new.pk == existing.pk
+    assert ZipcodeCityStateYear.objects.count() == 1
@@ -11,12 +11,12 @@ urlpatterns = [
     url(
         r"/".join([
             r"^branchLocations",
-            r"(?P<northEastLat>-?\d+\.\d{6})",
-            r"(?P<northEastLon>-?\d+\.\d{6})",
-            r"(?P<southWestLat>-?\d+\.\d{6})",
-            r"(?P<southWestLon>-?\d+\.\d{6})$",
+            r"(?P<neLat>-?\d+\.\d{6})",
+            r"(?P<neLon>-?\d+\.\d{6})",
+            r"(?P<swLat>-?\d+\.\d{6})",
+            r"(?P<swLon>-?\d+\.\d{6})$",
         ]),
-        views.branch_locations_as_json,
+        views.branch_locations_by_path,
         name="branch_locations",
     ),
 ]
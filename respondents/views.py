@@ -1,16 +1,29 @@
 import json
 import re
+import time
 from datetime import date
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Iterator, Mapping, Optional, Tuple
 
+from django.conf import settings
+from django.contrib.gis.db.models import Collect
+from django.contrib.gis.db.models.functions import Centroid, SnapToGrid
+from django.contrib.gis.geos import Polygon
 from django.contrib.postgres.search import TrigramSimilarity
-from django.db.models import Q
-from django.http import HttpResponseBadRequest
+from django.db.models import Count, QuerySet
+from django.http import (
+    HttpResponseBadRequest, HttpResponsePermanentRedirect,
+    StreamingHttpResponse,
+)
+from django.urls import reverse
 from django.utils.html import escape
 from rest_framework import serializers
 from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from mapusaurus.batch_utils import batches
 from respondents.models import Branch, Institution
 
 
@@ -42,18 +55,13 @@ PAREN_RE = re.compile(r"^.*\((?P<agency>[0-9])(?P<respondent>[0-9-]{10})\)$")
 RESP_RE = re.compile(r"^(?P<respondent>[0-9-]{10})$")
 LENDER_REGEXES = [PREFIX_RE, PAREN_RE]
 SORT_WHITELIST = ("assets", "-assets", "num_loans", "-num_loans")
+# Like the site-wide cache middleware's default
+SEARCH_CACHE_SECONDS = 600
 
 
-@api_view(["GET"])
-@renderer_classes((JSONRenderer,))
-def search_results(request):
-    query_str = escape(request.GET.get("q", "")).strip()
-    year = escape(request.GET.get("year", "")).strip()
-    if not year:
-        year = str(date.today().year)
-
-    lender_id = False
-    respondent_id = False
+def institution_query(query_str: str, year: str, sort: str) -> QuerySet:
+    lender_id: Optional[str] = None
+    respondent_id: Optional[str] = None
     for regex in LENDER_REGEXES:
         match = regex.match(query_str)
         if match:
@@ -67,20 +75,46 @@ def search_results(request):
         .order_by("-assets")\
         .filter(num_loans__gt=0, year=year)
 
-    if lender_id:
+    if lender_id is not None:
         query = query.filter(institution_id=lender_id)
-    elif respondent_id:
+    elif respondent_id is not None:
         query = query.filter(respondent_id=respondent_id)
     elif query_str:
+        # "%" (rather than comparing similarity) can use the trigram index;
+        # its threshold defaults to 0.3
         query = query\
+            .filter(name__trigram_similar=query_str)\
             .annotate(similarity=TrigramSimilarity("name", query_str))\
-            .filter(similarity__gte=0.3)\
             .order_by("-similarity")
     else:
         query = query.none()
 
+    if sort:
+        query = query.order_by(sort)
+    return query
+
+
+@lru_cache(maxsize=256)
+def search_page(query_str: str, year: str, sort: str, start: int, end: int,
+                epoch: int) -> Tuple[Tuple[Mapping, ...], int]:
+    """Serialized results within [start, end), plus the total number of
+    results. Recent pages are kept in memory; `epoch` expires them. As
+    they're shared between requests, the results are read-only."""
+    query = institution_query(query_str, year, sort)
+    results = InstitutionSerializer(query[start:end], many=True).data
+    return tuple(MappingProxyType(result) for result in results), \
+        query.count()
+
+
+@api_view(["GET"])
+@renderer_classes((JSONRenderer,))
+def search_results(request):
+    query_str = escape(request.GET.get("q", "")).strip()
+    year = escape(request.GET.get("year", "")).strip()
+    if not year:
+        year = str(date.today().year)
+
     if request.GET.get("sort") in SORT_WHITELIST:
-        query = query.order_by(request.GET["sort"])
         sort = current_sort = request.GET["sort"]
     else:
         sort = current_sort = ""
@@ -105,7 +139,10 @@ def search_results(request):
         start_results = 0
         end_results = num_results
 
-    total_results = len(query)
+    results, total_results = search_page(
+        query_str, year, sort, start_results, end_results,
+        int(time.time() // SEARCH_CACHE_SECONDS),
+    )
 
     # total number of pages
     if total_results <= num_results:
@@ -115,8 +152,6 @@ def search_results(request):
     else:
         total_pages = total_results // num_results
 
-    query = query[start_results:end_results]
-
     # next page
     if total_results < num_results or page is total_pages:
         next_page = 0
@@ -127,16 +162,12 @@ def search_results(request):
     # previous page
     prev_page = page - 1
 
-    results = query
-
-    if request.accepted_renderer.format != "html":
-        results = InstitutionSerializer(results, many=True).data
-
     # to adjust for template
     start_results = start_results + 1
 
     return Response(
-        {"institutions": results, "query_str": query_str,
+        {"institutions": [dict(result) for result in results],
+         "query_str": query_str,
          "num_results": num_results, "start_results": start_results,
          "end_results": end_results, "sort": sort,
          "page_num": page, "total_results": total_results,
@@ -146,30 +177,85 @@ def search_results(request):
     )
 
 
-def branch_locations_as_json(request):
-    return json.loads(branch_locations(request))
+BRANCH_FIELDS = ("year", "institution_id", "name", "street", "city",
+                 "state", "zipcode", "lat", "lon")
+CLUSTER_CELLS_PER_TILE = 4
+GEOJSON_HEADER = (
+    '{"crs": {"type": "link", "properties": {"href": '
+    '"http://spatialreference.org/ref/epsg/4326/", "type": "proj4"}}, '
+    '"type": "FeatureCollection", "features": ['
+)
+
+
+def point_feature(lon: float, lat: float, properties: Dict) -> Dict:
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [lon, lat]},
+        "properties": properties,
+    }
+
+
+def branch_features(branches: QuerySet) -> Iterator[Dict]:
+    for props in branches.values(*BRANCH_FIELDS).iterator():
+        yield point_feature(props["lon"], props["lat"], props)
+
+
+def cluster_features(branches: QuerySet, zoom: int) -> Iterator[Dict]:
+    """Group branches by grid cell (a few per map tile at this zoom), all in
+    the database. Each cell becomes a feature at its branches' centroid,
+    with their count."""
+    cell_size = 360 / 2 ** zoom / CLUSTER_CELLS_PER_TILE
+    clusters = branches\
+        .annotate(cell=SnapToGrid("location", cell_size))\
+        .values("cell")\
+        .annotate(count=Count("pk"), center=Centroid(Collect("location")))\
+        .values_list("count", "center")
+    for count, center in clusters.iterator():
+        yield point_feature(center.x, center.y, {"count": count})
+
+
+def feature_collection(features: Iterator[Dict]) -> Iterator[str]:
+    """A GeoJSON FeatureCollection, serialized a batch of features at a
+    time."""
+    yield GEOJSON_HEADER
+    separator = ""
+    for batch in batches(features, 500):
+        if batch:
+            yield separator + ", ".join(json.dumps(f) for f in batch)
+            separator = ", "
+    yield "]}"
 
 
 def branch_locations(request):
-    """This endpoint returns geocoded branch locations"""
-    lender = escape(request.GET.get("lender"))
-    ne_lat = escape(request.GET.get("neLat"))
-    ne_lon = escape(request.GET.get("neLon"))
-    sw_lat = escape(request.GET.get("swLat"))
-    sw_lon = escape(request.GET.get("swLon"))
+    """This endpoint returns geocoded branch locations. Given a zoom level
+    at or below BRANCH_CLUSTER_MAX_ZOOM, nearby branches are clustered."""
     try:
-        maxlat = float(ne_lat)
-        minlon = float(sw_lon)
-        minlat = float(sw_lat)
-        maxlon = float(ne_lon)
-    except ValueError:
+        bbox = Polygon.from_bbox((
+            float(request.GET.get("swLon")),
+            float(request.GET.get("swLat")),
+            float(request.GET.get("neLon")),
+            float(request.GET.get("neLat")),
+        ))
+        zoom = int(request.GET["zoom"]) if "zoom" in request.GET else None
+    except (TypeError, ValueError):
         return HttpResponseBadRequest(
-            "Bad or missing values: neLat, neLon, swLat, swLon")
-    query = Q(lat__gte=minlat, lat__lte=maxlat,
-              lon__gte=minlon, lon__lte=maxlon)
-    branches = Branch.objects.filter(institution_id=lender).filter(query)
-    response = '{"crs": {"type": "link", "properties": {"href": '
-    response += '"http://spatialreference.org/ref/epsg/4326/", "type": '
-    response += '"proj4"}}, "type": "FeatureCollection", "features": [%s]}'
-    return response % ", ".join(
-        branch.branch_as_geojson() for branch in branches)
+            "Bad or missing values: neLat, neLon, swLat, swLon, zoom")
+    branches = Branch.objects.filter(
+        institution_id=request.GET.get("lender"), location__contained=bbox)
+    if zoom is not None and 0 <= zoom <= settings.BRANCH_CLUSTER_MAX_ZOOM:
+        features = cluster_features(branches, zoom)
+    else:
+        features = branch_features(branches)
+    return StreamingHttpResponse(
+        feature_collection(features), content_type="application/json")
+
+
+def branch_locations_by_path(request, neLat: str, neLon: str, swLat: str,
+                             swLon: str, format: Optional[str] = None):
+    """The old URL for branch locations, which took the bounds as path
+    segments. Redirects to branch_locations, with them as parameters."""
+    params = request.GET.copy()
+    params.update({"neLat": neLat, "neLon": neLon,
+                   "swLat": swLat, "swLon": swLon})
+    return HttpResponsePermanentRedirect(
+        f"{reverse('branchLocations')}?{params.urlencode()}")
@@ -1,9 +1,14 @@
-from respondents.models import ZipcodeCityStateYear
+from typing import Dict, Iterator, List, Optional, Set, Tuple
 
+from django.db import connection, transaction
 
-def create_zipcode(
-        zip_code: str, city: str, state: str, year: int,
-        ) -> ZipcodeCityStateYear:
+from mapusaurus.batch_utils import batches
+from respondents.models import Institution, ZipcodeCityStateYear
+
+
+def parse_zip_code(zip_code: str) -> Tuple[int, Optional[int]]:
+    """Split a zip code (e.g. "12345" or "12345-6789") into the zip and the
+    plus four, if any."""
     plus_four = ""
     if "-" in zip_code:
         zip_code, plus_four = zip_code.split("-")
@@ -12,14 +17,91 @@ def create_zipcode(
         raise ValueError(f"Invalid zip code: {zip_code}")
     if plus_four and not plus_four.isdigit():
         raise ValueError(f"Invalid plus four: {plus_four}")
+    return int(zip_code), int(plus_four) if plus_four else None
+
 
+def create_zipcode(
+        zip_code: str, city: str, state: str, year: int,
+        ) -> ZipcodeCityStateYear:
+    zip_int, plus_four = parse_zip_code(zip_code)
     model, _ = ZipcodeCityStateYear.objects.get_or_create(
-        zip_code=int(zip_code),
+        zip_code=zip_int,
         city=city,
         year=year,
         defaults={
-            "plus_four": int(plus_four) if plus_four else None,
+            "plus_four": plus_four,
             "state": state,
         },
     )
     return model
+
+
+class ZipcodeResolver:
+    """Like create_zipcode, but without queries per call. Each year's zip
+    codes are loaded once; new ones are held, unsaved, until `save_new`
+    inserts them together."""
+
+    def __init__(self):
+        self.known: Dict[Tuple[int, str, int], ZipcodeCityStateYear] = {}
+        self.loaded_years: Set[int] = set()
+        self.new: List[ZipcodeCityStateYear] = []
+
+    def preload(self, year: int):
+        if year in self.loaded_years:
+            return
+        self.loaded_years.add(year)
+        for model in ZipcodeCityStateYear.objects.filter(year=year):
+            self.known.setdefault(
+                (model.zip_code, model.city, model.year), model)
+
+    def resolve(self, zip_code: str, city: str, state: str,
+                year: int) -> ZipcodeCityStateYear:
+        zip_int, plus_four = parse_zip_code(zip_code)
+        year = int(year)
+        self.preload(year)
+        key = (zip_int, city, year)
+        if key not in self.known:
+            self.known[key] = ZipcodeCityStateYear(
+                zip_code=zip_int, city=city, year=year, plus_four=plus_four,
+                state=state,
+            )
+            self.new.append(self.known[key])
+        return self.known[key]
+
+    def save_new(self):
+        """Insert the new zip codes in a transaction of their own and note
+        their pks. Any inserted meanwhile (e.g. by another load) are reused
+        rather than duplicated."""
+        if not self.new:
+            return
+        table = ZipcodeCityStateYear._meta.db_table
+        rows = ", ".join(["(%s, %s, %s, %s, %s)"] * len(self.new))
+        params = [value for model in self.new for value in (
+            model.zip_code, model.plus_four, model.city, model.state,
+            model.year,
+        )]
+        with transaction.atomic(), connection.cursor() as cursor:
+            # A no-op update, unlike DO NOTHING, returns the existing row
+            cursor.execute(f"""
+                INSERT INTO {table} (zip_code, plus_four, city, state, year)
+                VALUES {rows}
+                ON CONFLICT (zip_code, city, year) DO UPDATE
+                SET zip_code = EXCLUDED.zip_code
+                RETURNING id, zip_code, city, year
+            """, params)
+            for pk, zip_code, city, year in cursor.fetchall():
+                self.known[(zip_code, city, year)].pk = pk
+        self.new = []
+
+    def with_saved_zipcodes(
+            self, models: Iterator[Institution],
+            batch_size: int = 1000) -> Iterator[Institution]:
+        """Pass models (which have a zip_code) through, a batch at a time,
+        first committing any new zip codes and pointing the models at them.
+        As this runs in the thread consuming `models`, outside of any
+        batch's transaction, every writer thread can see the zip codes."""
+        for batch in batches(models, batch_size):
+            self.save_new()
+            for model in batch:
+                model.zip_code_id = model.zip_code.pk
+            yield from batch